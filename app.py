@@ -0,0 +1,202 @@
+"""
+
+    Description:
+        Module that contains the entry point of the OORMS. It starts any of the two windows (the server view and the
+        kitchen view) on their own or together, or their headless stand-ins (see headless.py) on a machine without a
+        display, and only imports what the mode asked for: tkinter and oorms.py for windows, neither of them
+        headless, and journal.py or sqlite_store.py only when the orders are kept in one.
+
+        Run it from the root of the project with:
+            python app.py [--window server|kitchen|both] [--headless] [--layout FILE] [--menu FILE]
+                          [--journal DIR | --database FILE] [--profile FILE] [--record FILE]
+
+        python oorms.py still works, and starts both windows like it always did (see Notes 4).
+
+    Functions defined in this module:
+        - view_classes(windows, headless, window_classes): imports and returns the view classes of the windows asked for
+        - start_windows(restaurant, windows, root, window_classes): opens the windows on a tkinter event loop
+        - start_headless(restaurant, windows, scheduler): creates the headless views of the windows
+        - main(argv, window_classes): parses the command line and runs the OORMS
+
+    Notes:
+        1 - A headless run has no event loop to keep it going: it loads the restaurant (recovering the journal or
+        database's orders), renders the views asked for once, prints what they show and exits. That's the report a
+        back-office box without a display wants; for driving the restaurant headless, see server.py.
+
+        2 - With a single window, that window is tkinter's root. With both, the kitchen view is a Toplevel that
+        gets lined up to the right of the server view, and both share the one RedrawScheduler since they share
+        root's event loop.
+
+        3 - With --record, the actions taken on the views get recorded to a trace from the state the orders were
+        recovered in, and can be replayed headlessly later on (see traces.py).
+
+        4 - Run as a script, oorms.py is the __main__ module, so importing oorms from here would load it a second
+        time, tkinter widgets and all. It hands its own ServerView and KitchenView to main() instead, and they get
+        used rather than importing oorms.py.
+
+"""
+
+# ---- Importing built-in Libraries ----
+
+import argparse
+
+
+# ---- Importing from other modules -----
+
+from model import Restaurant
+
+
+# The windows that can be started, in the order they get opened, and their titles
+WINDOWS = ('server', 'kitchen')
+WINDOW_TITLES = {'server': 'Server View v2', 'kitchen': 'Kitchen View v2'}
+
+# Pixels between two windows lined up side by side
+WINDOW_GAP = 10
+
+
+
+# --------- Defining Separate Functions -----------
+
+def view_classes(windows = WINDOWS, headless = False, window_classes = None):
+    """ Function returns the dict of the view class of each window of <windows> ('server' and/or 'kitchen'), the
+    headless ones if <headless>. The windowed ones are those of the dict <window_classes> if given (see Notes 4),
+    otherwise oorms.py (and with it tkinter) gets imported, only then. """
+    if headless:
+        from headless import HeadlessServerView, HeadlessKitchenView
+        classes = {'server': HeadlessServerView, 'kitchen': HeadlessKitchenView}
+    elif window_classes is not None:
+        classes = window_classes
+    else:
+        import oorms
+        classes = {'server': oorms.ServerView, 'kitchen': oorms.KitchenView}
+    return {window: classes[window] for window in windows}
+
+
+def start_windows(restaurant, windows = WINDOWS, root = None, window_classes = None):
+    """ Function opens the windows of <windows> on the Restaurant object <restaurant> (see Notes 2), in <root> (a
+    new tkinter.Tk by default). See view_classes() for <window_classes>. Returns root, the RedrawScheduler shared by
+    the views and the dict of the views by window. """
+    import tkinter as tk
+    from scheduler import RedrawScheduler
+
+    classes = view_classes(windows, window_classes = window_classes)
+    root = tk.Tk() if root is None else root
+    scheduler = RedrawScheduler(root.after_idle)
+    views = {}
+    for window in windows:
+        master = root if not views else tk.Toplevel(root)
+        views[window] = classes[window](master, restaurant, scheduler)
+        master.title(WINDOW_TITLES[window])
+        master.wm_resizable(0, 0)
+
+    # Lining each window up to the right of the one before it
+    if len(views) > 1:
+        root.update_idletasks()
+        previous = None
+        for view in views.values():
+            window = view.winfo_toplevel()
+            if previous is not None:
+                window.geometry(f'{window.winfo_width()}x{window.winfo_height()}'
+                                f'+{previous.winfo_x() + previous.winfo_width() + WINDOW_GAP}+{previous.winfo_y()}')
+            previous = window
+    return root, scheduler, views
+
+
+def start_headless(restaurant, windows = WINDOWS, scheduler = None):
+    """ Function creates the headless views of the windows of <windows> on the Restaurant object <restaurant>,
+    each rendered once. Returns the dict of the views by window. See headless.HeadlessView for <scheduler>. """
+    classes = view_classes(windows, headless = True)
+    return {window: classes[window](restaurant, scheduler) for window in windows}
+
+
+def report(restaurant, views):
+    """ Function returns the lines a headless run prints (see Notes 1): what each of the headless <views> shows,
+    and the totals of <restaurant>. """
+    total, table_totals = restaurant.totals()
+    lines = []
+    if 'server' in views:
+        lines.append(f'server: {len([number for number, amount in table_totals.items() if amount])} tables with '
+                     f'orders')
+    if 'kitchen' in views:
+        lines.append(f"kitchen: {len(restaurant.active_table_numbers())} tables, {views['kitchen'].rows} rows")
+    lines.append(f'total: {total:.2f}')
+    return lines
+
+
+def main(argv = None, window_classes = None):
+    """ Function runs the OORMS with the command line arguments <argv> (sys.argv's by default). See view_classes()
+    for <window_classes>. """
+
+    # Reading which windows to start, which floor plan and menu files to load, and where the orders are kept
+    parser = argparse.ArgumentParser(description = 'Object-Oriented Restaurant Management System')
+    parser.add_argument('--window', choices = ('server', 'kitchen', 'both'), default = 'both',
+                        help = 'window to start (both by default)')
+    parser.add_argument('--headless', action = 'store_true',
+                        help = 'print what the windows would show and exit, without tkinter or a display')
+    parser.add_argument('--layout', help = 'floor plan file (.csv, .jsonl or .json)')
+    parser.add_argument('--menu', help = 'menu file (.csv, .jsonl or .json)')
+    storage = parser.add_mutually_exclusive_group()
+    storage.add_argument('--journal', help = 'directory to journal the orders to, and recover them from on start-up')
+    storage.add_argument('--database', help = 'SQLite database to keep the orders in, and load them from on start-up')
+    parser.add_argument('--profile', help = 'JSON file to write the timings of the controller actions and renders '
+                                            'to on exit (see profiling.py)')
+    parser.add_argument('--record', help = 'trace file to record the actions taken on the views to, for replaying '
+                                           'them later (see traces.py)')
+    args = parser.parse_args(argv)
+    windows = WINDOWS if args.window == 'both' else (args.window,)
+
+    # Timing the controller actions and the renders of the views, if asked to
+    profiler = None
+    if args.profile:
+        from profiling import Profiler
+        profiler = Profiler().install(tuple(view_classes(windows, args.headless, window_classes).values()))
+
+    # Creating the restaurant object, and recovering the orders of the last run if journaling
+    restaurant_info = Restaurant(args.layout, args.menu)
+    journal = None
+    if args.journal:
+        from journal import Journal
+        journal = Journal(args.journal, restaurant_info)
+
+    root = None
+    if args.headless:
+        after_idle = None
+    else:
+        import tkinter as tk
+        root = tk.Tk()
+        after_idle = root.after_idle
+
+    # Loading the orders kept in the database, if using one. Its writes go in one transaction per idle cycle.
+    store = None
+    if args.database:
+        from sqlite_store import SqliteStore
+        store = SqliteStore(args.database, restaurant_info, after_idle)
+
+    # Recording the actions taken from here on, if asked to (see Notes 3)
+    recorder = None
+    if args.record:
+        from traces import TraceRecorder
+        recorder = TraceRecorder(restaurant_info, args.record).install()
+
+    try:
+        if args.headless:
+            for line in report(restaurant_info, start_headless(restaurant_info, windows)):
+                print(line)
+        else:
+            start_windows(restaurant_info, windows, root, window_classes)
+
+            # Calling the mainloop of the program.
+            root.mainloop()
+    finally:
+        if recorder is not None:
+            recorder.close()
+        if journal is not None:
+            journal.close()
+        if store is not None:
+            store.close()
+        if profiler is not None:
+            profiler.dump(args.profile)
+
+
+if __name__ == '__main__':
+    main()
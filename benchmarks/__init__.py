@@ -0,0 +1,18 @@
+"""
+
+    Description:
+        Package of the OORMS benchmarks. They are meant to be run from the root of the project as modules,
+        ie. python -m benchmarks.memory, so that the model, controller and view modules can be imported.
+
+    Modules in this package:
+        - common: helpers shared by the benchmarks (building big restaurants, timing, result files)
+        - memory: bytes used per table and per order item of a big restaurant, requested, placed and advanced
+        - replay: per-action times of a recorded trace replayed headlessly, against an earlier run's
+        - scaling: throughput, contention and tail latency of one hosted restaurant as worker processes get added
+        - shift: latency and throughput of the controllers through a simulated service
+        - snapshot: size, save and load time of a 1M item snapshot against a naive pickle of the same state
+        - sqlite: the SQLite store's writes and indexed queries against the in-memory model's
+        - startup: import and first render time of each window, alone, together and headless
+        - terminals: requests per second and push latency of the terminal server under hundreds of terminals
+
+"""
@@ -0,0 +1,139 @@
+"""
+
+    Description:
+        Helpers shared by the OORMS benchmarks: building big restaurants, timing operations, and writing
+        machine-readable result files.
+
+"""
+
+# ---- Importing built-in Libraries ----
+
+import datetime
+import json
+import platform
+import subprocess
+import sys
+import time
+from array import array
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# ---- Importing from other modules -----
+
+from model import Restaurant
+
+
+def large_layout(n_tables, seats_per_table = 4, columns = 100, rows_per_section = 10):
+    """ Function returns the parsed floor plan of <n_tables> tables of <seats_per_table> seats each, laid out on a
+    grid <columns> tables wide, with every <rows_per_section> rows of the grid making up a section. """
+    per_section = columns * rows_per_section
+    return [(f'section {start // per_section}',
+             [(seats_per_table, ((ix % columns) * 250, (ix // columns) * 250))
+              for ix in range(start, min(start + per_section, n_tables))])
+            for start in range(0, n_tables, per_section)]
+
+
+def large_restaurant(n_tables, seats_per_table = 4, columns = 100):
+    """ Function returns a Restaurant object with <n_tables> tables of <seats_per_table> seats each, laid out on a
+    grid <columns> tables wide, in place of the 8 tables from constants.py. """
+    return Restaurant(large_layout(n_tables, seats_per_table, columns))
+
+
+def fill_orders(restaurant, n_items, place = True):
+    """ Function spreads <n_items> order items round-robin over every seat of <restaurant>, cycling through the
+    menu, and places them if <place> is True. Returns the list of orders that got items. """
+    seats = [table.order_for(seat) for table in restaurant.tables for seat in range(table.n_seats)]
+    menu_items = restaurant.menu_items
+    for ix in range(n_items):
+        seats[ix % len(seats)].add_item(menu_items[ix % len(menu_items)])
+    orders = seats[:n_items] if n_items < len(seats) else seats
+    if place:
+        for order in orders:
+            order.place_new_orders()
+    return orders
+
+
+def peak_memory():
+    """ Function returns the peak resident memory of this process in bytes, or None where it can't be read. """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def environment():
+    """ Function returns a dict describing the build being benchmarked, so result files can be compared. """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output = True, text = True,
+                                check = True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'commit': commit,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat()}
+
+
+def write_results(path, results):
+    """ Writes the dict <results>, along with the environment(), to the JSON file <path>. """
+    with open(path, 'w') as results_file:
+        json.dump({'environment': environment(), **results}, results_file, indent = 2)
+
+
+
+class LatencyRecorder:
+    """ Records how long each call of each named operation takes, and summarizes them as percentiles. """
+
+    def __init__(self, clock = time.perf_counter):
+        """ Constructor to the LatencyRecorder class. <clock> is the function used to time the calls. """
+        self.clock = clock
+
+        # Operation name -> array of the seconds each of its calls took
+        self.samples = {}
+
+
+    def time(self, name, function, *args):
+        """ Calls <function> with <args>, recording how long it took under the operation <name>. Returns what
+        <function> returned. """
+        start = self.clock()
+        result = function(*args)
+        self.add(name, self.clock() - start)
+        return result
+
+
+    def add(self, name, elapsed):
+        """ Method records a call of the operation <name> that took <elapsed> seconds, for calls timed elsewhere
+        (asynchronous ones, say). """
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = array('d')
+        samples.append(elapsed)
+
+
+    def summary(self):
+        """ Function returns, for each operation, its call count, throughput (calls per second spent in it) and its
+        mean, p50, p90, p99, p99.9 and max latency in microseconds. """
+        summary = {}
+        for name, samples in sorted(self.samples.items()):
+            ordered = sorted(samples)
+            total = sum(ordered)
+            summary[name] = {'count': len(ordered),
+                             'total_s': total,
+                             'throughput_per_s': len(ordered) / total if total else None,
+                             'mean_us': total / len(ordered) * 1e6,
+                             'p50_us': _percentile(ordered, 0.50) * 1e6,
+                             'p90_us': _percentile(ordered, 0.90) * 1e6,
+                             'p99_us': _percentile(ordered, 0.99) * 1e6,
+                             'p99.9_us': _percentile(ordered, 0.999) * 1e6,
+                             'max_us': ordered[-1] * 1e6}
+        return summary
+
+
+
+def _percentile(ordered, fraction):
+    """ Returns the <fraction> percentile (nearest rank) of the sorted list <ordered>. """
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
@@ -0,0 +1,74 @@
+"""
+
+    Description:
+        Memory benchmark of the model. Builds a restaurant of 10k tables, then orders 1M items in it, and reports
+        how many bytes each table and each order item costs, as measured by tracemalloc. Items cost more once
+        they're placed (their kitchen queue entry, their timestamps and their entry in the active item index) than
+        while they're only requested, so the items get measured at each stage of a shift, a fresh restaurant each:
+            requested - added to their orders but not placed
+            placed    - placed, waiting in the kitchen queue
+            advanced  - placed, then advanced once (COOKED: out of the queue, still active)
+
+        Run it from the root of the project with:
+            python -m benchmarks.memory [--tables N] [--items N] [--stages requested,placed,advanced]
+
+"""
+
+# ---- Importing built-in Libraries ----
+
+import argparse
+import json
+import tracemalloc
+
+
+# ---- Importing from other modules -----
+
+from benchmarks.common import large_restaurant, fill_orders
+
+
+# The stages of a shift the items can be measured at (see the module's docstring)
+STAGES = ('requested', 'placed', 'advanced')
+
+
+
+# --------- Defining Separate Functions -----------
+
+def measure(n_tables, n_items, seats_per_table = 4, stage = 'requested'):
+    """ Function returns a dict of the bytes used per table (including its seats' Orders) and per order item, the
+    items taken to the stage <stage> of STAGES. """
+    tracemalloc.start()
+
+    before = tracemalloc.get_traced_memory()[0]
+    restaurant = large_restaurant(n_tables, seats_per_table)
+    for table in restaurant.tables:
+        for seat in range(table.n_seats):
+            table.order_for(seat)
+    after_tables = tracemalloc.get_traced_memory()[0]
+
+    orders = fill_orders(restaurant, n_items, place = stage != 'requested')
+    if stage == 'advanced':
+        for order in orders:
+            for item in order.items:
+                item.advance_status()
+    after_items = tracemalloc.get_traced_memory()[0]
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {'tables': n_tables,
+            'seats_per_table': seats_per_table,
+            'items': n_items,
+            'stage': stage,
+            'bytes_per_table': (after_tables - before) / n_tables,
+            'bytes_per_item': (after_items - after_tables) / n_items,
+            'peak_bytes': peak}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tables', type = int, default = 10_000)
+    parser.add_argument('--items', type = int, default = 1_000_000)
+    parser.add_argument('--stages', default = ','.join(STAGES), help = 'comma-separated stages to measure the items '
+                                                                       'at, among ' + ', '.join(STAGES))
+    args = parser.parse_args()
+    print(json.dumps([measure(args.tables, args.items, stage = stage) for stage in args.stages.split(',')],
+                     indent = 2))
@@ -0,0 +1,163 @@
+"""
+
+    Description:
+        Replay benchmark. Replays a trace of user actions (see traces.py) headlessly, as fast as it goes, checks
+        that the restaurant ends up in the state the trace was recorded in, and reports the time of every action
+        by controller and method. Given the results of an earlier run (of another build, say) as a baseline, it
+        also reports how much slower or faster each action got, and flags the ones that got slower by more than the
+        threshold.
+
+        Without a trace file, it records one first: a scripted shift in which servers open random seats, tap in a
+        few items, sometimes take one back, then place or cancel the order, while the kitchen starts the next items
+        up and sees the ones it started through to served, and now and then sends out a table's ready items.
+
+        Run it from the root of the project with:
+            python -m benchmarks.replay [TRACE] [--repeats N] [--baseline FILE] [--threshold RATIO] [--output FILE]
+                                        [--tables N] [--visits N] [--record FILE]
+
+"""
+
+# ---- Importing built-in Libraries ----
+
+import argparse
+import json
+import random
+import statistics
+from collections import deque
+
+
+# ---- Importing from other modules -----
+
+from benchmarks.common import large_restaurant, write_results
+from headless import HeadlessServerView, HeadlessKitchenView
+from model import Status
+from traces import Trace, TraceRecorder, replay
+
+
+# Share of the seat visits that take an item back out, and that cancel the order rather than place it
+REMOVE_SHARE = 0.2
+CANCEL_SHARE = 0.1
+
+# Kitchen buttons pressed per seat visit, and how often (in seat visits) a table's ready items get sent out
+PRESSES_PER_VISIT = 8
+ADVANCE_TABLE_EVERY = 50
+
+
+
+# --------- Defining Separate Functions -----------
+
+def record_shift(path, n_tables, n_visits, seed = 0):
+    """ Function records a scripted shift of <n_visits> seat visits over <n_tables> tables to the trace file
+    <path>. Returns the number of actions recorded. """
+    rng = random.Random(seed)
+    restaurant = large_restaurant(n_tables)
+    server = HeadlessServerView(restaurant)
+    kitchen = HeadlessKitchenView(restaurant)
+    menu_items = list(restaurant.menu_items)
+
+    # Items the kitchen started, oldest first, that it still has to see through
+    cooking = deque()
+    recorder = TraceRecorder(restaurant, path).install()
+    try:
+        for visit in range(n_visits):
+            table = restaurant.tables[rng.randrange(n_tables)]
+            server.controller.table_touched(table.number)
+            server.controller.seat_touched(rng.randrange(table.n_seats))
+            for _ in range(rng.randint(1, 5)):
+                server.controller.add_item(rng.choice(menu_items))
+            requested = [item for item in server.controller.order.items if not item.has_been_ordered()]
+            if rng.random() < REMOVE_SHARE:
+                server.controller.remove_spec_item(rng.choice(requested))
+            if rng.random() < CANCEL_SHARE:
+                server.controller.cancel_changes()
+            else:
+                server.controller.update_order()
+            server.controller.done()
+
+            for _ in range(PRESSES_PER_VISIT):
+                while cooking and cooking[0].has_been_served():
+                    cooking.popleft()
+                item = kitchen.controller.next_item()
+                if item is None:
+                    if not cooking:
+                        break
+                    item = cooking[0]
+                kitchen.controller.button_pressed(item)
+                if item.status == Status.COOKED:
+                    cooking.append(item)
+            if visit % ADVANCE_TABLE_EVERY == ADVANCE_TABLE_EVERY - 1:
+                kitchen.controller.advance_table(table.number, Status.READY)
+    finally:
+        recorder.close()
+    return recorder.actions
+
+
+def compare(timings, baseline, threshold):
+    """ Function returns, for every action of both the <timings> and the <baseline> ones, the ratio of its p50 and
+    p99 to the baseline's, and whether its p50 got slower than <threshold> times the baseline's. """
+    changes = {}
+    for action, stats in timings.items():
+        before = baseline.get(action)
+        if before is None or not before.get('count') or not stats.get('count'):
+            continue
+        p50 = stats['p50_us'] / before['p50_us']
+        changes[action] = {'p50_ratio': p50, 'p99_ratio': stats['p99_us'] / before['p99_us'],
+                           'slower': p50 > threshold}
+    return changes
+
+
+def run(trace_path, repeats, baseline = None, threshold = 1.1):
+    """ Function replays the trace file <trace_path> <repeats> times and returns the dict of results of the run
+    that took the median time, along with the replay time of every run, and the changes against the results of
+    an earlier run <baseline> (a dict as returned by this function), if given. """
+    trace = Trace.load(trace_path)
+    reports = []
+    for _ in range(repeats):
+        _, report = replay(trace)
+        reports.append(report)
+    reports.sort(key = lambda report: report['replay_s'])
+    results = dict(reports[len(reports) // 2])
+    results['trace'] = trace_path
+    results['replay_s_runs'] = [report['replay_s'] for report in reports]
+    results['actions_per_s'] = results['actions'] / statistics.median(results['replay_s_runs'])
+    if baseline is not None:
+        results['changes'] = compare(results['timings'], baseline['timings'], threshold)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('trace', nargs = '?', help = 'trace file to replay (a scripted shift gets recorded if none)')
+    parser.add_argument('--repeats', type = int, default = 5)
+    parser.add_argument('--baseline', help = 'results file of an earlier run to compare the actions\' times to')
+    parser.add_argument('--threshold', type = float, default = 1.1,
+                        help = 'p50 ratio over the baseline above which an action counts as slower')
+    parser.add_argument('--tables', type = int, default = 1_000)
+    parser.add_argument('--visits', type = int, default = 20_000)
+    parser.add_argument('--record', default = 'benchmark_replay.trace',
+                        help = 'where to record the scripted shift, when no trace is given')
+    parser.add_argument('--output', default = 'benchmark_replay.json')
+    args = parser.parse_args()
+
+    trace_path = args.trace
+    if trace_path is None:
+        trace_path = args.record
+        print(f'Recorded {record_shift(trace_path, args.tables, args.visits)} actions -> {trace_path}')
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+
+    results = run(trace_path, args.repeats, baseline, args.threshold)
+    write_results(args.output, results)
+    verified = {True: 'final state matches', False: 'FINAL STATE DIFFERS', None: 'unverified (no final state)'}
+    print(f"{results['actions']} actions replayed in {results['replay_s']:.3f} s ({results['actions_per_s']:.0f} "
+          f"actions/s, recorded over {results['recorded_s']:.1f} s), {results['errors']} errors, "
+          f"{verified[results['verified']]}")
+    for action, stats in results['timings'].items():
+        change = results.get('changes', {}).get(action)
+        versus = '' if change is None else (f"  x{change['p50_ratio']:.2f} p50, x{change['p99_ratio']:.2f} p99"
+                                            f"{'  SLOWER' if change['slower'] else ''}")
+        print(f"{action:>36}: {stats['count']:>7} calls, p50 {stats['p50_us']:8.1f} us, p99 {stats['p99_us']:9.1f} us"
+              f"{versus}")
+    print(f'-> {args.output}')
@@ -0,0 +1,259 @@
+"""
+
+    Description:
+        Scaling benchmark of one Restaurant under more and more concurrent terminals, each in a process of its own.
+        The restaurant is hosted by the terminal server (server.py) in its own process, since a Restaurant can't be
+        shared between processes, and for every worker count asked for, that many worker processes script it at
+        once through the controller operations (see protocol.py/Notes 2):
+            servers - open a random table and seat (seat_touched), add a few items (add_item), sometimes take one
+                      back out (remove_spec_item), place the rest (update_order) and go back to the restaurant
+            cooks   - kitchen displays pressing the button of the placed items they get pushed (button_pressed),
+                      picked at random among the oldest few, until they're served
+        Workers run closed loops (each waits for a reply before its next request), so throughput only grows with
+        the worker count for as long as the server has room to spare.
+
+        Reports, for each worker count: requests per second and the scaling efficiency (throughput over the worker
+        count times the throughput of one worker), the latency percentiles of every operation and of all of them
+        together, the contention (requests turned down because another worker got there first: an item served or
+        cancelled by someone else), and the CPU time of the server process over the wall time. The server runs
+        everything on one thread (see server.py/Notes 2), so a server CPU use close to 1 means that one core is
+        the limit, and adding workers from there only adds latency.
+
+        Run it from the root of the project with:
+            python -m benchmarks.scaling [--workers 1,2,4,8,16] [--cook-share F] [--seconds S] [--output FILE]
+
+"""
+
+# ---- Importing built-in Libraries ----
+
+import argparse
+import asyncio
+import itertools
+import multiprocessing
+import random
+import time
+from array import array
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# ---- Importing from other modules -----
+
+from benchmarks.common import large_layout, LatencyRecorder, write_results
+from benchmarks.terminals import run_server
+from client import TerminalClient
+from model import Restaurant, EventKind, Status
+from protocol import ProtocolError
+
+
+# Share of the items added by a server that it takes back out before placing the order
+REMOVE_SHARE = 0.2
+
+# Number of the oldest items in the kitchen a cook picks the next one to advance from
+COOK_CHOICES = 8
+
+
+
+class Pushed:
+    """ What a worker learns from the pushes it gets: the last item requested at each seat, and the items in the
+    kitchen (an insertion-ordered set of item ids). """
+
+    def __init__(self):
+        """ Constructor to the Pushed class. """
+        self.requested = {}
+        self.in_kitchen = {}
+
+
+    def on_push(self, push):
+        if push.kind == EventKind.ITEM_REQUESTED:
+            self.requested[(push.table_number, push.seat)] = push.item_id
+        elif push.kind == EventKind.ITEM_PLACED:
+            self.in_kitchen[push.item_id] = None
+        elif push.kind == EventKind.ITEM_CANCELLED or push.status == Status.SERVED:
+            self.in_kitchen.pop(push.item_id, None)
+
+
+
+# --------- Defining Separate Functions -----------
+
+def run_worker(role, seed, address, seconds, shape, started, results):
+    """ Function runs one worker of <role> ('server' or 'cook') against the terminal server at <address> for
+    <seconds> seconds, starting once every worker and the main process are waiting on the multiprocessing.Barrier
+    <started>. Puts the dict of the worker's samples (operation name -> array bytes), conflicts and running time
+    in the multiprocessing.Queue <results>. <shape> is the (tables, seats per table, menu items) of the
+    restaurant. """
+    results.put(asyncio.run(_worker(role, random.Random(seed), address, seconds, shape, started)))
+
+
+async def _worker(role, rng, address, seconds, shape, started):
+    """ Connects, waits for the start and runs the worker's loop. Returns its results. """
+    recorder = LatencyRecorder()
+    pushed = Pushed()
+    client = await TerminalClient.connect(*address, on_push = pushed.on_push)
+    if role == 'cook':
+        await client.kitchen()
+    started.wait()
+
+    start = time.monotonic()
+    loop = server_loop if role == 'server' else cook_loop
+    conflicts = await loop(client, recorder, pushed, rng, shape, start + seconds)
+    elapsed = time.monotonic() - start
+    await client.close()
+    return {'role': role, 'conflicts': conflicts, 'elapsed': elapsed,
+            'samples': {name: samples.tobytes() for name, samples in recorder.samples.items()}}
+
+
+async def timed(recorder, name, request, *args):
+    """ Awaits <request> with <args>, recording its round trip under <name>. Returns its result. """
+    start = time.perf_counter()
+    result = await request(*args)
+    recorder.add(name, time.perf_counter() - start)
+    return result
+
+
+async def server_loop(client, recorder, pushed, rng, shape, deadline):
+    """ Takes orders through <client> until <deadline>. Returns the number of requests turned down. """
+    n_tables, seats_per_table, n_menu_items = shape
+    conflicts = 0
+    while time.monotonic() < deadline:
+        table, seat = rng.randrange(n_tables), rng.randrange(seats_per_table)
+        await timed(recorder, 'table_touched', client.table_touched, table)
+        await timed(recorder, 'seat_touched', client.seat_touched, seat)
+        for _ in range(rng.randint(1, 5)):
+            await timed(recorder, 'add_item', client.add_item, rng.randrange(n_menu_items))
+            item_id = pushed.requested.pop((table, seat), None)
+            if item_id is not None and rng.random() < REMOVE_SHARE:
+                try:
+                    await timed(recorder, 'remove_spec_item', client.remove_item, item_id)
+                except ProtocolError:
+                    # Another server working the same seat placed it meanwhile
+                    conflicts += 1
+        await timed(recorder, 'update_order', client.update_order)
+        await timed(recorder, 'done', client.done)
+    return conflicts
+
+
+async def cook_loop(client, recorder, pushed, rng, shape, deadline):
+    """ Advances the items pushed to <client> until <deadline>. Returns the number of requests turned down. """
+    conflicts = 0
+    while time.monotonic() < deadline:
+        if not pushed.in_kitchen:
+            await asyncio.sleep(0.001)
+            continue
+        item_id = rng.choice(list(itertools.islice(pushed.in_kitchen, COOK_CHOICES)))
+        try:
+            await timed(recorder, 'button_pressed', client.button_pressed, item_id)
+        except ProtocolError:
+            # Another cook served it first, or its server cancelled it
+            pushed.in_kitchen.pop(item_id, None)
+            conflicts += 1
+    return conflicts
+
+
+def run_workers(n_workers, cook_share, seconds, address, shape):
+    """ Function runs <n_workers> worker processes against the server at <address>, <cook_share> of them cooks,
+    and returns their merged LatencyRecorder, the conflicts, the wall time they ran for and the number of
+    cooks. """
+    n_cooks = min(n_workers - 1, round(n_workers * cook_share))
+    roles = ['cook'] * n_cooks + ['server'] * (n_workers - n_cooks)
+    started = multiprocessing.Barrier(n_workers + 1)
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target = run_worker, args = (role, ix, address, seconds, shape, started,
+                                                                    results), daemon = True)
+               for ix, role in enumerate(roles)]
+    for worker in workers:
+        worker.start()
+    started.wait()
+
+    recorder = LatencyRecorder()
+    conflicts = 0
+    elapsed = 0
+    for _ in workers:
+        result = results.get()
+        conflicts += result['conflicts']
+        elapsed = max(elapsed, result['elapsed'])
+        for name, samples in result['samples'].items():
+            recorder.samples.setdefault(name, array('d')).frombytes(samples)
+    for worker in workers:
+        worker.join()
+    return recorder, conflicts, elapsed, n_cooks
+
+
+def run_count(n_workers, cook_share, seconds, n_tables, seats_per_table):
+    """ Function starts a fresh server, runs <n_workers> workers against it, stops it and returns the dict of
+    results. """
+    addresses = multiprocessing.Queue()
+    server = multiprocessing.Process(target = run_server, args = (n_tables, seats_per_table, addresses), daemon = True)
+    server.start()
+    try:
+        address = addresses.get(timeout = 60)
+        shape = (n_tables, seats_per_table, len(Restaurant(large_layout(1)).menu_items))
+        recorder, conflicts, elapsed, n_cooks = run_workers(n_workers, cook_share, seconds, address, shape)
+    finally:
+        cpu_before = _children_cpu()
+        server.terminate()
+        server.join()
+    server_cpu = None if cpu_before is None else _children_cpu() - cpu_before
+
+    everything = LatencyRecorder()
+    everything.samples['all'] = array('d', (sample for samples in recorder.samples.values() for sample in samples))
+    operations = recorder.summary()
+    requests = sum(stats['count'] for stats in operations.values())
+    return {'workers': n_workers,
+            'cooks': n_cooks,
+            'wall_s': elapsed,
+            'requests': requests,
+            'requests_per_s': requests / elapsed,
+            'conflicts': conflicts,
+            'conflicts_per_1k_requests': 1000 * conflicts / requests if requests else None,
+            'server_cpu_share': server_cpu / elapsed if server_cpu is not None else None,
+            'latency': everything.summary()['all'],
+            'operations': operations}
+
+
+def run(worker_counts, cook_share, seconds, n_tables, seats_per_table):
+    """ Function runs every worker count of <worker_counts> in turn, and returns the dict of results. """
+    runs = [run_count(n_workers, cook_share, seconds, n_tables, seats_per_table) for n_workers in worker_counts]
+    single = runs[0]['requests_per_s'] / runs[0]['workers']
+    for result in runs:
+        result['scaling_efficiency'] = result['requests_per_s'] / (result['workers'] * single)
+    return {'parameters': {'worker_counts': worker_counts, 'cook_share': cook_share, 'seconds': seconds,
+                           'tables': n_tables, 'seats_per_table': seats_per_table,
+                           'cpus': multiprocessing.cpu_count()},
+            'runs': runs}
+
+
+
+def _children_cpu():
+    """ Returns the CPU seconds used so far by the child processes that have been waited for, or None where it
+    can't be read. """
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default = '1,2,4,8,16',
+                        help = 'comma-separated worker counts to run, in order (the first one is the baseline)')
+    parser.add_argument('--cook-share', type = float, default = 0.25)
+    parser.add_argument('--seconds', type = float, default = 5)
+    parser.add_argument('--tables', type = int, default = 2_000)
+    parser.add_argument('--seats', type = int, default = 8)
+    parser.add_argument('--output', default = 'benchmark_scaling.json')
+    args = parser.parse_args()
+
+    results = run([int(count) for count in args.workers.split(',')], args.cook_share, args.seconds, args.tables,
+                  args.seats)
+    write_results(args.output, results)
+    for result in results['runs']:
+        latency = result['latency']
+        print(f"{result['workers']:>4} workers: {result['requests_per_s']:9.0f} requests/s, efficiency "
+              f"{result['scaling_efficiency']:5.2f}, p50 {latency['p50_us']:8.1f} us, p99 {latency['p99_us']:9.1f} us, "
+              f"p99.9 {latency['p99.9_us']:9.1f} us, {result['conflicts']} conflicts, server CPU "
+              f"{result['server_cpu_share'] or 0:.2f}")
+    print(f'-> {args.output}')
@@ -0,0 +1,118 @@
+"""
+
+    Description:
+        Shift benchmark. Drives the RestaurantController, TableController, OrderController and KitchenController
+        through a simulated service with headless views: servers open a random seat, tap in a few items, sometimes
+        take one back, then place or cancel the order, while the kitchen works through the placed items oldest
+        first. Every controller call, every scheduler flush, and regular probes of has_any_active_orders(),
+        notify_views() and a kitchen render are timed.
+
+        Reports per-operation latency percentiles and throughput, and the peak memory of the run, to a JSON file
+        so that the results of two builds can be compared.
+
+        Run it from the root of the project with:
+            python -m benchmarks.shift [--tables N] [--seats N] [--items N] [--output FILE]
+
+"""
+
+# ---- Importing built-in Libraries ----
+
+import argparse
+import random
+import time
+from collections import deque
+
+
+# ---- Importing from other modules -----
+
+from benchmarks.common import large_restaurant, LatencyRecorder, peak_memory, write_results
+from headless import HeadlessServerView, HeadlessKitchenView
+from scheduler import RedrawScheduler
+
+
+# How often (in seat visits) the hot paths get probed on their own
+PROBE_EVERY = 100
+
+
+def run_shift(n_tables, seats_per_table, n_items, items_per_visit = 4, seed = 0):
+    """ Function runs a shift in which <n_items> items get ordered over <n_tables> tables of <seats_per_table>
+    seats, about <items_per_visit> at a time. Returns the dict of results. """
+    rng = random.Random(seed)
+    restaurant = large_restaurant(n_tables, seats_per_table)
+    menu_items = restaurant.menu_items
+
+    # The views share a scheduler flushed after every action, as tkinter would once idle again
+    idle_callbacks = deque()
+    scheduler = RedrawScheduler(idle_callbacks.append)
+    server = HeadlessServerView(restaurant, scheduler)
+    kitchen = HeadlessKitchenView(restaurant, scheduler)
+    recorder = LatencyRecorder()
+
+    def act(name, function, *args):
+        recorder.time(name, function, *args)
+        while idle_callbacks:
+            recorder.time('flush', idle_callbacks.popleft())
+
+    # Placed items not yet served, oldest first, which is the order the kitchen works through them in
+    kitchen_queue = deque()
+
+    started = time.perf_counter()
+    ordered = visits = 0
+    while ordered < n_items:
+        table_number = rng.randrange(n_tables)
+        act('table_touched', server.controller.table_touched, table_number)
+        act('seat_touched', server.controller.seat_touched, rng.randrange(seats_per_table))
+        order = server.controller.order
+
+        for _ in range(min(rng.randint(1, 2 * items_per_visit - 1), n_items - ordered)):
+            act('add_item', server.controller.add_item, menu_items[rng.randrange(len(menu_items))])
+            ordered += 1
+        if rng.random() < 0.1:
+            act('remove_spec_item', server.controller.remove_spec_item, order.unordered_items()[-1])
+
+        if rng.random() < 0.05:
+            act('cancel_changes', server.controller.cancel_changes)
+        else:
+            kitchen_queue.extend(order.unordered_items())
+            act('update_order', server.controller.update_order)
+        act('done', server.controller.done)
+
+        # The kitchen keeps pace, taking each item it picks up from PLACED to SERVED
+        for _ in range(min(items_per_visit, len(kitchen_queue))):
+            item = kitchen_queue.popleft()
+            while not item.has_been_served():
+                act('button_pressed', kitchen.controller.button_pressed, item)
+
+        visits += 1
+        if visits % PROBE_EVERY == 0:
+            recorder.time('has_any_active_orders', restaurant.tables[table_number].has_any_active_orders)
+            act('notify_views', restaurant.notify_views)
+            recorder.time('kitchen_render', kitchen.redraw)
+
+    elapsed = time.perf_counter() - started
+    return {'parameters': {'tables': n_tables, 'seats_per_table': seats_per_table, 'items': n_items,
+                           'items_per_visit': items_per_visit, 'seed': seed},
+            'wall_s': elapsed,
+            'items_per_s': n_items / elapsed,
+            'peak_memory_bytes': peak_memory(),
+            'scheduler': scheduler.stats(),
+            'operations': recorder.summary()}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tables', type = int, default = 2_000)
+    parser.add_argument('--seats', type = int, default = 8)
+    parser.add_argument('--items', type = int, default = 1_000_000)
+    parser.add_argument('--items-per-visit', type = int, default = 4)
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--output', default = 'benchmark_shift.json')
+    args = parser.parse_args()
+
+    results = run_shift(args.tables, args.seats, args.items, args.items_per_visit, args.seed)
+    write_results(args.output, results)
+    for name, stats in results['operations'].items():
+        print(f"{name:>22}: {stats['count']:>9} calls, p50 {stats['p50_us']:8.1f} us, "
+              f"p99 {stats['p99_us']:8.1f} us, {stats['throughput_per_s']:12.0f} /s")
+    print(f"{results['items_per_s']:.0f} items/s, peak memory {results['peak_memory_bytes']} bytes "
+          f"-> {args.output}")
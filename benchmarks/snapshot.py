@@ -0,0 +1,111 @@
+"""
+
+    Description:
+        Snapshot benchmark. Fills a restaurant of 10k tables with 1M items in every status, then saves and restores
+        it with snapshot.py, and compares the size, time and peak memory against pickling the same state as plain
+        tuples and rebuilding it one Order.restore_item() at a time.
+
+        Run it from the root of the project with:
+            python -m benchmarks.snapshot [--tables N] [--items N] [--output benchmark_snapshot.json]
+
+"""
+
+# ---- Importing built-in Libraries ----
+
+import argparse
+import gc
+import pickle
+import time
+import tracemalloc
+
+
+# ---- Importing from other modules -----
+
+import snapshot
+from benchmarks.common import large_restaurant, fill_orders, write_results
+from model import Restaurant
+
+
+def build(n_tables, n_items):
+    """ Function returns a restaurant of <n_tables> tables with <n_items> placed items, a third of which got
+    cooked, a sixth got ready and a twelfth got served. """
+    restaurant = large_restaurant(n_tables)
+    fill_orders(restaurant, n_items)
+    items = list(restaurant.items_by_id.values())
+    restaurant.advance_items(items[::3])
+    restaurant.advance_items(items[::6])
+    restaurant.advance_items(items[::12])
+    return restaurant
+
+
+def naive_dumps(restaurant):
+    """ Function returns the pickle of every order of <restaurant> as (table number, seat, [(item id, menu item id,
+    status, ordered)]) tuples, along with its layout. """
+    menu_ids = restaurant.menu_ids()
+    orders = [(table.number, seat, [(item.id, menu_ids[item.details], int(item.status), item.has_been_ordered())
+                                    for item in order.items])
+              for table in restaurant.tables.loaded() for seat, order in table.orders.items()]
+    layout = list(zip(restaurant.tables.names, restaurant.tables.rows))
+    return pickle.dumps((layout, orders), pickle.HIGHEST_PROTOCOL)
+
+
+def naive_loads(data):
+    """ Function returns the Restaurant pickled by naive_dumps(), rebuilt an item at a time. """
+    layout, orders = pickle.loads(data)
+    restaurant = Restaurant(layout)
+    menu_items = list(restaurant.menu_items)
+    for table_number, seat, items in orders:
+        order = restaurant.tables[table_number].order_for(seat)
+        for item_id, menu_id, status, ordered in items:
+            order.restore_item(menu_items[menu_id], status, ordered, item_id)
+    return restaurant
+
+
+def traced_bytes(function, *args):
+    """ Function returns the memory (as traced by tracemalloc) still held by what calling <function> with <args>
+    returned, and the most it had allocated at once along the way. """
+    gc.collect()
+    tracemalloc.start()
+    result = function(*args)
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return held, peak
+
+
+def timed(function, *args):
+    """ Function returns what <function> returned along with the seconds it took, untraced. """
+    gc.collect()
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def run(n_tables, n_items):
+    """ Function returns a dict of the size, save and load times and load memory of both ways. """
+    restaurant = build(n_tables, n_items)
+    results = {'tables': n_tables, 'items': n_items}
+    for name, dumps, loads in (('snapshot', snapshot.dumps, snapshot.loads), ('pickle', naive_dumps, naive_loads)):
+        data, save_s = timed(dumps, restaurant)
+        restored, load_s = timed(loads, data)
+        assert restored.total == restaurant.total and len(restored.items_by_id) == len(restaurant.items_by_id)
+        del restored
+        held, peak = traced_bytes(loads, data)
+        results[name] = {'bytes': len(data), 'save_s': save_s, 'load_s': load_s, 'restaurant_bytes': held,
+                         'load_overhead_bytes': peak - held}
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tables', type = int, default = 10_000)
+    parser.add_argument('--items', type = int, default = 1_000_000)
+    parser.add_argument('--output', default = 'benchmark_snapshot.json')
+    args = parser.parse_args()
+    results = run(args.tables, args.items)
+    write_results(args.output, results)
+    for name in ('snapshot', 'pickle'):
+        stats = results[name]
+        print(f"{name:>10}: {stats['bytes']:>10} bytes, saved in {stats['save_s']:6.2f} s, loaded in "
+              f"{stats['load_s']:6.2f} s, {stats['load_overhead_bytes']:>11} bytes over the restaurant's own")
+    print(f'-> {args.output}')
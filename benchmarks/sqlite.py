@@ -0,0 +1,133 @@
+"""
+
+    Description:
+        SQLite store benchmark. Orders and places items in a big restaurant, then has the kitchen advance part of
+        them, once with the in-memory model alone and once with a SqliteStore following it, and compares how long
+        the writes took and how long the kitchen's and the reports' queries take: Python scans over the model versus
+        the store's indexed SQL. The store's writes are also timed unbatched (one transaction per row) on a slice of
+        the items, to show what batching them buys.
+
+        Run it from the root of the project with:
+            python -m benchmarks.sqlite [--tables N] [--items N] [--queries N] [--output FILE]
+
+"""
+
+# ---- Importing built-in Libraries ----
+
+import argparse
+import os
+import tempfile
+import time
+from collections import Counter
+
+
+# ---- Importing from other modules -----
+
+from benchmarks.common import large_restaurant, fill_orders, LatencyRecorder, write_results
+from model import Status
+from sqlite_store import SqliteStore
+
+
+# Items ordered in the unbatched run, which is a lot slower
+UNBATCHED_ITEMS = 20_000
+
+
+def run_backend(n_tables, n_items, n_queries, path = None, batch_size = None):
+    """ Function runs the benchmark on the in-memory model, with a SqliteStore at <path> following it unless <path>
+    is None. Returns the dict of its results. """
+    restaurant = large_restaurant(n_tables)
+    store = None
+    if path is not None:
+        store = SqliteStore(path, restaurant) if batch_size is None else SqliteStore(path, restaurant,
+                                                                                     batch_size = batch_size)
+
+    started = time.perf_counter()
+    orders = fill_orders(restaurant, n_items)
+    advanced = 0
+    for ix, order in enumerate(orders):
+        for item in order.items[:ix % 3]:
+            while not item.has_been_served():
+                item.advance_status()
+                advanced += 1
+    if store is not None:
+        store.flush()
+    write_s = time.perf_counter() - started
+
+    results = {'write_s': write_s, 'items_per_s': n_items / write_s, 'advances': advanced}
+    if n_queries:
+        queries = sql_queries(store) if store is not None else memory_queries(restaurant)
+        recorder = LatencyRecorder()
+        for ix in range(n_queries):
+            for name, query in queries.items():
+                recorder.time(name, query, ix % n_tables)
+        results['queries'] = recorder.summary()
+        results['kitchen_items'] = len(queries['kitchen_items'](0))
+
+    if store is not None:
+        store.close()
+        results['database_bytes'] = os.path.getsize(path)
+    return results
+
+
+def memory_queries(restaurant):
+    """ Function returns the queries of the benchmark answered by scanning the in-memory model. """
+    def all_items():
+        return (item for table in restaurant.tables.loaded() for order in table.orders.values()
+                for item in order.items)
+
+    def status_counts(_):
+        counts = Counter(item.status for item in all_items())
+        return {status: counts[status] for status in Status}
+
+    def revenue_by_menu_item(_):
+        revenue = Counter()
+        for item in all_items():
+            if item.has_been_ordered():
+                revenue[item.details] += item.details.price
+        return revenue
+
+    return {'kitchen_items': lambda _: [item for number in restaurant.active_table_numbers()
+                                        for item in restaurant.active_items_for(number)],
+            'table_items': lambda number: [item for _, order in sorted(restaurant.tables[number].orders.items())
+                                           for item in order.items],
+            'status_counts': status_counts,
+            'revenue_by_menu_item': revenue_by_menu_item,
+            'table_totals': lambda _: {table.number: table.total_cost() for table in restaurant.tables.loaded()
+                                       if table.total_cost()}}
+
+
+def sql_queries(store):
+    """ Function returns the queries of the benchmark answered by the SqliteStore <store>. """
+    return {'kitchen_items': lambda _: store.kitchen_items(),
+            'table_items': store.table_items,
+            'status_counts': lambda _: store.status_counts(),
+            'revenue_by_menu_item': lambda _: store.revenue_by_menu_item(),
+            'table_totals': lambda _: store.table_totals()}
+
+
+def run(n_tables, n_items, n_queries):
+    """ Function runs every part of the benchmark, and returns the dict of results. """
+    with tempfile.TemporaryDirectory() as directory:
+        return {'parameters': {'tables': n_tables, 'items': n_items, 'queries': n_queries},
+                'memory': run_backend(n_tables, n_items, n_queries),
+                'sqlite': run_backend(n_tables, n_items, n_queries, os.path.join(directory, 'batched.db')),
+                'sqlite_unbatched': run_backend(n_tables, min(n_items, UNBATCHED_ITEMS), 0,
+                                                os.path.join(directory, 'unbatched.db'), batch_size = 1)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tables', type = int, default = 10_000)
+    parser.add_argument('--items', type = int, default = 1_000_000)
+    parser.add_argument('--queries', type = int, default = 20)
+    parser.add_argument('--output', default = 'benchmark_sqlite.json')
+    args = parser.parse_args()
+
+    results = run(args.tables, args.items, args.queries)
+    write_results(args.output, results)
+    for backend in ('memory', 'sqlite', 'sqlite_unbatched'):
+        print(f"{backend:>16}: {results[backend]['items_per_s']:10.0f} items/s written")
+    for name in results['memory']['queries']:
+        memory, sqlite = results['memory']['queries'][name], results['sqlite']['queries'][name]
+        print(f"{name:>22}: memory p50 {memory['p50_us']:12.1f} us, sqlite p50 {sqlite['p50_us']:12.1f} us")
+    print(f'-> {args.output}')
@@ -0,0 +1,136 @@
+"""
+
+    Description:
+        Startup benchmark. Starts the OORMS the way app.py does, in a fresh interpreter each time, for each mode:
+        each window headless, both of them headless, and each window and both of them with tkinter. Reports, as the
+        median over the repeats, the seconds spent importing (app.py and the modules the mode's views need), building
+        the restaurant and rendering the views for the first time, along with the whole process' wall time
+        (interpreter start-up and exit included), the number of modules it loaded and whether tkinter was one.
+
+        Windowed modes need a display. Where there isn't one, they get reported with the phases they got through
+        (the imports) and the error that stopped them.
+
+        Run it from the root of the project with:
+            python -m benchmarks.startup [--modes headless-server,...,both] [--repeats N] [--output FILE]
+
+"""
+
+# ---- Importing built-in Libraries ----
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+
+# ---- Importing from other modules -----
+
+from benchmarks.common import write_results
+
+
+# Mode -> (windows, headless)
+MODES = {'headless-server': (('server',), True),
+         'headless-kitchen': (('kitchen',), True),
+         'headless-both': (('server', 'kitchen'), True),
+         'server': (('server',), False),
+         'kitchen': (('kitchen',), False),
+         'both': (('server', 'kitchen'), False)}
+
+# Script run by the fresh interpreter for one start-up: times its phases and prints them as JSON on its last line,
+# up to the error that stopped it if any. It only imports time, sys and json before the clock starts, so the
+# import phase pays for everything else.
+CHILD = """
+import time
+start = time.perf_counter()
+import json, sys
+windows, headless = {windows!r}, {headless!r}
+result = {{}}
+try:
+    import app
+    app.view_classes(windows, headless)
+    result['import_s'] = time.perf_counter() - start
+    result['modules'] = len(sys.modules)
+    result['tkinter'] = 'tkinter' in sys.modules
+    built = time.perf_counter()
+    from model import Restaurant
+    restaurant = Restaurant()
+    result['restaurant_s'] = time.perf_counter() - built
+    rendered = time.perf_counter()
+    if headless:
+        app.start_headless(restaurant, windows)
+    else:
+        root = app.start_windows(restaurant, windows)[0]
+        root.update()
+    result['render_s'] = time.perf_counter() - rendered
+except Exception as error:
+    result['error'] = f'{{type(error).__name__}}: {{error}}'
+print(json.dumps(result))
+"""
+
+# The phases timed by the child, and the process' wall time
+PHASES = ('import_s', 'restaurant_s', 'render_s', 'process_s')
+
+
+
+# --------- Defining Separate Functions -----------
+
+def start_once(mode):
+    """ Function starts the OORMS in <mode> in a fresh interpreter. Returns the dict the child printed, along with
+    the wall time of the whole process. """
+    windows, headless = MODES[mode]
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, '-c', CHILD.format(windows = windows, headless = headless)],
+                               capture_output = True, text = True)
+    elapsed = time.perf_counter() - start
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        return {'error': completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else
+                f'exited with {completed.returncode}'}
+    result = json.loads(lines[-1])
+    result['process_s'] = elapsed
+    return result
+
+
+def run_mode(mode, repeats):
+    """ Function starts the OORMS <repeats> times in <mode>, and returns the median of each phase. A start-up that
+    failed stops the repeats, and only the phases it got through get reported, along with its error. """
+    starts = []
+    for _ in range(repeats):
+        starts.append(start_once(mode))
+        if 'error' in starts[-1]:
+            break
+    summary = {phase: statistics.median(result[phase] for result in starts) for phase in PHASES
+               if all(phase in result for result in starts)}
+    if 'error' in starts[-1]:
+        summary['error'] = starts[-1]['error']
+    else:
+        summary['startup_s'] = summary['import_s'] + summary['restaurant_s'] + summary['render_s']
+    for key in ('modules', 'tkinter'):
+        if key in starts[0]:
+            summary[key] = starts[0][key]
+    return summary
+
+
+def run(modes, repeats):
+    """ Function returns the dict of the results of every mode of <modes>. """
+    return {'parameters': {'modes': modes, 'repeats': repeats},
+            'modes': {mode: run_mode(mode, repeats) for mode in modes}}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', default = ','.join(MODES), help = 'comma-separated modes to start, among '
+                                                                     + ', '.join(MODES))
+    parser.add_argument('--repeats', type = int, default = 5)
+    parser.add_argument('--output', default = 'benchmark_startup.json')
+    args = parser.parse_args()
+
+    results = run(args.modes.split(','), args.repeats)
+    write_results(args.output, results)
+    for mode, result in results['modes'].items():
+        phases = ', '.join(f"{phase[:-2]} {result[phase] * 1e3:.1f} ms" for phase in PHASES if phase in result)
+        print(f"{mode:>16}: {phases}, {result.get('modules', '?')} modules"
+              f"{', tkinter' if result.get('tkinter') else ''}{', ' + result['error'] if 'error' in result else ''}")
+    print(f'-> {args.output}')
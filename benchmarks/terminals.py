@@ -0,0 +1,161 @@
+"""
+
+    Description:
+        Terminal server load benchmark. Starts the terminal server (server.py) on loopback in a process of its own,
+        then connects hundreds of simulated terminals to it from this one: server terminals that keep taking orders
+        (open a table and a seat, add a few items, place them, go back to the restaurant), and kitchen displays, a few
+        of which also work as cooks, advancing the items they get pushed to SERVED. Every request's round trip and
+        every push's latency (from the change on the server to the push reaching its terminal) is recorded.
+
+        Reports requests per second and the latency percentiles of each operation and of each kind of push to a
+        JSON file. The terminals all share this process's event loop, so with enough of them the client side
+        becomes the bottleneck: compare runs made on the same machine with the same numbers of terminals.
+
+        Run it from the root of the project with:
+            python -m benchmarks.terminals [--servers N] [--kitchens N] [--cooks N] [--seconds S] [--output FILE]
+
+"""
+
+# ---- Importing built-in Libraries ----
+
+import argparse
+import asyncio
+import multiprocessing
+import random
+import time
+
+
+# ---- Importing from other modules -----
+
+from benchmarks.common import large_layout, LatencyRecorder, write_results
+from client import TerminalClient
+from model import Restaurant, EventKind, Status
+from protocol import ProtocolError
+from server import serve
+
+
+def run_server(n_tables, seats_per_table, addresses):
+    """ Function serves a restaurant of <n_tables> tables on a free loopback port until killed, putting the
+    address it listens on in the queue <addresses>. """
+    restaurant = Restaurant(large_layout(n_tables, seats_per_table))
+    asyncio.run(serve(restaurant, port = 0, ready = lambda listening: addresses.put(listening[0])))
+
+
+async def timed(recorder, name, request, *args):
+    """ Awaits <request> with <args>, recording its round trip under <name>. Returns its result. """
+    start = time.perf_counter()
+    result = await request(*args)
+    recorder.add(name, time.perf_counter() - start)
+    return result
+
+
+async def server_terminal(client, recorder, rng, n_tables, seats_per_table, n_menu_items, deadline):
+    """ Takes orders through <client> until <deadline>. """
+    while time.monotonic() < deadline:
+        await timed(recorder, 'table_touched', client.table_touched, rng.randrange(n_tables))
+        await timed(recorder, 'seat_touched', client.seat_touched, rng.randrange(seats_per_table))
+        for _ in range(rng.randint(1, 5)):
+            await timed(recorder, 'add_item', client.add_item, rng.randrange(n_menu_items))
+        await timed(recorder, 'update_order', client.update_order)
+        await timed(recorder, 'done', client.done)
+
+
+async def cook(client, recorder, placed, deadline):
+    """ Advances the items of the seats in the asyncio.Queue <placed> to SERVED through <client> until
+    <deadline>. """
+    while time.monotonic() < deadline:
+        try:
+            table, seat = await asyncio.wait_for(placed.get(), deadline - time.monotonic())
+        except asyncio.TimeoutError:
+            return
+        items = await timed(recorder, 'order', client.order, table, seat)
+        for item_id, _, status, ordered in items:
+            if ordered and status < Status.SERVED:
+                for _ in range(Status.SERVED - status):
+                    try:
+                        await timed(recorder, 'button_pressed', client.button_pressed, item_id)
+                    except ProtocolError:
+                        # Another cook got to it first
+                        break
+
+
+async def run_terminals(address, n_servers, n_kitchens, n_cooks, seconds, n_tables, seats_per_table, n_menu_items):
+    """ Function runs the simulated terminals against the server at <address>, and returns the dict of results. """
+    host, port = address
+    recorder = LatencyRecorder()
+    pushes = LatencyRecorder()
+
+    def on_push(push):
+        pushes.add(push.kind.name, push.latency())
+
+    # The first kitchen display also queues up each seat whose items got placed (once per request placing them)
+    # for the cooks to work through
+    placed = asyncio.Queue()
+    last_placed = [None]
+
+    def on_placed_push(push):
+        on_push(push)
+        if push.kind == EventKind.ITEM_PLACED and (push.table_number, push.seat) != last_placed[0]:
+            last_placed[0] = (push.table_number, push.seat)
+            placed.put_nowait(last_placed[0])
+
+    servers = [await TerminalClient.connect(host, port, on_push = on_push) for _ in range(n_servers)]
+    kitchens = [await TerminalClient.connect(host, port, on_push = on_placed_push if ix == 0 else on_push)
+                for ix in range(n_kitchens)]
+    for kitchen in kitchens:
+        await kitchen.kitchen()
+
+    started = time.monotonic()
+    deadline = started + seconds
+    tasks = [server_terminal(client, recorder, random.Random(ix), n_tables, seats_per_table, n_menu_items, deadline)
+             for ix, client in enumerate(servers)]
+    tasks += [cook(kitchen, recorder, placed, deadline) for kitchen in kitchens[:n_cooks]]
+    await asyncio.gather(*tasks)
+    elapsed = time.monotonic() - started
+
+    for client in servers + kitchens:
+        await client.close()
+    operations = recorder.summary()
+    requests = sum(stats['count'] for stats in operations.values())
+    return {'wall_s': elapsed,
+            'requests': requests,
+            'requests_per_s': requests / elapsed,
+            'pushes_received': sum(stats['count'] for stats in pushes.summary().values()),
+            'operations': operations,
+            'push_latency': pushes.summary()}
+
+
+def run(n_servers, n_kitchens, n_cooks, seconds, n_tables, seats_per_table):
+    """ Function starts the server, runs the terminals against it, stops it and returns the dict of results. """
+    addresses = multiprocessing.Queue()
+    server = multiprocessing.Process(target = run_server, args = (n_tables, seats_per_table, addresses), daemon = True)
+    server.start()
+    try:
+        address = addresses.get(timeout = 60)
+        n_menu_items = len(Restaurant(large_layout(1)).menu_items)
+        results = asyncio.run(run_terminals(address, n_servers, n_kitchens, n_cooks, seconds, n_tables,
+                                            seats_per_table, n_menu_items))
+    finally:
+        server.terminate()
+        server.join()
+    return {'parameters': {'servers': n_servers, 'kitchens': n_kitchens, 'cooks': n_cooks, 'seconds': seconds,
+                           'tables': n_tables, 'seats_per_table': seats_per_table},
+            **results}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--servers', type = int, default = 300)
+    parser.add_argument('--kitchens', type = int, default = 20)
+    parser.add_argument('--cooks', type = int, default = 4)
+    parser.add_argument('--seconds', type = float, default = 10)
+    parser.add_argument('--tables', type = int, default = 2_000)
+    parser.add_argument('--seats', type = int, default = 8)
+    parser.add_argument('--output', default = 'benchmark_terminals.json')
+    args = parser.parse_args()
+
+    results = run(args.servers, args.kitchens, args.cooks, args.seconds, args.tables, args.seats)
+    write_results(args.output, results)
+    for name, stats in list(results['operations'].items()) + list(results['push_latency'].items()):
+        print(f"{name:>22}: {stats['count']:>9}, p50 {stats['p50_us']:10.1f} us, p99 {stats['p99_us']:10.1f} us")
+    print(f"{results['requests_per_s']:.0f} requests/s, {results['pushes_received']} pushes -> {args.output}")
@@ -0,0 +1,175 @@
+"""
+
+    Description:
+        Module that contains the client side of the terminal server's protocol (see protocol.py and server.py): what a
+        remote server terminal or kitchen display uses to drive the restaurant and hear about its changes.
+
+    Classes defined in this module:
+        - Push Class
+        - TerminalClient Class
+
+    Notes:
+        1 - Requests can be pipelined: every request method returns once its own reply is in, and any number of them
+        may be waiting at once (from several tasks, say).
+
+"""
+
+# ---- Importing built-in Libraries ----
+
+import asyncio
+import time
+
+
+# ---- Importing from other modules -----
+
+from constants import SERVER_HOST, SERVER_PORT
+from model import EventKind, Status
+from protocol import (PUSH, REPLY, ORDER_ITEM, FRAME_PUSH, FRAME_REPLY, RESULT_OK, NO_SEAT, NO_ITEM, ProtocolError,
+                      read_frame, request_frame, OP_TABLE_TOUCHED, OP_SEAT_TOUCHED, OP_ADD_ITEM, OP_REMOVE_ITEM,
+                      OP_UPDATE_ORDER, OP_CANCEL_CHANGES, OP_DONE, OP_KITCHEN, OP_BUTTON_PRESSED, OP_ORDER)
+
+
+
+class Push:
+    """ Change pushed by the server. <seat>, <item_id> and <menu_id> are None when the change has none. """
+
+    __slots__ = ('kind', 'table_number', 'seat', 'item_id', 'menu_id', 'status', 'server_time', 'received')
+
+    def __init__(self, body, received):
+        """ Constructor to the Push class, decoding the push frame body <body> received at <received>
+        (time.monotonic()). """
+        kind, self.table_number, seat, item_id, menu_id, status, self.server_time = PUSH.unpack(body)
+        self.kind = EventKind(kind)
+        self.seat = None if seat == NO_SEAT else seat
+        self.item_id = None if item_id == NO_ITEM else item_id
+        self.menu_id = None if menu_id == NO_ITEM else menu_id
+        self.status = Status(status)
+        self.received = received
+
+
+    def latency(self):
+        """ Function returns the seconds between the change on the server and its push arriving here (see
+        protocol.py/Notes 4). """
+        return self.received - self.server_time
+
+
+
+class TerminalClient:
+    """ Connection of a remote terminal to the terminal server. """
+
+    def __init__(self, reader, writer, on_push = None):
+        """ Constructor to the TerminalClient class. Use connect() rather than calling it directly.
+
+        <on_push> is called with every Push the server sends. """
+
+        self.reader = reader
+        self.writer = writer
+        self.on_push = on_push
+
+        # Sequence number of the next request, and the futures of the requests waiting for their replies
+        self.sequence = 0
+        self.waiting = {}
+        self.reading = asyncio.ensure_future(self._read())
+
+
+    @classmethod
+    async def connect(cls, host = SERVER_HOST, port = SERVER_PORT, path = None, on_push = None):
+        """ Returns a TerminalClient connected to the server at <host>:<port>, or at the unix socket <path>. """
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer, on_push)
+
+
+    # ---------------- Defining Methods ----------------
+
+    async def request(self, operation, table = 0, seat = 0, index = 0):
+        """ Method sends the request <operation> and returns the payload of its reply. Raises ProtocolError if the
+        server couldn't carry it out. """
+        self.sequence += 1
+        reply = self.waiting[self.sequence] = asyncio.get_running_loop().create_future()
+        self.writer.write(request_frame(self.sequence, operation, table, seat, index))
+        return await reply
+
+
+    async def table_touched(self, table):
+        await self.request(OP_TABLE_TOUCHED, table = table)
+
+
+    async def seat_touched(self, seat):
+        await self.request(OP_SEAT_TOUCHED, seat = seat)
+
+
+    async def add_item(self, menu_id):
+        await self.request(OP_ADD_ITEM, index = menu_id)
+
+
+    async def remove_item(self, item_id):
+        await self.request(OP_REMOVE_ITEM, index = item_id)
+
+
+    async def update_order(self):
+        await self.request(OP_UPDATE_ORDER)
+
+
+    async def cancel_changes(self):
+        await self.request(OP_CANCEL_CHANGES)
+
+
+    async def done(self):
+        await self.request(OP_DONE)
+
+
+    async def kitchen(self):
+        """ Method turns this terminal into a kitchen display. """
+        await self.request(OP_KITCHEN)
+
+
+    async def button_pressed(self, item_id):
+        await self.request(OP_BUTTON_PRESSED, index = item_id)
+
+
+    async def order(self, table, seat):
+        """ Function returns the (item id, menu item id, Status, ordered) of every item of the order of seat <seat>
+        of table <table>. """
+        payload = await self.request(OP_ORDER, table, seat)
+        return [(item_id, menu_id, Status(status), bool(ordered))
+                for item_id, menu_id, status, ordered in ORDER_ITEM.iter_unpack(payload)]
+
+
+    async def close(self):
+        """ Method disconnects from the server. """
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+        await self.reading
+
+
+    async def _read(self):
+        """ Reads the server's frames until it disconnects, handing out replies and pushes. """
+        try:
+            while True:
+                frame_type, body = await read_frame(self.reader)
+                if frame_type == FRAME_PUSH:
+                    if self.on_push is not None:
+                        self.on_push(Push(body, time.monotonic()))
+                elif frame_type == FRAME_REPLY:
+                    sequence, result = REPLY.unpack_from(body)
+                    reply = self.waiting.pop(sequence, None)
+                    if reply is None or reply.done():
+                        # A reply to a request given up on (cancelled), or that this client never sent
+                        continue
+                    if result == RESULT_OK:
+                        reply.set_result(body[REPLY.size:])
+                    else:
+                        reply.set_exception(ProtocolError(body[REPLY.size:].decode()))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for reply in self.waiting.values():
+                if not reply.done():
+                    reply.set_exception(ConnectionError('disconnected from the server'))
+            self.waiting.clear()
@@ -0,0 +1,227 @@
+"""
+
+    Description:
+        Module that contains the optional columnar store of a restaurant's order items. It keeps one row per
+        OrderItem in parallel arrays (status code, menu item id, price, table, seat and ordered flag), so that
+        questions like "how many items are in each Status" or "how much has each menu item made" are answered with
+        a few vectorized passes over flat arrays instead of walking the Table -> Order -> OrderItem object graph.
+
+    Classes defined in this module:
+        - ItemColumns Class
+
+    Notes:
+        1 - The columns are array.array objects, so they need nothing outside the standard library. When NumPy is
+        installed, the queries wrap the arrays in zero-copy NumPy views and use bincount and boolean masks; without
+        it they fall back to plain loops over the same arrays.
+
+        2 - The model objects stay the source of truth. The store subscribes to the restaurant's change events and
+        mirrors every item requested, placed, advanced or cancelled into its row, so the model pays nothing
+        when no store is attached. The events come from whichever thread changed the model (see model.py/Notes 1),
+        so the rows get written under the restaurant's SeqLock (Restaurant.changes), like the model's own shared
+        state: two items never get mirrored at once, and a query run through Restaurant.read() sees the columns
+        as of one moment.
+
+        3 - Status codes are stored as int(Status), which already is a small integer since Status is an IntEnum.
+        Rows of cancelled items are marked FREE and reused by the next item requested.
+
+"""
+
+# ---- Importing built-in Libraries ----
+
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# ---- Importing from other modules -----
+
+from model import Status, EventKind
+
+
+# Status code of a row that holds no item
+FREE = -2
+
+# Offset that makes every status code (FREE included) a valid bincount index
+_STATUS_OFFSET = -FREE
+
+
+
+class ItemColumns:
+    """ Columnar mirror of every OrderItem of a Restaurant, kept up to date through its change events. """
+
+    def __init__(self, restaurant):
+        """ Constructor to the ItemColumns class.
+
+        Loads every item already ordered in <restaurant> into the columns, then subscribes to the restaurant's
+        change events to follow the items that come and go from then on. """
+
+        self.restaurant = restaurant
+
+        # Menu item id of each MenuItem object: its index in the restaurant's menu
+        self.menu_ids = restaurant.menu_ids()
+
+        # The parallel columns, one row per item
+        self.status = array('b')
+        self.menu_item = array('i')
+        self.price = array('d')
+        self.table = array('i')
+        self.seat = array('i')
+        self.ordered = array('b')
+
+        # OrderItem object of each row (None for a FREE row), row of each OrderItem object, and the FREE rows
+        self.items = []
+        self.rows = {}
+        self.free_rows = []
+
+        for table in restaurant.tables.loaded():
+            for seat, order in table.orders.items():
+                for item in order.items:
+                    self._insert(table.number, seat, item)
+
+        self.subscription = restaurant.subscribe(self.on_event)
+
+
+    # ---------------- Defining Methods ----------------
+
+    def close(self):
+        """ Method stops the columns from following the restaurant's changes. """
+        self.restaurant.unsubscribe(self.subscription)
+
+
+    def on_event(self, event):
+        """ Method mirrors the ChangeEvent <event> into the columns, under the restaurant's SeqLock (see Notes 2). """
+        with self.restaurant.changes:
+            if event.kind == EventKind.ITEM_REQUESTED:
+                self._insert(event.table_number, event.seat, event.item)
+            elif event.kind == EventKind.ITEM_CANCELLED:
+                self._delete(event.item)
+            elif event.item is not None:
+                self._update(event.item)
+            elif event.items is not None:
+                for item in event.items:
+                    self._update(item)
+
+
+    def __len__(self):
+        """ Returns the number of items in the columns. """
+        return len(self.rows)
+
+
+    def status_counts(self):
+        """ Function returns a dict of the number of items in each Status. """
+        counts = _bincount(self._column(self.status, _STATUS_OFFSET), None, len(Status) + _STATUS_OFFSET)
+        return {status: int(counts[int(status) + _STATUS_OFFSET]) for status in Status}
+
+
+    def revenue_by_menu_item(self, ordered_only = True):
+        """ Function returns a dict of the total price of the items of each MenuItem object. Only counts the items
+        that have been ordered, unless <ordered_only> is False. """
+        keep = self._column(self.ordered) if ordered_only else self._live()
+        sums = _bincount(self._column(self.menu_item), _where(keep, self._column(self.price)), len(self.menu_ids))
+        return {menu_item: float(sums[ix]) for menu_item, ix in self.menu_ids.items()}
+
+
+    def average_price_by_table(self):
+        """ Function returns a dict of the average item price of each table that has items. """
+        n_tables = len(self.restaurant.tables)
+        tables = self._column(self.table)
+        live = self._live()
+        sums = _bincount(tables, _where(live, self._column(self.price)), n_tables)
+        counts = _bincount(tables, _where(live, None), n_tables)
+        return {table: float(sums[table]) / int(counts[table]) for table in range(n_tables) if counts[table]}
+
+
+    def items_where(self, status = None, table = None, menu_item = None):
+        """ Function returns the OrderItem objects in the given <status>, at the given <table> number and of the
+        given <menu_item> MenuItem object. Arguments left to None don't filter. """
+        if numpy is not None:
+            mask = self._live()
+            if status is not None:
+                mask &= self._column(self.status) == int(status)
+            if table is not None:
+                mask &= self._column(self.table) == table
+            if menu_item is not None:
+                mask &= self._column(self.menu_item) == self.menu_ids[menu_item]
+            return [self.items[row] for row in numpy.flatnonzero(mask)]
+
+        menu_id = None if menu_item is None else self.menu_ids[menu_item]
+        return [self.items[row] for row in range(len(self.items))
+                if self.status[row] != FREE
+                and (status is None or self.status[row] == int(status))
+                and (table is None or self.table[row] == table)
+                and (menu_id is None or self.menu_item[row] == menu_id)]
+
+
+    def _insert(self, table_number, seat, item):
+        """ Puts OrderItem <item>, ordered by seat <seat> of table <table_number>, into a FREE row or a new one. """
+        values = (int(item.status), self.menu_ids[item.details], item.details.price, table_number, seat,
+                  item.has_been_ordered())
+        columns = (self.status, self.menu_item, self.price, self.table, self.seat, self.ordered)
+        if self.free_rows:
+            row = self.free_rows.pop()
+            for column, value in zip(columns, values):
+                column[row] = value
+            self.items[row] = item
+        else:
+            row = len(self.items)
+            for column, value in zip(columns, values):
+                column.append(value)
+            self.items.append(item)
+        self.rows[item] = row
+
+
+    def _delete(self, item):
+        """ Marks the row of OrderItem <item> as FREE. """
+        row = self.rows.pop(item)
+        self.status[row] = FREE
+        self.ordered[row] = False
+        self.items[row] = None
+        self.free_rows.append(row)
+
+
+    def _update(self, item):
+        """ Copies the status and ordered flag of OrderItem <item> into its row. """
+        row = self.rows[item]
+        self.status[row] = int(item.status)
+        self.ordered[row] = item.has_been_ordered()
+
+
+    def _column(self, column, offset = 0):
+        """ Returns <column> (plus <offset>) as a NumPy array when NumPy is available, otherwise as a list. """
+        if numpy is not None:
+            values = numpy.frombuffer(column, dtype = column.typecode)
+            return values + offset if offset else values
+        return [value + offset for value in column] if offset else column
+
+
+    def _live(self):
+        """ Returns the mask of the rows that hold an item. """
+        if numpy is not None:
+            return numpy.frombuffer(self.status, dtype = 'b') != FREE
+        return [code != FREE for code in self.status]
+
+
+
+# --------- Defining Separate Functions -----------
+
+def _where(mask, values):
+    """ Returns <values> where <mask> is set and 0 elsewhere. With <values> None, returns 1 where <mask> is set. """
+    if numpy is not None:
+        mask = numpy.asarray(mask, dtype = bool)
+        return mask.astype(numpy.float64) if values is None else numpy.where(mask, values, 0.0)
+    if values is None:
+        return [1 if keep else 0 for keep in mask]
+    return [value if keep else 0.0 for keep, value in zip(mask, values)]
+
+
+def _bincount(keys, weights, length):
+    """ Returns the list (or NumPy array) of the sums of <weights> (or counts, if None) of each key in <keys>. """
+    if numpy is not None:
+        return numpy.bincount(numpy.asarray(keys, dtype = numpy.int64), weights = weights, minlength = length)
+    sums = [0] * length
+    for ix, key in enumerate(keys):
+        sums[key] += 1 if weights is None else weights[ix]
+    return sums
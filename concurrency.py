@@ -0,0 +1,97 @@
+"""
+
+    Description:
+        Module that contains the locks that make the model safe to use from several threads at once: a journal
+        writer, a terminal server, a kitchen printer or a report running next to the Tk event loop. See model.py's
+        Notes for which lock guards what.
+
+    Classes defined in this module:
+        - SeqLock Class
+
+    Notes:
+        1 - A SeqLock is a writer lock with a version number: writers hold it (with ... :) while they change what it
+        guards, and the version is odd for as long as one of them does. Readers don't take it. read() runs the
+        reading function, and runs it again if a writer was at work when it started or has been since (the version
+        moved), so what it returns was read while nothing changed. Reads never hold writers up, and writers only
+        make a read start over.
+
+        2 - A reader unlucky enough to start over SEQLOCK_RETRIES times in a row (writers never letting up) takes
+        the lock for its last try, so that it can't starve.
+
+        3 - The lock is reentrant, and the version only moves when the outermost section starts and ends, so a
+        method holding it can call another one that takes it too.
+
+"""
+
+# ---- Importing built-in Libraries ----
+
+import threading
+import time
+
+
+# ---- Importing from other modules -----
+
+from constants import SEQLOCK_RETRIES
+
+
+
+class SeqLock:
+    """ Reentrant writer lock with optimistic, lock-free reads (see Notes 1). """
+
+    __slots__ = ('lock', 'version', 'depth', 'owner')
+
+    def __init__(self):
+        """ Constructor to the SeqLock class. """
+
+        self.lock = threading.RLock()
+
+        # Even while no writer holds the lock, odd while one does, how deep the holder's sections nest, and the
+        # holder's thread id
+        self.version = 0
+        self.depth = 0
+        self.owner = None
+
+
+    # ---------------- Defining Methods ----------------
+
+    def __enter__(self):
+        self.lock.acquire()
+        self.depth += 1
+        if self.depth == 1:
+            self.owner = threading.get_ident()
+            self.version += 1
+        return self
+
+
+    def __exit__(self, *exc_info):
+        if self.depth == 1:
+            self.version += 1
+            self.owner = None
+        self.depth -= 1
+        self.lock.release()
+
+
+    def read(self, function):
+        """ Function returns what <function> (called without arguments) returns once it ran without any writer
+        holding the lock meanwhile. <function> may get called several times, so it shouldn't change anything. An
+        exception it raises while a writer got in the way gets it called again rather than passed on. Called by the
+        thread holding the lock, it just returns what <function> returns. """
+        if self.owner == threading.get_ident():
+            return function()
+        for _ in range(SEQLOCK_RETRIES):
+            version = self.version
+            if version % 2 == 0:
+                try:
+                    result = function()
+                except Exception:
+                    # Walking dicts a writer is changing can raise (a dict changing size, a key gone); only an
+                    # exception raised while nothing changed is the function's own
+                    if self.version == version:
+                        raise
+                else:
+                    if self.version == version:
+                        return result
+            # Letting the writer finish before trying again
+            time.sleep(0)
+        with self:
+            return function()
@@ -39,6 +39,56 @@ FULL_SEAT_STYLE = {'fill': '#090', 'outline': '#090'}
 SERVER_VIEW_WIDTH = 380
 SERVER_VIEW_HEIGHT = 500
 
+# Restaurant viewport constants (zoom is canvas pixels per floor plan unit, RESTAURANT_SCALE to start with)
+
+MIN_ZOOM = 0.05
+MAX_ZOOM = 2
+ZOOM_STEP = 1.25
+DRAG_THRESHOLD = 4      # pixels the pointer must move before a press turns into a pan rather than a click
+PAN_MARGIN = 40         # pixels of the floor plan that always stay in view when panning
+GRID_CELL_SIZE = 500    # floor plan units per side of the spatial index's cells
+
+# Redraw scheduler constants
+
+FRAME_BUDGET = 0.012  # seconds of redrawing per idle cycle before the rest waits for the next one
+
+# Scene constants
+
+SCENE_POOL_SIZE = 256   # hidden canvas items of each kind kept for reuse
+
+# Histogram constants (see histogram.py)
+
+HISTOGRAM_SMALLEST = 1e-6           # seconds, upper bound of the first bucket
+HISTOGRAM_BUCKETS_PER_OCTAVE = 8    # buckets per doubling, so percentiles come out within about 9%
+HISTOGRAM_OCTAVES = 40              # doublings covered, 1 us to about 12 days
+KITCHEN_HISTOGRAM_SMALLEST = 0.1    # the kitchen's stage times (see kitchen.py/KitchenTimes) cover 0.1 s...
+KITCHEN_HISTOGRAM_OCTAVES = 18      # ...to about 7 hours
+
+# Model constants (see model.py)
+
+ITEM_LIST_SCAN = 16     # items an order's ItemList gets searched by scanning, above which it builds an index
+
+# Concurrency constants (see concurrency.py)
+
+SEQLOCK_RETRIES = 64    # lock-free tries a read gets before it takes the lock
+
+# Order journal constants
+
+JOURNAL_BATCH_SIZE = 64         # records written per fsync at most
+JOURNAL_COMMIT_INTERVAL = 0.2   # seconds a record may wait for its batch to fill up
+SNAPSHOT_EVERY = 50_000         # records after which the journal gets compacted into a snapshot
+
+# SQLite store constants
+
+STORE_BATCH_SIZE = 512      # writes per transaction at most when the store isn't flushed on idle
+STORE_FLUSH_INTERVAL = 0.5  # seconds a write may wait for its batch to fill up when not flushed on idle
+
+# Terminal server constants
+
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 7320
+PUSH_BUFFER_LIMIT = 1 << 20     # bytes a terminal may leave unread before the server drops it as too slow
+
 # Kitchen view constants
 
 KITCHEN_VIEW_WIDTH = 325
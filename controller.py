@@ -19,12 +19,27 @@
         first before passing them into arguments, rather than declaring the object
         within a methods arguments. This is done so that creating the sequence diagrams is more clear.
 
+        2 - Each controller says which of the restaurant's change events its user interface shows, through
+        EVENT_KINDS and event_tables(). The views subscribe to exactly those whenever their controller changes, so
+        the controllers no longer call restaurant.notify_views() after changing the model. They only call
+        view.update() themselves when they switch the view to another user interface. view.update() just marks the
+        view dirty; its redraw is coalesced with any other pending one by the view's RedrawScheduler.
+
 """
 
+
+# ------ Importing from other modules ------
+
+from model import EventKind
+
+
 # ------ Creating Abstract Controller Class ---------
 
 class Controller:
 
+    # The kinds of change event that the user interface of this controller shows
+    EVENT_KINDS = frozenset()
+
     def __init__(self, view, restaurant):
         """ Constructor of Controller object.
 
@@ -36,12 +51,21 @@ class Controller:
         self.restaurant = restaurant
 
 
+    def event_tables(self):
+        """ Returns the numbers of the tables whose change events this controller's user interface shows,
+        or None for all of them. """
+        return None
+
+
 
 # --------- Creating Child Controller Classes ---------
 
 class RestaurantController(Controller):
     """ Controller for the restaurant view in the ServerView object. """
 
+    # The restaurant view only shows which seats are taken
+    EVENT_KINDS = frozenset({EventKind.TABLE_OCCUPANCY_CHANGED})
+
     # Uses its parents constructor
 
     def create_ui(self):
@@ -61,6 +85,9 @@ class RestaurantController(Controller):
 class TableController(Controller):
     """ Controller for the view of a given table within the restaurant in the ServerView object. """
 
+    # The table view only shows which of its seats are taken
+    EVENT_KINDS = frozenset({EventKind.TABLE_OCCUPANCY_CHANGED})
+
     def __init__(self, view, restaurant, table):
         """ Constructor of TableController object.
 
@@ -77,6 +104,11 @@ class TableController(Controller):
 
     # -------- Defining Methods --------
 
+    def event_tables(self):
+        """ Returns the number of this controller's table - the only one its user interface shows. """
+        return {self.table.number}
+
+
     def create_ui(self):
         """ Calling .create_ui() method calls the create_table_ui() back in the user interface.
         Essentially draws the specific table and associated chairs of this TableController onto the canvas. """
@@ -100,6 +132,10 @@ class TableController(Controller):
 
 class OrderController(Controller):
 
+    # The order view shows every item of its seat's order, along with its status
+    EVENT_KINDS = frozenset({EventKind.ITEM_REQUESTED, EventKind.ITEM_PLACED, EventKind.STATUS_ADVANCED,
+                             EventKind.ITEM_CANCELLED, EventKind.ITEMS_ADVANCED})
+
     def __init__(self, view, restaurant, table, seat_number):
         """ Constructor of OrderController object.
 
@@ -118,6 +154,11 @@ class OrderController(Controller):
 
     # --------- Defining Methods ---------
 
+    def event_tables(self):
+        """ Returns the number of the table whose seat's order this controller's user interface shows. """
+        return {self.table.number}
+
+
     def create_ui(self):
         """ Calling .create_ui() method calls the create_table_ui() back in the user interface.
         Essentially draws the order menu associated with the specific chair touched onto the canvas. """
@@ -127,10 +168,9 @@ class OrderController(Controller):
     def add_item(self, menu_item):
         """ Method that adds item to the "to be ordered" list when the order user interface is up.
 
-        Function does this by adding the item through the Order object's .add_item() method, and
-        updates the order user_interface by calling view.update().  """
+        Function does this by adding the item through the Order object's .add_item() method. The order
+        user interface is subscribed to ITEM_REQUESTED events, so it updates itself.  """
         self.order.add_item(menu_item)
-        self.view.update()
 
 
     def update_order(self):
@@ -138,16 +178,17 @@ class OrderController(Controller):
         to True. Furthermore, placed orders show up in the KitchenView window, and ServerView returns to the table
         that was previously click on. """
 
-        # Setting the __ordered attribute to true, and advancing status to PLACED.
-        self.order.place_new_orders()
-
         # Creating the table controller object and switching the controller back
         # in the view:ServerView to the created table controller
         table_controller = TableController(self.view, self.restaurant, self.table);
         self.view.set_controller(table_controller)
 
-        # Updating the ServerView and KitchenView user interfaces
-        self.restaurant.notify_views()
+        # Setting the __ordered attribute to true, and advancing status to PLACED.
+        # The KitchenView hears about it through the ITEM_PLACED events.
+        self.order.place_new_orders()
+
+        # Updating the ServerView user interface
+        self.view.update()
 
 
     def cancel_changes(self):
@@ -156,16 +197,16 @@ class OrderController(Controller):
         Method is called when 'Cancel' button in order user interface is pressed. After pressing, returns ServerView
         to the table associated with the chair whose order was just cancelled. """
 
-        # Removing the list of items in REQUESTED status/ whose __unordered is False
-        self.order.remove_unordered_items()
-
         # Creating the table controller object and switching the controller back
         # in the view:ServerView to the created table controller
         table_controller = TableController(self.view, self.restaurant, self.table);
         self.view.set_controller(table_controller)
 
-        # Updating the RestaurantView and KithcenView windows
-        self.restaurant.notify_views()
+        # Removing the list of items in REQUESTED status/ whose __unordered is False
+        self.order.remove_unordered_items()
+
+        # Updating the ServerView user interface
+        self.view.update()
 
 
     def remove_spec_item(self, this_item):
@@ -174,17 +215,18 @@ class OrderController(Controller):
 
         If item was in the PLACED status when cancelled, is also removed from the KitchenView window. """
 
-        # Removing the specific item from the order
+        # Removing the specific item from the order. The ServerView and KitchenView user interfaces
+        # hear about it through the ITEM_CANCELLED event.
         self.order.remove_item(this_item);
 
-        # Updating the ServerView and KitchenView user interfaces
-        self.restaurant.notify_views()
-
 
 
 class KitchenController(Controller):
     """ Controller associated with the KitchenView object.  """
 
+    # The kitchen view shows every item placed and not yet served
+    EVENT_KINDS = frozenset({EventKind.ITEM_PLACED, EventKind.STATUS_ADVANCED, EventKind.ITEM_CANCELLED,
+                             EventKind.ITEMS_ADVANCED})
 
     def create_ui(self):
         """ Calling .create_ui() method calls the create_table_ui() back in the user interface.
@@ -196,11 +238,45 @@ class KitchenController(Controller):
     def button_pressed(self, this_order_item):
         """ Advances status of order item pressed and updates the KitchenView user interface. """
 
-        # Advance the order item's status
+        # Advance the order item's status. The KitchenView user interface, and the ServerView user interface if it
+        # is showing this item's table, hear about it through the STATUS_ADVANCED event.
         this_order_item.advance_status();
 
-        # Update the KitchenView user interface and ServerView userinterface
-        self.restaurant.notify_views();
+
+    def advance_table(self, table_number, status = None):
+        """ Method advances every item of table <table_number> that is in the kitchen - or only those in Status
+        <status>, if given - by one step, in a single action. Returns the tuple of items advanced. """
+        items = self.restaurant.read(lambda: self.restaurant.active_items_for(table_number))
+        return self.advance_items(item for item in items if status is None or item.status == status)
+
+
+    def advance_menu_item(self, menu_item, status = None):
+        """ Method advances every item of the MenuItem object <menu_item> that is in the kitchen - or only those in
+        Status <status>, if given (every "House burger" currently COOKED, say) - by one step, in a single action.
+        Returns the tuple of items advanced. """
+        return self.advance_items(item for _, items in self.restaurant.active_snapshot() for item in items
+                                  if item.details is menu_item and (status is None or item.status == status))
+
+
+    def advance_items(self, items):
+        """ Method advances each OrderItem of <items> by one step, in a single action: the items all get checked
+        first (a ValueError is raised, and nothing changes, if one of them isn't in the kitchen), then advanced, and
+        the user interfaces hear about all of it through one ITEMS_ADVANCED event. Returns the tuple of items
+        advanced. """
+        return self.restaurant.advance_items(items)
+
+
+    def next_item(self):
+        """ Function returns the placed OrderItem the kitchen should start next, or None when nothing is waiting.
+        See kitchen.py for the order items come up in. The queue is changed under the restaurant's SeqLock, so it
+        gets read through Restaurant.read() (see model.py/Notes 2). """
+        return self.restaurant.read(self.restaurant.kitchen_queue.peek)
+
+
+    def reprioritize(self, table_number, priority):
+        """ Method sets the priority of table <table_number> in the kitchen queue to <priority>: the items of
+        tables of higher priority come up first, and 0 puts the table back in the ordinary queue. """
+        self.restaurant.reprioritize(table_number, priority)
 
 
 
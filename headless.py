@@ -0,0 +1,113 @@
+"""
+
+    Description:
+        Module that contains the non-graphical views of the OORMS. They replicate the public interface of the views
+        in oorms.py (set_controller, on_event, update, redraw and the create_*_ui methods) without needing tkinter or
+        a display, so the controllers can be driven by scripts: benchmarks, replays, back-office tools.
+
+        Like tests.ServerViewMock, the server view only remembers which user interface was last created. The kitchen
+        view does walk the restaurant's active items the way oorms.KitchenView does, so that its renders cost about
+        what the real ones do minus the canvas.
+
+    Classes defined in this module:
+        - HeadlessView Class
+        - HeadlessServerView Class (inherits HeadlessView)
+        - HeadlessKitchenView Class (inherits HeadlessView)
+
+"""
+
+# ---- Importing from other modules -----
+
+from controller import RestaurantController, KitchenController
+
+
+
+class HeadlessView:
+    """ Non-graphical stand-in for oorms.RestaurantView. """
+
+    def __init__(self, restaurant, controller_class, scheduler = None):
+        """ Constructor to the HeadlessView class.
+
+        <scheduler> is the RedrawScheduler that coalesces this view's redraws. Without one, update() redraws
+        straight away. """
+
+        self.restaurant = restaurant
+        self.scheduler = scheduler
+        self.last_UI_created = None
+        self.renders = 0
+
+        self.restaurant.add_view(self)
+        self.subscription = None
+        self.set_controller(controller_class(self, restaurant))
+        self.controller.create_ui()
+
+
+    # ---------------- Defining Methods ----------------
+
+    def set_controller(self, controller):
+        """ Same as oorms.RestaurantView.set_controller(). """
+        self.controller = controller
+        if self.subscription is not None:
+            self.restaurant.unsubscribe(self.subscription)
+        self.subscription = self.restaurant.subscribe(self.on_event, controller.EVENT_KINDS, controller.event_tables())
+
+
+    def on_event(self, event):
+        """ Same as oorms.RestaurantView.on_event(). """
+        self.update()
+
+
+    def update(self):
+        """ Method has the scheduler redraw this view when it next flushes, or redraws it now if there's none. """
+        if self.scheduler is not None:
+            self.scheduler.request(self)
+        else:
+            self.redraw()
+
+
+    def redraw(self):
+        """ Same as oorms.RestaurantView.redraw(). """
+        self.renders += 1
+        self.controller.create_ui()
+
+
+
+class HeadlessServerView(HeadlessView):
+    """ Non-graphical stand-in for oorms.ServerView. """
+
+    def __init__(self, restaurant, scheduler = None):
+        """ Constructor to the HeadlessServerView class. """
+        super().__init__(restaurant, RestaurantController, scheduler)
+
+
+    def create_restaurant_ui(self):
+        self.last_UI_created = 'restaurant'
+
+
+    def create_table_ui(self, table):
+        self.last_UI_created = ('table', table)
+
+
+    def create_order_ui(self, order):
+        self.last_UI_created = ('order', order)
+
+
+
+class HeadlessKitchenView(HeadlessView):
+    """ Non-graphical stand-in for oorms.KitchenView. """
+
+    def __init__(self, restaurant, scheduler = None):
+        """ Constructor to the HeadlessKitchenView class. """
+
+        # Number of rows (table titles and items) the last kitchen render would have drawn
+        self.rows = 0
+        super().__init__(restaurant, KitchenController, scheduler)
+
+
+    def create_kitchen_order_ui(self):
+        """ Walks the active items exactly like oorms.KitchenView.create_kitchen_order_ui(), counting the rows. """
+        rows = 0
+        for _, items in self.restaurant.active_snapshot():
+            rows += 1 + len(items)
+        self.rows = rows
+        self.last_UI_created = 'kitchen'
@@ -0,0 +1,126 @@
+"""
+
+    Description:
+        Module that contains a fixed-size histogram of durations, for timing things that keep happening for as long
+        as the restaurant runs (controller actions, renders, kitchen tickets): adding a value is O(1) and the memory
+        used doesn't grow with the number of values added, while percentiles can still be read off it at any time.
+
+    Classes defined in this module:
+        - Histogram Class
+
+    Notes:
+        1 - The buckets are log-scale: HISTOGRAM_BUCKETS_PER_OCTAVE buckets per doubling, from HISTOGRAM_SMALLEST
+        seconds up, HISTOGRAM_OCTAVES doublings wide (1 us to about 12 days by default). A value is counted in the
+        first bucket whose upper bound it doesn't exceed, so a percentile read off the buckets is at most
+        2 ** (1 / HISTOGRAM_BUCKETS_PER_OCTAVE) - 1 (about 9%) above the real one. Values below the first bucket
+        land in it, values above the last one land in the last one.
+
+        2 - The count, total, min and max are kept exactly, and percentiles never come out above the max.
+
+"""
+
+# ---- Importing built-in Libraries ----
+
+import math
+from array import array
+
+
+# ---- Importing from other modules -----
+
+from constants import HISTOGRAM_SMALLEST, HISTOGRAM_BUCKETS_PER_OCTAVE, HISTOGRAM_OCTAVES
+
+
+# Scale of the units a summary can be given in
+UNITS = {'s': 1, 'ms': 1e3, 'us': 1e6}
+
+
+
+class Histogram:
+    """ Log-bucketed histogram of durations in seconds (see Notes 1). """
+
+    __slots__ = ('smallest', 'per_octave', 'counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self, smallest = HISTOGRAM_SMALLEST, per_octave = HISTOGRAM_BUCKETS_PER_OCTAVE,
+                 octaves = HISTOGRAM_OCTAVES):
+        """ Constructor to the Histogram class. The first bucket holds values up to <smallest> seconds, each
+        following one holds values up to 2 ** (1 / <per_octave>) times more, and there are <octaves> doublings
+        of them. """
+
+        self.smallest = smallest
+        self.per_octave = per_octave
+        self.counts = array('Q', bytes(8 * per_octave * octaves))
+
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+
+    # ---------------- Defining Methods ----------------
+
+    def add(self, value):
+        """ Method counts the duration of <value> seconds. """
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if value <= self.smallest:
+            self.counts[0] += 1
+            return
+        bucket = math.ceil(math.log2(value / self.smallest) * self.per_octave)
+        if bucket >= len(self.counts):
+            bucket = len(self.counts) - 1
+        self.counts[bucket] += 1
+
+
+    def merge(self, other):
+        """ Method adds the values counted by the Histogram <other>, which must have the same buckets. """
+        if (other.smallest, other.per_octave, len(other.counts)) != (self.smallest, self.per_octave, len(self.counts)):
+            raise ValueError('Histograms with different buckets cannot be merged')
+        for bucket, count in enumerate(other.counts):
+            if count:
+                self.counts[bucket] += count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+
+    def upper_bound(self, bucket):
+        """ Function returns the largest value counted in bucket number <bucket>. """
+        return self.smallest * 2 ** (bucket / self.per_octave)
+
+
+    def percentile(self, fraction):
+        """ Function returns the value that <fraction> (0 to 1) of the values counted don't exceed, to within a
+        bucket (see Notes 1), or None if nothing has been counted. """
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(fraction * self.count))
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.upper_bound(bucket), self.max)
+        return self.max
+
+
+    def buckets(self):
+        """ Function returns the (upper bound, count) of every bucket that counted something. """
+        return [(self.upper_bound(bucket), count) for bucket, count in enumerate(self.counts) if count]
+
+
+    def summary(self, unit = 'us'):
+        """ Function returns a dict of the count and of the mean, min, p50, p90, p99, p99.9 and max of the values
+        counted, in <unit> ('s', 'ms' or 'us'). """
+        scale = UNITS[unit]
+        if not self.count:
+            return {'count': 0}
+        summary = {'count': self.count, f'mean_{unit}': self.total / self.count * scale,
+                   f'min_{unit}': self.min * scale}
+        for name, fraction in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('p999', 0.999)):
+            summary[f'{name}_{unit}'] = self.percentile(fraction) * scale
+        summary[f'max_{unit}'] = self.max * scale
+        return summary
@@ -0,0 +1,60 @@
+"""
+
+    Description:
+        Module that contains what the opt-in hooks on the controllers (the Profiler of profiling.py and the
+        TraceRecorder of traces.py) share: the controller classes they hook by default, and the wrapping of methods
+        on the classes themselves along with its undoing.
+
+    Functions defined in this module:
+        - wrap_method(installed, cls, name, make_wrapper): wraps a method of a class, on top of any other hook's
+        - unwrap_methods(installed): takes off every wrapper put on
+
+    Notes:
+        1 - The methods get wrapped on the classes rather than on instances, so the hooks see every controller,
+        including the ones created after they were installed, and cost nothing once unwrapped. Only the methods a
+        class defines itself get wrapped, so putting them back leaves the class exactly as it was.
+
+        2 - Several hooks may wrap the same method, and be uninstalled in any order. Each method wrapped keeps its
+        chain: the original function and the wrapper makers of the hooks on it, first installed first. Taking a
+        hook off rebuilds the method from the original with the makers left, so no wrapper of a hook uninstalled
+        stays called, nor gets put back by another hook's uninstalling.
+
+"""
+
+# ---- Importing from other modules -----
+
+from controller import RestaurantController, TableController, OrderController, KitchenController
+
+
+# The controller classes whose actions get hooked by default
+CONTROLLER_CLASSES = (RestaurantController, TableController, OrderController, KitchenController)
+
+# The (original function, wrapper makers) chain of each (class, name) wrapped (see Notes 2)
+_chains = {}
+
+
+
+# --------- Defining Separate Functions -----------
+
+def wrap_method(installed, cls, name, make_wrapper):
+    """ Function replaces the method <name> of the class <cls> by make_wrapper(method), the method being the one
+    other hooks may have wrapped already, and adds (class, name, maker) to the list <installed>. """
+    original, makers = _chains.setdefault((cls, name), (vars(cls)[name], []))
+    makers.append(make_wrapper)
+    installed.append((cls, name, make_wrapper))
+    setattr(cls, name, make_wrapper(vars(cls)[name]))
+
+
+def unwrap_methods(installed):
+    """ Function takes the wrappers of the list <installed> (see wrap_method()) off their methods, leaving the ones
+    of other hooks on (see Notes 2), and empties it. """
+    for cls, name, make_wrapper in reversed(installed):
+        original, makers = _chains[cls, name]
+        makers.remove(make_wrapper)
+        function = original
+        for maker in makers:
+            function = maker(function)
+        setattr(cls, name, function)
+        if not makers:
+            del _chains[cls, name]
+    installed.clear()
@@ -0,0 +1,333 @@
+"""
+
+    Description:
+        Module that contains the order journal, which makes a restaurant's open tickets survive a crash or a
+        restart of oorms.py. Every change made to the orders (items requested, placed, advanced and cancelled) gets
+        appended to a journal file as a small fixed-size binary record. Every so often, the whole state gets written
+        to a compact snapshot and the journal starts over, so recovering means loading the latest snapshot and
+        replaying only the records written since.
+
+    Classes defined in this module:
+        - Journal Class
+
+    Notes:
+        1 - The journal follows the model through the restaurant's change events, so it records exactly what
+        Order.add_item(), place_new_orders(), remove_item(), remove_unordered_items() and OrderItem.advance_status()
+        did, whichever controller (or script) called them.
+
+        2 - Group commit: an event only adds its records to a buffer, since it gets published from inside the
+        change (under the table's lock, on the Tk thread for a click). The journal's own thread writes the buffer
+        with a single fsync once JOURNAL_BATCH_SIZE records are waiting or JOURNAL_COMMIT_INTERVAL seconds went by,
+        whichever comes first, and takes the snapshots too, so no disk I/O ever holds up a change. A crash loses
+        at most the records of the batch that wasn't committed yet. commit() does the same on the calling thread,
+        for whoever needs the records on disk right away.
+
+        3 - Files in the journal directory: snapshot.bin holds the last snapshot and its generation number g, and
+        journal-g.bin holds the records written since that snapshot. Taking a snapshot writes generation g + 1
+        through a temporary file and an atomic rename before starting journal-(g + 1).bin, so a crash at any point
+        leaves a snapshot along with exactly the journal that follows it.
+
+        4 - Items are referred to by their ids in the restaurant's item registry (OrderItem.id), which the snapshots
+        save along with the next id to hand out, so a recovered item keeps its id. A torn record at the end of the
+        journal (crash mid-write) gets dropped on recovery.
+
+        5 - The model publishes its events from whichever thread changed it (see model.py/Notes 1), so the journal
+        takes its own lock to add records, commit and snapshot. A change is made before its event reaches the
+        journal, so a snapshot can already hold a change whose record only gets added after it, to the next
+        generation's journal. Replaying therefore skips the records the state already reflects: items already
+        requested, placed, cancelled, or already in the status an advance record says they got to.
+
+        6 - The kitchen queue's order survives recovery: placing records and the snapshots save the time each
+        queued item was placed at, and the tables' priorities get journaled and snapshotted. Times are saved as
+        wall clock times (time.time()), since the restaurant's clock is only meaningful within one process, and
+        recovered items get queued as placed as long ago as that.
+
+"""
+
+# ---- Importing built-in Libraries ----
+
+import os
+import struct
+import threading
+import time
+
+
+# ---- Importing from other modules -----
+
+from constants import JOURNAL_BATCH_SIZE, JOURNAL_COMMIT_INTERVAL, SNAPSHOT_EVERY
+from model import EventKind, Status
+
+
+# Journal record: operation, table number, seat, item id, the menu item id - or, for STATUS_ADVANCED, the status
+# the item advanced to (see Notes 5) - and, for ITEM_PLACED, the wall clock time the item was placed at (0 if it
+# already left the queue) or, for TABLE_REPRIORITIZED, the table's priority (see Notes 6)
+RECORD = struct.Struct('<BIHIHd')
+
+# Snapshot header (magic, version, generation, next item id, number of items, number of table priorities), item
+# record (table number, seat, item id, menu item id, status, ordered flag, wall clock time placed at if queued,
+# 0 otherwise) and table priority record (table number, priority)
+SNAPSHOT_HEADER = struct.Struct('<4sHIIII')
+SNAPSHOT_ITEM = struct.Struct('<IHIHbBd')
+SNAPSHOT_PRIORITY = struct.Struct('<Ii')
+SNAPSHOT_MAGIC = b'OORJ'
+SNAPSHOT_VERSION = 3
+
+# Journal operation codes of each EventKind (TABLE_OCCUPANCY_CHANGED follows from the others). An ITEMS_ADVANCED
+# event gets journaled as one STATUS_ADVANCED record per item.
+OPERATIONS = {EventKind.ITEM_REQUESTED: 1, EventKind.ITEM_PLACED: 2, EventKind.STATUS_ADVANCED: 3,
+              EventKind.ITEM_CANCELLED: 4, EventKind.ITEMS_ADVANCED: 3, EventKind.TABLE_REPRIORITIZED: 5}
+
+
+
+class Journal:
+    """ Append-only journal of a restaurant's order changes, with snapshots and crash recovery. """
+
+    def __init__(self, directory, restaurant, batch_size = JOURNAL_BATCH_SIZE,
+                 commit_interval = JOURNAL_COMMIT_INTERVAL, snapshot_every = SNAPSHOT_EVERY):
+        """ Constructor to the Journal class.
+
+        Recovers the state saved in <directory> (if any) into <restaurant>, which should have no orders yet, then
+        starts journaling its changes. <batch_size> and <commit_interval> control the group commits (see Notes 2),
+        and <snapshot_every> is the number of records after which a snapshot gets taken. """
+
+        self.directory = directory
+        self.restaurant = restaurant
+        self.batch_size = batch_size
+        self.commit_interval = commit_interval
+        self.snapshot_every = snapshot_every
+        os.makedirs(directory, exist_ok = True)
+
+        # Menu item id of each MenuItem object: its index in the restaurant's menu
+        self.menu_ids = restaurant.menu_ids()
+
+        # Lock the records get added to the buffer under, which the committing thread waits on, and lock the
+        # buffer gets written, and snapshots taken, under (see Notes 2 and 5)
+        self.lock = threading.RLock()
+        self.waiting = threading.Condition(self.lock)
+        self.write_lock = threading.RLock()
+
+        # Records waiting for the next commit, and records written since the last snapshot
+        self.pending = []
+        self.since_snapshot = 0
+        self.closing = False
+
+        # Wall clock time minus the time of the restaurant's clock, taken once so that items placed together are
+        # saved, and recovered, as placed at the same time (see Notes 6)
+        self.wall_offset = time.time() - restaurant.clock()
+
+        # Recovering the saved state, timing it, then opening the current journal for appending
+        started = time.perf_counter()
+        self.generation = self._load_snapshot()
+        self.replayed, valid_length = self._replay(self._journal_path(self.generation))
+        self.recovery_seconds = time.perf_counter() - started
+        self.since_snapshot = self.replayed
+
+        # Replaying stamped the items' status changes with the time of the replay, which says nothing about how
+        # long the kitchen took before the restart, so those stamps and the stage times they gave are dropped
+        for item in restaurant.items_by_id.values():
+            item.timestamps = None
+        restaurant.kitchen_times.clear()
+
+        self.file = open(self._journal_path(self.generation), 'ab')
+        self.file.truncate(valid_length)
+        self.subscription = restaurant.subscribe(self.on_event, OPERATIONS)
+        self.committer = threading.Thread(target = self._commit_loop, name = 'journal', daemon = True)
+        self.committer.start()
+
+
+    # ---------------- Defining Methods ----------------
+
+    def on_event(self, event):
+        """ Method adds the records of the ChangeEvent <event> to the buffer, waking the committing thread up once
+        a batch is waiting (see Notes 2). """
+        with self.lock:
+            if event.kind == EventKind.TABLE_REPRIORITIZED:
+                priority = self.restaurant.kitchen_queue.priorities.get(event.table_number, 0)
+                self.pending.append(RECORD.pack(OPERATIONS[event.kind], event.table_number, 0, 0, 0, priority))
+            elif event.items is not None:
+                for item in event.items:
+                    self._append(event.kind, item.order.table.number, item.order.seat, item)
+            else:
+                self._append(event.kind, event.table_number, event.seat, event.item)
+
+            if len(self.pending) >= self.batch_size:
+                self.waiting.notify()
+
+
+    def commit(self):
+        """ Method writes the records waiting to the journal with a single fsync, then takes a snapshot if enough
+        records went by since the last one. """
+        with self.write_lock:
+            self._write_pending()
+            if self.since_snapshot >= self.snapshot_every:
+                self.snapshot()
+
+
+    def snapshot(self):
+        """ Method saves the whole state of the restaurant's orders as the next generation's snapshot, and starts
+        that generation's journal (see Notes 3). """
+        with self.write_lock:
+            self._write_pending()
+            records, priorities = self.restaurant.read(self._snapshot_records)
+
+            generation = self.generation + 1
+            path = os.path.join(self.directory, 'snapshot.bin')
+            with open(path + '.tmp', 'wb') as snapshot_file:
+                snapshot_file.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, generation,
+                                                         self.restaurant.next_item_id, len(records), len(priorities)))
+                snapshot_file.write(b''.join(records))
+                snapshot_file.write(b''.join(SNAPSHOT_PRIORITY.pack(*priority) for priority in priorities))
+                snapshot_file.flush()
+                os.fsync(snapshot_file.fileno())
+            os.replace(path + '.tmp', path)
+
+            self.file.close()
+            old_path = self._journal_path(self.generation)
+            self.generation = generation
+            self.file = open(self._journal_path(generation), 'ab')
+            os.remove(old_path)
+            self.since_snapshot = 0
+
+
+    def close(self):
+        """ Method stops journaling, and commits the records waiting. """
+        self.restaurant.unsubscribe(self.subscription)
+        with self.lock:
+            self.closing = True
+            self.waiting.notify()
+        self.committer.join()
+        with self.write_lock:
+            self._write_pending()
+            self.file.close()
+
+
+    def _commit_loop(self):
+        """ Commits the records waiting whenever a batch of them is, or JOURNAL_COMMIT_INTERVAL went by, until the
+        journal gets closed. Runs on the journal's own thread (see Notes 2). """
+        while True:
+            with self.lock:
+                if not self.closing and len(self.pending) < self.batch_size:
+                    self.waiting.wait(self.commit_interval)
+                if self.closing:
+                    return
+            self.commit()
+
+
+    def _write_pending(self):
+        """ Writes the records waiting to the journal with a single fsync. The write lock has to be held. """
+        with self.lock:
+            pending, self.pending = self.pending, []
+        if pending:
+            self.file.write(b''.join(pending))
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.since_snapshot += len(pending)
+
+
+    def _append(self, kind, table_number, seat, item):
+        """ Queues the record of the change of EventKind <kind> to the OrderItem <item> of seat <seat> of table
+        <table_number>. The journal's lock has to be held. """
+        operation = OPERATIONS[kind]
+        last = int(item.status) if operation == 3 else self.menu_ids[item.details]
+        placed = 0
+        if operation == 2:
+            placed = self._wall_time(self.restaurant.read(lambda: self.restaurant.kitchen_queue.placed(item)))
+        self.pending.append(RECORD.pack(operation, table_number, seat, item.id, last, placed))
+
+
+    def _snapshot_records(self):
+        """ Returns the snapshot item records of every item of the restaurant, and the (table number, priority) of
+        every table that has one, for snapshot(). """
+        queue = self.restaurant.kitchen_queue
+        records = [SNAPSHOT_ITEM.pack(table.number, seat, item.id, self.menu_ids[item.details], int(item.status),
+                                      item.has_been_ordered(), self._wall_time(queue.placed(item)))
+                   for table in self.restaurant.tables.loaded() for seat, order in list(table.orders.items())
+                   for item in order.items]
+        return records, sorted(queue.priorities.items())
+
+
+    def _wall_time(self, placed):
+        """ Returns the wall clock time of the time <placed> of the restaurant's clock, or 0 for None (see Notes
+        6). """
+        return 0 if placed is None else placed + self.wall_offset
+
+
+    def _queue_time(self, wall_time):
+        """ Returns the time of the restaurant's clock of the wall clock time <wall_time>, or None (now) for 0. """
+        return wall_time - self.wall_offset if wall_time else None
+
+
+    def _journal_path(self, generation):
+        """ Returns the path of the journal of generation <generation>. """
+        return os.path.join(self.directory, f'journal-{generation}.bin')
+
+
+    def _load_snapshot(self):
+        """ Loads snapshot.bin into the restaurant, if there is one. Returns its generation (0 without one). """
+        path = os.path.join(self.directory, 'snapshot.bin')
+        if not os.path.exists(path):
+            return 0
+        with open(path, 'rb') as snapshot_file:
+            data = snapshot_file.read()
+        magic, version, generation, next_id, count, n_priorities = SNAPSHOT_HEADER.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f'{path} is not a version {SNAPSHOT_VERSION} OORMS snapshot')
+
+        # The ids of the items loaded with their own don't get handed out again, whatever order they come in
+        self.restaurant.next_item_id = max(self.restaurant.next_item_id, next_id)
+
+        priorities = SNAPSHOT_HEADER.size + count * SNAPSHOT_ITEM.size
+        for table_number, priority in SNAPSHOT_PRIORITY.iter_unpack(
+                data[priorities:priorities + n_priorities * SNAPSHOT_PRIORITY.size]):
+            self.restaurant.reprioritize(table_number, priority)
+
+        tables = self.restaurant.tables
+        menu_items = list(self.restaurant.menu_items)
+        orders = {}
+        for table_number, seat, item_id, menu_id, status, ordered, placed in SNAPSHOT_ITEM.iter_unpack(
+                data[SNAPSHOT_HEADER.size:priorities]):
+            order = orders.get((table_number, seat))
+            if order is None:
+                order = orders[table_number, seat] = tables[table_number].order_for(seat)
+            order.restore_item(menu_items[menu_id], status, ordered, item_id, self._queue_time(placed))
+        return generation
+
+
+    def _replay(self, path):
+        """ Replays the records of the journal at <path> onto the restaurant. Returns the number of records
+        replayed and the length of the journal up to the last whole record. """
+        if not os.path.exists(path):
+            return 0, 0
+        with open(path, 'rb') as journal_file:
+            data = journal_file.read()
+        valid_length = len(data) - len(data) % RECORD.size
+
+        tables = self.restaurant.tables
+        menu_items = list(self.restaurant.menu_items)
+        items = self.restaurant.items_by_id
+        orders = {}
+        count = 0
+        for operation, table_number, seat, item_id, last, value in RECORD.iter_unpack(data[:valid_length]):
+            # Records the state already reflects get skipped (see Notes 5)
+            count += 1
+            if operation == 3:
+                if items[item_id].status < last:
+                    items[item_id].advance_status()
+            elif operation == 4:
+                if item_id in items:
+                    self.restaurant.remove_item(item_id)
+            elif operation == 5:
+                self.restaurant.reprioritize(table_number, int(value))
+            elif operation != 1 or item_id not in items:
+                order = orders.get((table_number, seat))
+                if order is None:
+                    order = orders[table_number, seat] = tables[table_number].order_for(seat)
+                if operation == 1:
+                    order.restore_item(menu_items[last], Status.REQUESTED, False, item_id)
+                elif operation == 2:
+                    # Order.place_new_orders() places every item of the order not yet placed, and journals one
+                    # record for each of them, all placed at the same time, so the first of those records places
+                    # them all.
+                    if not items[item_id].has_been_ordered():
+                        order.place_new_orders(self._queue_time(value))
+        return count, valid_length
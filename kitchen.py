@@ -0,0 +1,279 @@
+"""
+
+    Description:
+        Module that contains the kitchen's ticket queue: the placed items waiting to be started, in the order the
+        kitchen should start them in. Finding the next item to cook is a look at the top of a heap rather than a scan
+        of every active item.
+
+    Classes defined in this module:
+        - KitchenQueue Class
+        - KitchenTimes Class
+
+    Notes:
+        1 - Items are ordered by the priority of their table first (higher goes first, 0 by default), then by the
+        time they were placed, then by course (MenuItem.course: the position of the item's section in the menu), so
+        the starters of a ticket (the items placed together) come up before its mains. Items placed at the same time
+        and of the same course stay in the order they were placed in.
+
+        2 - The queue is an indexed binary heap: it knows where each item sits in the heap, so taking an item out
+        (cancelled, or started out of turn) or changing the priority of a table's items is O(log n) per item, rather
+        than a rebuild of the heap.
+
+        3 - The model keeps the queue up to date: Order.place_new_orders() pushes the items it places,
+        Order.remove_item() (so OrderController.remove_spec_item()) takes them back out, and an item leaves the queue
+        once the kitchen starts cooking it. The restaurant's queue times its items with the restaurant's clock
+        (Restaurant.clock), the one the items' timestamps and the snapshots' ages are taken with.
+
+        4 - KitchenTimes keeps how long the items spend in each stage of the kitchen (PLACED->COOKED, COOKED->READY,
+        READY->SERVED, and PLACED->SERVED for the whole ticket) in Histograms, overall, per menu item and per table.
+        The model feeds it as items advance (see OrderItem.timestamps), and it can be queried at any time. Its
+        memory grows with the number of menu items and tables that had tickets, never with the number of tickets.
+
+        5 - KitchenTimes has no lock of its own: the model records into it under the restaurant's SeqLock
+        (Restaurant.changes, see model.py/Notes 1). Reading it while items may advance goes through
+        Restaurant.read(), as Restaurant.kitchen_summary() does; the other methods are for a quiescent restaurant.
+
+"""
+
+# ---- Importing built-in Libraries ----
+
+import heapq
+import time
+
+
+# ---- Importing from other modules -----
+
+from constants import HISTOGRAM_BUCKETS_PER_OCTAVE, KITCHEN_HISTOGRAM_SMALLEST, KITCHEN_HISTOGRAM_OCTAVES
+from histogram import Histogram
+
+
+
+class KitchenQueue:
+    """ Indexed priority queue of the placed items waiting to be started. """
+
+    def __init__(self, clock = time.monotonic):
+        """ Constructor to the KitchenQueue class. <clock> gives the time items get placed at. """
+
+        self.clock = clock
+
+        # The heap of [key, item, table number] entries, and the position of each item's entry in it
+        self.heap = []
+        self.positions = {}
+
+        # Priority of each table that has one, and the items queued for each table (insertion-ordered sets)
+        self.priorities = {}
+        self.tables = {}
+
+        # Tie-breaker keeping items of the same key in the order they got pushed
+        self.sequence = 0
+
+
+    # ---------------- Defining Methods ----------------
+
+    def __len__(self):
+        return len(self.heap)
+
+
+    def __contains__(self, item):
+        return item in self.positions
+
+
+    def push(self, items, table_number, placed = None):
+        """ Method queues the list of OrderItems <items> of table <table_number>, as placed together at the time
+        <placed> (now if None). """
+        priority = -self.priorities.get(table_number, 0)
+        if placed is None:
+            placed = self.clock()
+        queued = self.tables.setdefault(table_number, {})
+        for item in items:
+            self.sequence += 1
+            self.positions[item] = len(self.heap)
+            self.heap.append([(priority, placed, item.details.course, self.sequence), item, table_number])
+            queued[item] = None
+            self._sift_up(len(self.heap) - 1)
+
+
+    def extend(self, tickets):
+        """ Method queues the (items, table number, time placed) triples <tickets>, as returned by tickets(), like
+        push() would have when they were placed. Builds the heap once at the end rather than sifting each item in,
+        for restoring a saved restaurant. """
+        heap = self.heap
+        sequence = self.sequence
+        for items, table_number, placed in tickets:
+            priority = -self.priorities.get(table_number, 0)
+            queued = self.tables.setdefault(table_number, {})
+            for item in items:
+                sequence += 1
+                heap.append([(priority, placed, item.details.course, sequence), item, table_number])
+                queued[item] = None
+        self.sequence = sequence
+        heapq.heapify(heap)
+        self.positions = {entry[1]: position for position, entry in enumerate(heap)}
+
+
+    def placed(self, item):
+        """ Function returns the time <item> was placed at, or None if it isn't in the queue. """
+        position = self.positions.get(item)
+        return None if position is None else self.heap[position][0][1]
+
+
+    def peek(self):
+        """ Function returns the next item to start, or None if the queue is empty. """
+        return self.heap[0][1] if self.heap else None
+
+
+    def pop(self):
+        """ Function takes the next item to start out of the queue and returns it, or returns None if it's empty. """
+        item = self.peek()
+        if item is not None:
+            self.discard(item)
+        return item
+
+
+    def discard(self, item):
+        """ Method takes <item> out of the queue, if it is in it. """
+        position = self.positions.pop(item, None)
+        if position is None:
+            return
+        _, _, table_number = self.heap[position]
+        queued = self.tables[table_number]
+        del queued[item]
+        if not queued:
+            del self.tables[table_number]
+
+        last = self.heap.pop()
+        if position < len(self.heap):
+            self.heap[position] = last
+            self.positions[last[1]] = position
+            self._sift_down(self._sift_up(position))
+
+
+    def reprioritize(self, table_number, priority):
+        """ Method sets the priority of table <table_number> to <priority> (see Notes 1), moving its queued items
+        accordingly. """
+        if priority:
+            self.priorities[table_number] = priority
+        else:
+            self.priorities.pop(table_number, None)
+        for item in self.tables.get(table_number, ()):
+            position = self.positions[item]
+            entry = self.heap[position]
+            entry[0] = (-priority,) + entry[0][1:]
+            self._sift_down(self._sift_up(position))
+
+
+    def in_order(self):
+        """ Function returns the queued items, next one first. """
+        return [item for _, item, _ in sorted(self.heap, key = lambda entry: entry[0])]
+
+
+    def tickets(self):
+        """ Function returns the queued items as (items, table number, time placed) triples, next one first, each
+        holding a run of items of the same table placed at the same time (a ticket, or the part of one that's still
+        waiting). """
+        tickets = []
+        for (_, placed, _, _), item, table_number in sorted(self.heap, key = lambda entry: entry[0]):
+            if tickets and tickets[-1][1] == table_number and tickets[-1][2] == placed:
+                tickets[-1][0].append(item)
+            else:
+                tickets.append(([item], table_number, placed))
+        return tickets
+
+
+    def _sift_up(self, position):
+        """ Moves the entry at <position> up until its parent's key is smaller. Returns its new position. """
+        heap = self.heap
+        entry = heap[position]
+        while position > 0:
+            parent = (position - 1) // 2
+            if heap[parent][0] <= entry[0]:
+                break
+            heap[position] = heap[parent]
+            self.positions[heap[position][1]] = position
+            position = parent
+        heap[position] = entry
+        self.positions[entry[1]] = position
+        return position
+
+
+    def _sift_down(self, position):
+        """ Moves the entry at <position> down until both its children's keys are larger. """
+        heap = self.heap
+        entry = heap[position]
+        while True:
+            child = 2 * position + 1
+            if child >= len(heap):
+                break
+            if child + 1 < len(heap) and heap[child + 1][0] < heap[child][0]:
+                child += 1
+            if entry[0] <= heap[child][0]:
+                break
+            heap[position] = heap[child]
+            self.positions[heap[position][1]] = position
+            position = child
+        heap[position] = entry
+        self.positions[entry[1]] = position
+
+
+
+class KitchenTimes:
+    """ Streaming histograms of the time the items spend in each stage of the kitchen (see Notes 4). """
+
+    def __init__(self):
+        """ Constructor to the KitchenTimes class. """
+
+        # Stage name -> Histogram of every item's time in it, and the same per MenuItem object and per table number
+        self.overall = {}
+        self.by_menu_item = {}
+        self.by_table = {}
+
+
+    # ---------------- Defining Methods ----------------
+
+    def record(self, stage, elapsed, menu_item, table_number):
+        """ Method records that an item of the MenuItem <menu_item> at table <table_number> spent <elapsed> seconds
+        in the stage <stage>. """
+        by_menu_item = self.by_menu_item.get(menu_item)
+        if by_menu_item is None:
+            by_menu_item = self.by_menu_item[menu_item] = {}
+        by_table = self.by_table.get(table_number)
+        if by_table is None:
+            by_table = self.by_table[table_number] = {}
+        for histograms in (self.overall, by_menu_item, by_table):
+            histogram = histograms.get(stage)
+            if histogram is None:
+                histogram = histograms[stage] = Histogram(KITCHEN_HISTOGRAM_SMALLEST, HISTOGRAM_BUCKETS_PER_OCTAVE,
+                                                          KITCHEN_HISTOGRAM_OCTAVES)
+            histogram.add(elapsed)
+
+
+    def histogram(self, stage, menu_item = None, table_number = None):
+        """ Function returns the Histogram of the stage <stage>: of the MenuItem <menu_item> or of table
+        <table_number> if either is given, of every item otherwise. Returns None if nothing went through it yet. """
+        if menu_item is not None:
+            histograms = self.by_menu_item.get(menu_item, {})
+        elif table_number is not None:
+            histograms = self.by_table.get(table_number, {})
+        else:
+            histograms = self.overall
+        return histograms.get(stage)
+
+
+    def summary(self, unit = 's'):
+        """ Function returns a dict of the Histogram.summary() of every stage, overall, per menu item (by name) and
+        per table, in <unit>. It walks histograms the model records into under Restaurant.changes, so while the
+        model can change, call Restaurant.kitchen_summary() instead (see Notes 5). """
+        def summarize(histograms):
+            return {stage: histogram.summary(unit) for stage, histogram in histograms.items()}
+        return {'overall': summarize(self.overall),
+                'menu_items': {menu_item.name: summarize(histograms)
+                               for menu_item, histograms in self.by_menu_item.items()},
+                'tables': {table_number: summarize(histograms)
+                           for table_number, histograms in sorted(self.by_table.items())}}
+
+
+    def clear(self):
+        """ Method forgets every time recorded so far. """
+        self.overall.clear()
+        self.by_menu_item.clear()
+        self.by_table.clear()
@@ -0,0 +1,249 @@
+"""
+
+    Description:
+        Module that loads restaurant floor plans and menus from data files, and the lazily built sequence that
+        the Restaurant keeps its tables and menu items in.
+
+        Big sites (banquet halls, multi-floor restaurants) run to thousands of tables, most of which nobody touches
+        for a good part of the service. So the files only get parsed into plain rows, grouped into sections
+        (floors, rooms, menu categories...), and the Table and MenuItem objects of a section only get built the first
+        time something in that section gets used.
+
+    Classes defined in this module:
+        - Sections Class
+
+    Functions defined in this module:
+        - load_layout(path): parses a floor plan file into sections of (seats, (x, y)) rows
+        - load_menu(path): parses a menu file into sections of (name, price) rows
+
+    Notes:
+        1 - File formats, picked by extension:
+            .csv   - one row per table (columns: section, seats, x, y) or per menu item (columns: section, name,
+                     price). The section column is optional.
+            .jsonl - one JSON object per line, with the same fields as the csv columns. A table may give its
+                     location as "location": [x, y] instead of "x" and "y".
+            .json  - a list of tables/menu items as above, or {"sections": [{"name": ..., "tables": [...]}]}
+                     ({"name": ..., "items": [...]} for menus). A table may also be written [seats, [x, y]] and a
+                     menu item [name, price], like in constants.py.
+        The csv and jsonl files are read a line at a time; a json file has to be read whole.
+
+        2 - Rows of a section that shows up several times in a csv/jsonl file get gathered under its first
+        appearance. Tables are numbered in section order, then in file order within their section.
+
+        3 - Parsing a big file is the slow part of loading it, so the parsed sections get pickled next to it
+        (<path>.cache) and loaded from there instead as long as the file's size and modification time match. A
+        cache file that can't be unpickled, or doesn't hold sections, just gets the file parsed again.
+
+"""
+
+# ---- Importing built-in Libraries ----
+
+import bisect
+import csv
+import json
+import os
+import pickle
+import threading
+
+
+# Bumped whenever the parsed format changes, so that older cache files get ignored
+CACHE_VERSION = 1
+
+# Name of the section rows go into when the file doesn't give one
+DEFAULT_SECTION = 'main'
+
+
+
+class Sections:
+    """ Sequence of objects parsed into named sections of rows, each section built the first time it's used. """
+
+    def __init__(self, sections, factory):
+        """ Constructor to the Sections class.
+
+        <sections> is a list of (name, rows) pairs, and <factory> is the function called with the index of a row
+        in the whole sequence and the row itself to build the object at that index. """
+
+        self.names = [name for name, _ in sections]
+        self.rows = [list(rows) for _, rows in sections]
+        self.factory = factory
+
+        # Index of the first row of each section, and the built objects of each section (None until built)
+        self.starts = []
+        start = 0
+        for rows in self.rows:
+            self.starts.append(start)
+            start += len(rows)
+        self.length = start
+        self.built = [None] * len(self.rows)
+
+        # Lock making sure two threads using the same section at once don't both build it
+        self.lock = threading.Lock()
+
+
+    # ---------------- Defining Methods ----------------
+
+    def __len__(self):
+        return self.length
+
+
+    def __getitem__(self, index):
+        """ Returns the object at <index>, building its section if it hasn't been yet. """
+        index = self._index(index)
+        section = bisect.bisect_right(self.starts, index) - 1
+        return self._build(section)[index - self.starts[section]]
+
+
+    def __iter__(self):
+        """ Iterates over every object, building every section. """
+        for section in range(len(self.rows)):
+            yield from self._build(section)
+
+
+    def row(self, index):
+        """ Function returns the raw row of the object at <index> without building anything. """
+        index = self._index(index)
+        section = bisect.bisect_right(self.starts, index) - 1
+        return self.rows[section][index - self.starts[section]]
+
+
+    def section_of(self, index):
+        """ Function returns the position of the section the object at <index> is in. """
+        return bisect.bisect_right(self.starts, self._index(index)) - 1
+
+
+    def section(self, name):
+        """ Function returns the list of objects of the section <name>, building it if it hasn't been yet. """
+        return self._build(self.names.index(name))
+
+
+    def section_range(self, name):
+        """ Function returns the range of the indices of the objects of the section <name>. """
+        section = self.names.index(name)
+        return range(self.starts[section], self.starts[section] + len(self.rows[section]))
+
+
+    def loaded(self):
+        """ Iterates over the objects of the sections built so far, without building any other. """
+        for objects in self.built:
+            if objects is not None:
+                yield from objects
+
+
+    def _index(self, index):
+        """ Returns <index> counted from the start, counting a negative one from the end like a list does. Raises
+        IndexError if there is no object at <index>. """
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError(f'index {index} out of range')
+        return index
+
+
+    def _build(self, section):
+        """ Builds the objects of <section> if it hasn't been yet, and returns them. """
+        objects = self.built[section]
+        if objects is None:
+            with self.lock:
+                objects = self.built[section]
+                if objects is None:
+                    start = self.starts[section]
+                    objects = self.built[section] = [self.factory(start + ix, row)
+                                                     for ix, row in enumerate(self.rows[section])]
+        return objects
+
+
+
+# --------- Defining Separate Functions -----------
+
+def load_layout(path):
+    """ Function returns the floor plan file at <path> parsed into a list of (section name, rows) pairs, each row
+    being a (seats, (x, y)) tuple. See Notes 1 for the formats. """
+    return _load_cached(path, 'layout', _table_row, 'tables')
+
+
+def load_menu(path):
+    """ Function returns the menu file at <path> parsed into a list of (section name, rows) pairs, each row being a
+    (name, price) tuple. See Notes 1 for the formats. """
+    return _load_cached(path, 'menu', _menu_row, 'items')
+
+
+def _load_cached(path, kind, make_row, rows_key):
+    """ Returns the parsed sections of <path> from its cache file if it is still current, otherwise parses the
+    file and (re)writes its cache. """
+    path = os.fspath(path)
+    stat = os.stat(path)
+    key = (CACHE_VERSION, kind, stat.st_size, stat.st_mtime_ns)
+    cache_path = path + '.cache'
+
+    try:
+        with open(cache_path, 'rb') as cache_file:
+            cached_key, sections = pickle.load(cache_file)
+        if cached_key == key and _valid_sections(sections):
+            return sections
+    except Exception:
+        # Unpickling a damaged or foreign cache file can raise about anything: it just gets parsed again
+        pass
+
+    sections = _parse(path, make_row, rows_key)
+    try:
+        with open(cache_path, 'wb') as cache_file:
+            pickle.dump((key, sections), cache_file, pickle.HIGHEST_PROTOCOL)
+    except OSError:
+        pass
+    return sections
+
+
+def _valid_sections(sections):
+    """ Returns whether <sections> has the shape _parse() returns: a list of (section name, list of rows) pairs. """
+    return isinstance(sections, list) and all(isinstance(section, tuple) and len(section) == 2
+                                              and isinstance(section[0], str) and isinstance(section[1], list)
+                                              for section in sections)
+
+
+def _parse(path, make_row, rows_key):
+    """ Parses the file at <path> into sections, using <make_row> to turn each record into a row. """
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline = '') as data_file:
+        if extension == '.csv':
+            return _group(make_row(record) for record in csv.DictReader(data_file))
+        if extension == '.jsonl':
+            return _group(make_row(json.loads(line)) for line in data_file if line.strip())
+        if extension == '.json':
+            document = json.load(data_file)
+            if isinstance(document, dict):
+                return [(section.get('name', DEFAULT_SECTION), [make_row(record)[1] for record in section[rows_key]])
+                        for section in document['sections']]
+            return _group(make_row(record) for record in document)
+    raise ValueError(f'Unknown file format: {path} (expected .csv, .jsonl or .json)')
+
+
+def _group(sectioned_rows):
+    """ Gathers the (section name, row) pairs of <sectioned_rows> into a list of (section name, rows) pairs. """
+    sections = {}
+    for name, row in sectioned_rows:
+        sections.setdefault(name, []).append(row)
+    return list(sections.items())
+
+
+def _table_row(record):
+    """ Returns the (section name, (seats, (x, y))) pair of the table record <record>. """
+    if isinstance(record, (list, tuple)):
+        seats, (x, y) = record
+        return DEFAULT_SECTION, (int(seats), (_number(x), _number(y)))
+    x, y = record['location'] if 'location' in record else (record['x'], record['y'])
+    return record.get('section') or DEFAULT_SECTION, (int(record['seats']), (_number(x), _number(y)))
+
+
+def _menu_row(record):
+    """ Returns the (section name, (name, price)) pair of the menu item record <record>. """
+    if isinstance(record, (list, tuple)):
+        name, price = record
+        return DEFAULT_SECTION, (name, _number(price))
+    return record.get('section') or DEFAULT_SECTION, (record['name'], _number(record['price']))
+
+
+def _number(value):
+    """ Returns <value> (a number, or a string read from a csv file) as an int if it is a whole number, otherwise
+    as a float. """
+    number = float(value)
+    return int(number) if number.is_integer() else number
@@ -8,18 +8,37 @@
     Modified by: OCdt Al-Ansar Mohammed, OCdt Liethan Velasco
 
     Notes:
-        - None for now :P.
+        1 - The model can be changed from several threads at once. Each Table has a lock (Table.lock) that changes
+        to its orders and their items are made under, so changes to different tables don't wait on each other -
+        except for the brief sections where they update what the tables share (the restaurant's totals, item
+        registry, active item index, kitchen queue and kitchen times), made under the restaurant's SeqLock
+        (Restaurant.changes, see concurrency.py). Locks are always taken tables first, in table number order, then
+        the restaurant's, so they can't deadlock. Events get published once the change is complete, under the
+        table's lock but not the restaurant's.
+
+        2 - Reads that span tables (the kitchen's render, reports) go through Restaurant.read(), or active_snapshot()
+        and totals() which use it: they see the shared state as it was between two changes, without locking
+        anything.
 
 """
 
 # ---- Importing built-in Libraries ----
 
+import collections.abc
+import contextlib
 import enum
+import gc
+import math
+import threading
+import time
 
 
 # ---- Importing from other modules -----
 
-from constants import TABLES, MENU_ITEMS
+from concurrency import SeqLock
+from constants import TABLES, MENU_ITEMS, ITEM_LIST_SCAN
+from kitchen import KitchenQueue, KitchenTimes
+from layout import Sections, DEFAULT_SECTION, load_layout, load_menu
 
 
 
@@ -38,26 +57,142 @@ class Status(enum.IntEnum):
     SERVED = 3;
 
 
+# Name of the kitchen stage each status ends (indexed by int(status), PLACED ending none), and of the whole ticket
+# from PLACED to SERVED, as recorded in Restaurant.kitchen_times
+STAGES = (None, 'PLACED->COOKED', 'COOKED->READY', 'READY->SERVED')
+TICKET_STAGE = 'PLACED->SERVED'
+
+# Stand-in for the lock of a standalone order or item, which has no table or restaurant to lock
+_NO_LOCK = contextlib.nullcontext()
+
+
+
+class EventKind(enum.Enum):
+    """ Enumerated constants naming the kinds of change the Restaurant publishes to its subscribers. """
+
+    ITEM_REQUESTED = enum.auto()            # an item was added to a seat's order but not yet placed
+    ITEM_PLACED = enum.auto()               # an item was placed and sent to the kitchen
+    STATUS_ADVANCED = enum.auto()           # a placed item moved on to COOKED, READY or SERVED
+    ITEM_CANCELLED = enum.auto()            # an item was taken out of a seat's order
+    TABLE_OCCUPANCY_CHANGED = enum.auto()   # a seat went from having no items to having some, or back
+    ITEMS_ADVANCED = enum.auto()            # several placed items moved on at once (Restaurant.advance_items())
+    TABLE_REPRIORITIZED = enum.auto()       # a table's priority in the kitchen queue changed (reprioritize())
+
+
+
+# --------------- Defining the change event classes -------------
+
+class ChangeEvent:
+    """ Objects of this class describe one change made to the restaurant's model. """
+
+    def __init__(self, kind, table_number, seat = None, item = None, items = None):
+        """ Constructor of the ChangeEvent class.
+
+        <kind> is the EventKind of the change, <table_number> and <seat> say where in the restaurant it
+        happened, and <item> is the OrderItem it happened to (None for TABLE_OCCUPANCY_CHANGED). An ITEMS_ADVANCED
+        event has the tuple of OrderItems it happened to as <items> instead, and a <table_number> of None when they
+        are from several tables. """
+
+        self.kind = kind
+        self.table_number = table_number
+        self.seat = seat
+        self.item = item
+        self.items = items
+
+
+    def table_numbers(self):
+        """ Function returns the set of the numbers of the tables this change happened at. """
+        if self.table_number is not None or self.items is None:
+            return {self.table_number}
+        return {item.order.table.number for item in self.items}
+
+
+
+class Subscription:
+    """ Objects of this class are handed out by Restaurant.subscribe(), and hold which events a callback wants. """
+
+    def __init__(self, callback, kinds, tables):
+        """ Constructor of the Subscription class.
+
+        <callback> gets called with each ChangeEvent wanted. <kinds> and <tables> are the EventKinds and table
+        numbers the callback wants to hear about, or None for all of them. """
+
+        self.callback = callback
+        self.kinds = frozenset(EventKind) if kinds is None else frozenset(kinds)
+        self.tables = None if tables is None else frozenset(tables)
+
+
+    def wants(self, event):
+        """ Returns True if <event> is one of the changes this subscription is for. """
+        if event.kind not in self.kinds:
+            return False
+        if self.tables is None or event.table_number in self.tables:
+            return True
+        return event.table_number is None and not self.tables.isdisjoint(event.table_numbers())
+
+
 
 # --------------- Defining the classes of the Restaurant objects -------------
 
 class Restaurant:
 
-    def __init__(self):
+    def __init__(self, layout = None, menu = None):
         """ Constructor to the Restaurant Class.
 
-        Upon instantiation, retrieves table and menu item data, creates a list of each of the objects
-        and stores the lists in instance variables. """
+        Upon instantiation, retrieves table and menu item data, creates a sequence of each of the objects
+        and stores the sequences in instance variables.
+
+        <layout> and <menu> are the paths of the floor plan and menu files to load (see layout.py for the formats),
+        or already parsed lists of (section name, rows) pairs. They default to TABLES and MENU_ITEMS in constants.py.
+        The Table and MenuItem objects of a section only get built once something in that section is used. """
 
-        # Getting the table and chair data from TABLES in  constants.py and creating a list of Table objects
-        self.tables = [Table(seats, loc) for seats, loc in TABLES]
+        # Getting the table and chair data from TABLES in constants.py (or the floor plan file), and creating
+        # the sequence of Table objects
+        table_sections = _sections(layout, TABLES, load_layout)
+        self.tables = Sections(table_sections, lambda ix, row: Table(row[0], tuple(row[1]), self, ix))
 
-        # Initializing list of menu items for this restaurant object
-        self.menu_items = [MenuItem(name, price) for name, price in MENU_ITEMS]
+        # Initializing sequence of menu items for this restaurant object. A menu lists its sections (starters, mains,
+        # desserts...) in the order they get served, so each item's course is the position of its section.
+        menu_sections = _sections(menu, MENU_ITEMS, load_menu)
+        self.menu_items = Sections(menu_sections, lambda ix, row: MenuItem(*row, self.menu_items.section_of(ix)))
+
+        # MenuItem -> its id, built the first time it's asked for (see menu_ids())
+        self._menu_ids = None
 
         # Ahh, here's the list that stores all the current views of this restaurant object
         self.views = []
 
+        # Subscriptions to the restaurant's change events, grouped by the EventKinds they're for
+        self.subscribers = {kind: [] for kind in EventKind}
+
+        # Index of the items that are ordered but not yet served, grouped by table number then seat number.
+        # The innermost dicts are used as insertion-ordered sets ({OrderItem: None}), so that the kitchen can
+        # draw its items without walking every item ever ordered in the restaurant.
+        self.active_items = {}
+
+        # Clock the items' status changes get stamped with, and the histograms of how long the items spend in each
+        # stage of the kitchen, fed as they advance (see kitchen.py/Notes 4)
+        self.clock = time.monotonic
+        self.kitchen_times = KitchenTimes()
+
+        # Queue of the placed items waiting for the kitchen to start them, most urgent first (see kitchen.py). It
+        # times them with the restaurant's clock, looked up on every use so that it follows a clock swapped in later
+        self.kitchen_queue = KitchenQueue(lambda: self.clock())
+
+        # Registry of every item in every order of the restaurant by its id, and the id the next item will get.
+        # Ids are never reused, so anything outside the model (journals, terminals...) can refer to an item by id.
+        self.items_by_id = ItemRegistry()
+        self.next_item_id = 1
+
+        # Running total of every item in every order of the restaurant, kept up to date by the orders.
+        # With check_totals set, every change to it is verified against a full recompute (slow - tests only).
+        self.total = 0
+        self.check_totals = False
+
+        # Lock the changes to everything above that the tables share are made under, and read through without
+        # locking (see Notes 1 and 2)
+        self.changes = SeqLock()
+
 
     # ---------- Defining Methods -----------
 
@@ -66,34 +201,279 @@ class Restaurant:
         self.views.append(view)
 
 
+    def remove_view(self, view):
+        """ Method takes the RestaurantView object <view> back out of the self.views list attribute """
+        self.views.remove(view)
+
+
     def notify_views(self):
-        """ Method invokes the update() method on all the views in self.views list - polymorphism example. """
+        """ Method invokes the update() method on all the views in self.views list - polymorphism example.
+
+        This redraws every view whatever changed. Prefer subscribe() so that views only hear about the
+        changes they show. """
         for view in self.views:
             view.update()
 
 
+    def subscribe(self, callback, kinds = None, tables = None):
+        """ Method registers <callback> to be called with every ChangeEvent of one of the EventKinds <kinds>
+        happening at one of the tables numbered <tables> (None meaning all of them).
+
+        Returns the Subscription object, to be handed back to unsubscribe(). """
+        subscription = Subscription(callback, kinds, tables)
+        for kind in subscription.kinds:
+            self.subscribers[kind].append(subscription)
+        return subscription
+
+
+    def unsubscribe(self, subscription):
+        """ Method stops the Subscription object <subscription> from receiving any more events. """
+        for kind in subscription.kinds:
+            self.subscribers[kind].remove(subscription)
+
+
+    def publish(self, event):
+        """ Method calls back every subscription that wants the ChangeEvent object <event>. """
+        for subscription in list(self.subscribers[event.kind]):
+            if subscription.wants(event):
+                subscription.callback(event)
+
+
+    def advance_items(self, items):
+        """ Method advances the status of every OrderItem of <items> by one step at once, and publishes a single
+        ITEMS_ADVANCED event about all of them. Returns the tuple of items advanced.
+
+        Every item gets checked before any is advanced: if one of them isn't in this restaurant, hasn't been
+        placed, is already served or is given twice, a ValueError is raised and nothing changes. """
+        items = tuple(items)
+        table_numbers = {item.order.table.number for item in items
+                         if item.order is not None and item.order.table is not None
+                         and item.order.table.restaurant is self}
+        with contextlib.ExitStack() as locked:
+            for table_number in sorted(table_numbers):
+                locked.enter_context(self.tables[table_number].lock)
+
+            problems = []
+            seen = set()
+            for item in items:
+                if item.order is None or item.order.table is None or item.order.table.restaurant is not self:
+                    problems.append(f'{item.details.name} is not in this restaurant')
+                elif not item.has_been_ordered():
+                    problems.append(f'{item.details.name} has not been placed')
+                elif item.has_been_served():
+                    problems.append(f'{item.details.name} has already been served')
+                elif item in seen:
+                    problems.append(f'{item.details.name} is given more than once')
+                seen.add(item)
+            if problems:
+                raise ValueError('Cannot advance these items: ' + '; '.join(problems))
+            if not items:
+                return items
+
+            with self.changes:
+                for item in items:
+                    item._advance()
+            if self.subscribers[EventKind.ITEMS_ADVANCED]:
+                table_number = table_numbers.pop() if len(table_numbers) == 1 else None
+                self.publish(ChangeEvent(EventKind.ITEMS_ADVANCED, table_number, items = items))
+        return items
+
+
+    def menu_ids(self):
+        """ Function returns the dict of the id of every MenuItem of the restaurant: its index in the menu, which is
+        how anything outside the model (journals, databases, terminals, snapshots, traces...) refers to it. The menu
+        never changes, so the dict is only built once, and must not be modified. """
+        if self._menu_ids is None:
+            self._menu_ids = {menu_item: menu_id for menu_id, menu_item in enumerate(self.menu_items)}
+        return self._menu_ids
+
+
+    def reprioritize(self, table_number, priority):
+        """ Method sets the priority of table <table_number> in the kitchen queue to <priority> (see kitchen.py/Notes
+        1), and publishes it. """
+        table = self.tables[table_number]
+        with table.lock:
+            with self.changes:
+                self.kitchen_queue.reprioritize(table_number, priority)
+            if self.subscribers[EventKind.TABLE_REPRIORITIZED]:
+                self.publish(ChangeEvent(EventKind.TABLE_REPRIORITIZED, table_number))
+
+
+    def item(self, item_id):
+        """ Function returns the OrderItem of id <item_id>. Raises a KeyError if no order of the restaurant has
+        it. """
+        return self.items_by_id[item_id]
+
+
+    def remove_item(self, item_id):
+        """ Method takes the OrderItem of id <item_id> out of its order (see Order.remove_item()), and returns
+        it. """
+        item = self.items_by_id[item_id]
+        item.order.remove_item(item)
+        return item
+
+
+    def register_item(self, item, item_id = None):
+        """ Method gives the OrderItem <item> the id <item_id> (a new one if None) and adds it to the
+        registry. """
+        with self.changes:
+            if item_id is None:
+                item_id = self.next_item_id
+            elif item_id in self.items_by_id:
+                raise ValueError(f'Item id {item_id} is already taken')
+            self.next_item_id = max(self.next_item_id, item_id + 1)
+            item.id = item_id
+            self.items_by_id[item_id] = item
+
+
+    def unregister_item(self, item):
+        """ Method takes the OrderItem <item> out of the registry. Its id doesn't get handed out again. """
+        with self.changes:
+            del self.items_by_id[item.id]
+
+
+    def restore_orders(self, orders, tickets = ()):
+        """ Method puts back many saved orders at once, as when loading a snapshot (see snapshot.py). <orders>
+        gives the (table number, seat, menu items, statuses, ordered flags, item ids) of each order, the last four
+        being lists of the same length describing its items, and <tickets> the (item ids, time placed) of the runs
+        of items of a table waiting in the kitchen queue together (see KitchenQueue.tickets()).
+
+        Ends up where Order.restore_item() would for every item, but in bulk: each order's items get built,
+        registered, totalled and indexed a batch at a time, and the kitchen queue gets heapified once. The garbage
+        collector is paused meanwhile, since building a million items otherwise sets off full collections that walk
+        all of them and free nothing. Publishes no event. """
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            for table_number, seat, menu_items, statuses, ordered, item_ids in orders:
+                table = self.tables[table_number]
+                with table.lock:
+                    table.order_for(seat)._restore_items(menu_items, statuses, ordered, item_ids)
+            queued = []
+            for item_ids, placed in tickets:
+                items = [self.items_by_id[item_id] for item_id in item_ids]
+                queued.append((items, items[0].order.table.number, placed))
+            with self.changes:
+                self.kitchen_queue.extend(queued)
+        finally:
+            if collecting:
+                gc.enable()
+
+
+    def add_active_item(self, table_number, seat, item):
+        """ Method adds the OrderItem <item> ordered by seat <seat> of table <table_number> to the active index. """
+        with self.changes:
+            self.active_items.setdefault(table_number, {}).setdefault(seat, {})[item] = None
+
+
+    def remove_active_item(self, table_number, seat, item):
+        """ Method removes the OrderItem <item> from the active index if it is in there, dropping the seat and
+        table entries once they're empty so that an empty table never shows up as active. """
+        with self.changes:
+            seats = self.active_items.get(table_number)
+            if not seats or item not in seats.get(seat, ()):
+                return
+            del seats[seat][item]
+            if not seats[seat]:
+                del seats[seat]
+                if not seats:
+                    del self.active_items[table_number]
+
+
+    def active_table_numbers(self):
+        """ Function returns the numbers of the tables that have active items, in table order. """
+        return sorted(self.active_items)
+
+
+    def total_cost(self):
+        """ Function returns the total cost of every item in every order of the restaurant. """
+        return self.total
+
+
+    def verify_totals(self):
+        """ Method recomputes the total of every order, table and of the restaurant from scratch, and raises an
+        AssertionError if any of the running totals has drifted from it. """
+        for table in self.tables.loaded():
+            table.verify_totals()
+        recomputed = sum(table.total for table in self.tables.loaded())
+        if not math.isclose(self.total, recomputed, abs_tol = 1e-6):
+            raise AssertionError(f'Restaurant total is {self.total}, but its tables add up to {recomputed}')
+
+
+    def active_items_for(self, table_number):
+        """ Function returns the list of active OrderItems of table <table_number>, in seat order then in the
+        order the items were placed. """
+        seats = self.active_items.get(table_number, {})
+        return [item for seat in sorted(seats) for item in seats[seat]]
+
+
+    def read(self, function):
+        """ Function returns what <function> (called without arguments, and maybe more than once) returns when it
+        reads the restaurant's shared state in between two changes, without locking anything (see Notes 2). """
+        return self.changes.read(function)
+
+
+    def active_snapshot(self):
+        """ Function returns the (table number, list of active OrderItems) of every table that has any, in table
+        order, all as of the same moment (see read()). """
+        return self.read(lambda: [(table_number, self.active_items_for(table_number))
+                                  for table_number in self.active_table_numbers()])
+
+
+    def totals(self):
+        """ Function returns the total of the restaurant and the dict of the totals of its tables that have been
+        used, all as of the same moment (see read()). """
+        return self.read(lambda: (self.total, {table.number: table.total for table in self.tables.loaded()}))
+
+
+    def kitchen_summary(self, unit = 's'):
+        """ Function returns the KitchenTimes.summary() of the restaurant's kitchen times in <unit>, as of one
+        moment (see read()). """
+        return self.read(lambda: self.kitchen_times.summary(unit))
+
+
 
 class Table:
 
-    def __init__(self, seats, location):
+    # Tables, orders, order items and menu items get created by the thousand (or million), so they use
+    # __slots__ rather than carrying a whole instance __dict__ each.
+    __slots__ = ('n_seats', 'location', 'restaurant', 'number', 'total', 'orders', 'lock')
+
+    def __init__(self, seats, location, restaurant = None, number = None):
         """ Constructor to the Table Class.
 
         <seats> argument refers to the number of seats the Table object to be created will have.
-        <location> argument refers to the location the Table object is to placed on the canvas. """
+        <location> argument refers to the location the Table object is to placed on the canvas.
+        <restaurant> and <number> are the Restaurant object that owns this table and the table's index in it,
+        used to keep the restaurant's index of active items up to date. Both stay None for a standalone table. """
 
         # Setting the instance vars of the Table object to be created
         self.n_seats = seats
         self.location = location
+        self.restaurant = restaurant
+        self.number = number
+
+        # Running total of every item ordered at this table, kept up to date by its orders
+        self.total = 0
 
-        # Creating the list of Order objects associated with each seat at the table.
-        # Storing it in an instance var attribute.
-        self.orders = [Order() for _ in range(seats)]
+        # Creating the dict of Order objects associated with each seat at the table, keyed by seat number.
+        # Most seats of a big floor plan never order anything, so a seat's Order only gets created by
+        # order_for() the first time the seat is opened for ordering.
+        self.orders = {}
+
+        # Lock the changes to this table's orders and their items are made under (see Notes 1)
+        self.lock = threading.RLock()
 
 
     def has_any_active_orders(self):
         """ Oop here's a new one. This one I'm guessing returns True if there are still active orders
-        pending that have not been served. If there are none, then obviously returns false. """
-        for order in self.orders:
+        pending that have not been served. If there are none, then obviously returns false.
+
+        Looks the table up in the restaurant's active item index when there is one, otherwise falls back
+        to walking every item of every order. """
+        if self.restaurant is not None:
+            return self.number in self.restaurant.active_items
+        for order in self.orders.values():
             for item in order.items:
                 if item.has_been_ordered() and not item.has_been_served():
                     return True
@@ -103,30 +483,238 @@ class Table:
     def has_order_for(self, seat):
         """ Function returns a boolean that indicates whether the given seat of number <seat> has ordered yet. """
 
-        # Returns true if self.orders[seat].items is something other than None
-        return bool(self.orders[seat].items)
+        # Returns true if the seat has an Order and its items list is something other than empty
+        order = self.orders.get(seat)
+        return order is not None and bool(order.items)
+
+
+    def total_cost(self):
+        """ Function returns the total cost of every item in every order of this table. """
+        return self.total
+
+
+    def verify_totals(self):
+        """ Method raises an AssertionError if the running total of this table or of any of its orders has
+        drifted from a full recompute. """
+        for order in self.orders.values():
+            order.verify_total()
+        recomputed = sum(order.total for order in self.orders.values())
+        if not math.isclose(self.total, recomputed, abs_tol = 1e-6):
+            raise AssertionError(f'Table {self.number} total is {self.total}, but its orders add up to {recomputed}')
 
 
     def order_for(self, seat):
         """ Function returns the specific Order object associated with the seat whose
-        number <seat> has been passed through the arguments. """
-        return self.orders[seat]
+        number <seat> has been passed through the arguments, creating it if the seat hasn't had one yet. """
+        order = self.orders.get(seat)
+        if order is None:
+            with self.lock:
+                if not 0 <= seat < self.n_seats:
+                    raise IndexError(f'Table {self.number} has no seat {seat}')
+                order = self.orders.get(seat)
+                if order is None:
+                    order = self.orders[seat] = Order(self, seat)
+        return order
 
 
 
-class Order:
+class ItemList:
+    """ Insertion-ordered collection of the OrderItems of an Order, that still reads like a list (iteration, len,
+    indexing, slicing, equality with a list) but whose remove() and "in" are O(1) on average, so that clearing a
+    big tab isn't quadratic. Indexing from either end ([0], [-1]) is O(1) too; any other position is O(n).
+
+    The items are kept in a plain list, which costs a pointer per item. A removed item leaves a hole (None)
+    behind, and the holes get squeezed out once they make up half of the list. Finding an item in a short list is
+    a scan; a long one builds an index of the items' positions the first time it's searched, and only keeps it up
+    to date from then on. """
+
+    __slots__ = ('entries', 'holes', 'positions')
+
+    def __init__(self, items = ()):
+        """ Constructor to the ItemList class. """
+        self.entries = list(items)
+        self.holes = 0
+        self.positions = None
+
+
+    # ---------- Defining Methods -----------
+
+    def append(self, item):
+        if self.positions is not None:
+            self.positions[item] = len(self.entries)
+        self.entries.append(item)
+
+
+    def extend(self, items):
+        start = len(self.entries)
+        self.entries.extend(items)
+        if self.positions is not None:
+            self.positions.update(zip(self.entries[start:], range(start, len(self.entries))))
+
+
+    def remove(self, item):
+        """ Removes <item>. Raises a ValueError if it isn't in the list, like list.remove(). """
+        position = self._position(item)
+        if position is None:
+            raise ValueError(f'{item!r} is not in the list')
+        if position == len(self.entries) - 1:
+            # Popping rather than leaving a hole at the end, along with the holes that end up there
+            self.entries.pop()
+            while self.entries and self.entries[-1] is None:
+                self.entries.pop()
+                self.holes -= 1
+        else:
+            self.entries[position] = None
+            self.holes += 1
+        if self.positions is not None:
+            del self.positions[item]
+        if self.holes > ITEM_LIST_SCAN and 2 * self.holes > len(self.entries):
+            self.entries = [entry for entry in self.entries if entry is not None]
+            self.holes = 0
+            self.positions = None
+
+
+    def index(self, item):
+        """ Returns the position of <item>. O(n), like list.index(). """
+        for position, other in enumerate(self):
+            if other is item:
+                return position
+        raise ValueError(f'{item!r} is not in the list')
+
+
+    def __contains__(self, item):
+        return self._position(item) is not None
+
+
+    def __len__(self):
+        return len(self.entries) - self.holes
+
+
+    def __iter__(self):
+        if not self.holes:
+            return iter(self.entries)
+        return (entry for entry in self.entries if entry is not None)
+
+
+    def __reversed__(self):
+        if not self.holes:
+            return reversed(self.entries)
+        return (entry for entry in reversed(self.entries) if entry is not None)
+
+
+    def __getitem__(self, index):
+        if not self.holes:
+            return self.entries[index]
+        if index == 0 and len(self):
+            return next(iter(self))
+        if index == -1 and len(self):
+            # The last entry is never a hole: remove() pops it instead
+            return self.entries[-1]
+        return list(self)[index]
+
+
+    def __eq__(self, other):
+        if isinstance(other, (ItemList, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+
+    def __repr__(self):
+        return f'ItemList({list(self)!r})'
+
+
+    def _position(self, item):
+        """ Returns the position of <item> in the entries, or None if it isn't in them. """
+        entries = self.entries
+        if self.positions is None:
+            if len(entries) <= ITEM_LIST_SCAN:
+                for position in range(len(entries) - 1, -1, -1):
+                    if entries[position] is item:
+                        return position
+                return None
+            self.positions = {entry: position for position, entry in enumerate(entries) if entry is not None}
+        return self.positions.get(item)
+
+
+
+class ItemRegistry(collections.abc.MutableMapping):
+    """ Registry of the OrderItems of a restaurant by id (Restaurant.items_by_id), which reads and writes like a
+    dict. Ids are handed out counting up from 1 and never reused, so rather than a dict entry per item (a hash
+    table slot and an entry), the registry is a list indexed by id: a pointer per id ever handed out, None once
+    the item is gone. """
+
+    __slots__ = ('entries', 'count')
 
     def __init__(self):
+        """ Constructor to the ItemRegistry class. """
+        self.entries = [None]
+        self.count = 0
+
+
+    # ---------- Defining Methods -----------
+
+    def __getitem__(self, item_id):
+        item = self.entries[item_id] if 0 < item_id < len(self.entries) else None
+        if item is None:
+            raise KeyError(item_id)
+        return item
+
+
+    def __setitem__(self, item_id, item):
+        if item_id < 1:
+            raise KeyError(item_id)
+        if item_id >= len(self.entries):
+            self.entries.extend([None] * (item_id + 1 - len(self.entries)))
+        if self.entries[item_id] is None:
+            self.count += 1
+        self.entries[item_id] = item
+
+
+    def __delitem__(self, item_id):
+        self[item_id]
+        self.entries[item_id] = None
+        self.count -= 1
+
+
+    def __contains__(self, item_id):
+        return isinstance(item_id, int) and 0 < item_id < len(self.entries) and self.entries[item_id] is not None
+
+
+    def __iter__(self):
+        return (item_id for item_id, item in enumerate(self.entries) if item is not None)
+
+
+    def __len__(self):
+        return self.count
+
+
+    def values(self):
+        return [item for item in self.entries if item is not None]
+
+
+
+class Order:
+
+    __slots__ = ('table', 'seat', 'items', 'total')
+
+    def __init__(self, table = None, seat = None):
         """ Constructor for Order object.
 
         In short, this object is responsible for keeping track of the orders placed by a given
         seat in the restaurant.
 
-        Every chair gets their own Order object associated with it. """
+        Every chair gets their own Order object associated with it. <table> and <seat> are the Table object
+        and the seat number this order belongs to (None for a standalone order). """
+
+        self.table = table
+        self.seat = seat
 
         # Creating empty list attribute to contain all items
-        # that were ordered and that are pending to be ordered.
-        self.items = []
+        # that were ordered and that are pending to be ordered. (An ItemList: see its docstring.)
+        self.items = ItemList()
+
+        # Running total of the prices of self.items, rolled up into the table's and restaurant's totals
+        self.total = 0
 
 
     # -------- Defining Methods --------
@@ -134,13 +722,73 @@ class Order:
     def add_item(self, menu_item):
         """ Function simply adds the OrderItem object <menu_item> passed through
         the arguments into the self.items list attribute of the Order object. """
-        item = OrderItem(menu_item)
-        self.items.append(item)
+        with self._lock():
+            item = OrderItem(menu_item, self)
+            with self._changes():
+                self._register(item)
+                self.items.append(item)
+                self._adjust_total(menu_item.price)
+            self._publish(EventKind.ITEM_REQUESTED, item)
+            if len(self.items) == 1:
+                self._publish(EventKind.TABLE_OCCUPANCY_CHANGED)
+
+
+    def restore_item(self, menu_item, status, ordered, item_id = None, placed = None):
+        """ Function puts back an OrderItem of <menu_item> that was saved in Status <status>, ordered or not
+        according to <ordered>, with its id <item_id> (a new one if None), as when recovering a saved restaurant.
+        A PLACED item goes back in the kitchen queue as placed at the time <placed> of the restaurant's clock (now
+        if None). Keeps the totals, the item registry and the active item index up to date, but publishes no event.
+        Returns the OrderItem object. """
+        item = OrderItem(menu_item, self)
+        item.restore(status, ordered)
+        with self._lock(), self._changes():
+            self._register(item, item_id)
+            self.items.append(item)
+            self._adjust_total(menu_item.price)
+            if ordered and item.status != Status.SERVED:
+                self._add_active(item)
+                if item.status == Status.PLACED:
+                    self._enqueue([item], placed)
+        return item
+
+
+    def _restore_items(self, menu_items, statuses, ordered, item_ids):
+        """ Puts back a batch of saved items, for Restaurant.restore_orders(): the lists <menu_items>, <statuses>,
+        <ordered> and <item_ids> give the MenuItem object, Status, ordered flag and id of each. Active items don't
+        get queued for the kitchen here. The table's lock has to be held. """
+        restaurant = self._restaurant()
+        items = OrderItem.restored(self, menu_items, statuses, ordered, item_ids)
+        if not items:
+            return
+        active = [item for item, status, was_ordered in zip(items, statuses, ordered)
+                  if was_ordered and status != Status.SERVED]
+        with restaurant.changes:
+            registry = restaurant.items_by_id
+            if len(set(item_ids)) != len(item_ids) or any(item_id in registry for item_id in item_ids):
+                raise ValueError(f'Item ids of table {self.table.number} seat {self.seat} are already taken')
+            registry.update(zip(item_ids, items))
+            restaurant.next_item_id = max(restaurant.next_item_id, max(item_ids) + 1)
+
+            self.items.extend(items)
+            self._adjust_total(sum(menu_item.price for menu_item in menu_items))
+            if active:
+                restaurant.active_items.setdefault(self.table.number, {}).setdefault(self.seat, {}).update(
+                    dict.fromkeys(active))
 
 
     def remove_item(self, item):
-        """ Function simply removes the <item> object passed through args from the self.items list"""
-        self.items.remove(item)
+        """ Function simply removes the <item> object passed through args from the self.items list,
+        and takes it out of the restaurant's active item index if it had been placed. """
+        with self._lock():
+            with self._changes():
+                self.items.remove(item)
+                self._unregister(item)
+                self._adjust_total(-item.details.price)
+                self._remove_active(item)
+                self._dequeue(item)
+            self._publish(EventKind.ITEM_CANCELLED, item)
+            if not self.items:
+                self._publish(EventKind.TABLE_OCCUPANCY_CHANGED)
 
 
     def unordered_items(self):
@@ -148,36 +796,172 @@ class Order:
         to have their ordered attribute be set to True """
         return [item for item in self.items if not item.has_been_ordered()]
 
-    def place_new_orders(self):
+    def place_new_orders(self, placed = None):
         """ Function goes through the list attribute self.items of the given Order object and
-        sets all OrderItem objects in the list's ordered attribute from False to True. """
-        for item in self.unordered_items():
-            item.mark_as_ordered()
+        sets all OrderItem objects in the list's ordered attribute from False to True. They go in the kitchen queue
+        as placed at the time <placed> of the restaurant's clock: now, unless recovering them. """
+        with self._lock():
+            items = self.unordered_items()
+            with self._changes():
+                for item in items:
+                    item.mark_as_ordered()
+                    self._add_active(item)
+                self._enqueue(items, placed)
+            for item in items:
+                self._publish(EventKind.ITEM_PLACED, item)
 
 
     def remove_unordered_items(self):
         """ Function removes all the items in the list attribute self.items that have an "unordered" status. """
-        for item in self.unordered_items():
-            self.items.remove(item)
+        with self._lock():
+            unordered = self.unordered_items()
+            with self._changes():
+                for item in unordered:
+                    self.items.remove(item)
+                    self._unregister(item)
+                    self._adjust_total(-item.details.price)
+            for item in unordered:
+                self._publish(EventKind.ITEM_CANCELLED, item)
+            if unordered and not self.items:
+                self._publish(EventKind.TABLE_OCCUPANCY_CHANGED)
 
 
     def total_cost(self):
-        """ Function simply calculates the total cost of all the OrderItem
+        """ Function simply returns the total cost of all the OrderItem
         objects currently in the self.items list attribute.
 
-        Ohh wow this one's given to us xD not that it was difficult to implement. """
-        return sum((item.details.price for item in self.items))
+        Ohh wow this one's given to us xD not that it was difficult to implement. It used to re-sum every item,
+        now it's a running total kept up to date as items get added and removed. """
+        return self.total
+
+
+    def verify_total(self):
+        """ Method raises an AssertionError if the running total has drifted from re-summing every item. """
+        recomputed = sum((item.details.price for item in self.items))
+        if not math.isclose(self.total, recomputed, abs_tol = 1e-6):
+            raise AssertionError(f'Order total is {self.total}, but its items add up to {recomputed}')
+
+
+    def _adjust_total(self, amount):
+        """ Adds <amount> to the running totals of this order, its table and its restaurant. Called under the
+        restaurant's changes lock (see Notes 1). """
+        self.total += amount
+        if self.table is None:
+            return
+        self.table.total += amount
+        restaurant = self.table.restaurant
+        if restaurant is not None:
+            restaurant.total += amount
+            if restaurant.check_totals:
+                restaurant.verify_totals()
+
+
+    def _restaurant(self):
+        """ Function returns the Restaurant object this order belongs to, or None for a standalone order. """
+        return self.table.restaurant if self.table is not None else None
+
+
+    def _lock(self):
+        """ Returns the lock of this order's table (see Notes 1), or a stand-in for a standalone order. """
+        return self.table.lock if self.table is not None else _NO_LOCK
+
+
+    def _changes(self):
+        """ Returns the lock of the restaurant's shared state (see Notes 1), or a stand-in for a standalone
+        order. """
+        restaurant = self._restaurant()
+        return restaurant.changes if restaurant is not None else _NO_LOCK
+
+
+    def _add_active(self, item):
+        """ Adds <item> to the restaurant's active item index. """
+        restaurant = self._restaurant()
+        if restaurant is not None:
+            restaurant.add_active_item(self.table.number, self.seat, item)
+
+
+    def _remove_active(self, item):
+        """ Removes <item> from the restaurant's active item index. """
+        restaurant = self._restaurant()
+        if restaurant is not None:
+            restaurant.remove_active_item(self.table.number, self.seat, item)
+
+
+    def _register(self, item, item_id = None):
+        """ Gives <item> its id in the restaurant's item registry. """
+        restaurant = self._restaurant()
+        if restaurant is not None:
+            restaurant.register_item(item, item_id)
+
+
+    def _unregister(self, item):
+        """ Takes <item> out of the restaurant's item registry. """
+        restaurant = self._restaurant()
+        if restaurant is not None:
+            restaurant.unregister_item(item)
+
+
+    def _enqueue(self, items, placed = None):
+        """ Adds the list of <items> placed together (at the time <placed>, now if None) to the restaurant's kitchen
+        queue. """
+        restaurant = self._restaurant()
+        if restaurant is not None and items:
+            restaurant.kitchen_queue.push(items, self.table.number, placed)
+
+
+    def _stamp(self, item):
+        """ Stamps the time <item> reached its current status with the restaurant's clock, and records how long
+        it spent in the stage it just finished (and in the whole kitchen, once served) when that stage's start got
+        stamped too. """
+        restaurant = self._restaurant()
+        if restaurant is None:
+            return
+        now = restaurant.clock()
+        if item.timestamps is None:
+            item.timestamps = [None] * len(STAGES)
+        status = int(item.status)
+        item.timestamps[status] = now
+        if status == Status.PLACED:
+            return
+        started = item.timestamps[status - 1]
+        if started is not None:
+            restaurant.kitchen_times.record(STAGES[status], now - started, item.details, self.table.number)
+        if status == Status.SERVED and item.timestamps[Status.PLACED] is not None:
+            restaurant.kitchen_times.record(TICKET_STAGE, now - item.timestamps[Status.PLACED], item.details,
+                                            self.table.number)
+
+
+    def _dequeue(self, item):
+        """ Takes <item> out of the restaurant's kitchen queue, if it is in there. """
+        restaurant = self._restaurant()
+        if restaurant is not None:
+            restaurant.kitchen_queue.discard(item)
+
+
+    def _publish(self, kind, item = None):
+        """ Publishes a ChangeEvent of EventKind <kind> about this order's seat (and <item>) to the restaurant.
+        Doesn't bother building the event when nobody is subscribed to its kind (ie. while recovering). """
+        restaurant = self._restaurant()
+        if restaurant is not None and restaurant.subscribers[kind]:
+            restaurant.publish(ChangeEvent(kind, self.table.number, self.seat, item))
 
 
 
 class OrderItem:
 
-    def __init__(self, menu_item):
+    __slots__ = ('id', 'order', 'status', '__ordered', 'details', 'timestamps')
+
+    def __init__(self, menu_item, order = None):
         """ Constructor for the OrderItem class.
 
         Upon instantiation, sets the ordered attribute of the OrderItem object to False, and
         its status to REQUESTED. Also stores the <menu_item> MenuItem object (object that contains
-        the information regarding the given OrderItem object) in the instance var self.details. """
+        the information regarding the given OrderItem object) in the instance var self.details.
+        <order> is the Order object this item belongs to (None for a standalone item). Its id gets set once it's
+        added to an order of a restaurant (see Restaurant.register_item()). """
+
+        self.id = None
+        self.order = order
 
         # Setting initial status of instantiated OrderItem to REQUESTED.
         # Refer to oorms.py/Notes 4 for an in depth explanation on status functionality.
@@ -187,9 +971,39 @@ class OrderItem:
         self.__ordered = False
         self.details = menu_item
 
+        # The time.monotonic() (the restaurant's clock) this item reached each status from PLACED on, indexed by
+        # int(status). None until it's placed, and for the statuses reached before it was restored.
+        self.timestamps = None
+
 
     # -------- Defining Methods --------
 
+    def restore(self, status, ordered):
+        """ Sets the status of this OrderItem to <status> and its ordered attribute to <ordered> in one go, for
+        Order.restore_item(). """
+        self.status = Status(status)
+        self.__ordered = bool(ordered)
+
+
+    @staticmethod
+    def restored(order, menu_items, statuses, ordered, item_ids):
+        """ Function returns the list of OrderItems of the Order object <order> described by the lists
+        <menu_items> (MenuItem objects), <statuses> (Status values), <ordered> and <item_ids>, for
+        Order._restore_items(). Goes around the constructor and restore(), which would set every attribute twice. """
+        new = OrderItem.__new__
+        items = []
+        for menu_item, status, was_ordered, item_id in zip(menu_items, statuses, ordered, item_ids):
+            item = new(OrderItem)
+            item.id = item_id
+            item.order = order
+            item.status = status
+            item.__ordered = bool(was_ordered)
+            item.details = menu_item
+            item.timestamps = None
+            items.append(item)
+        return items
+
+
     def mark_as_ordered(self):
         """ Sets the self.ordered instance boolean var to true, and advances status from REQUESTED to PLACED.  """
         self.__ordered = True
@@ -217,11 +1031,38 @@ class OrderItem:
 
     def advance_status(self):
         """ Method advances current status of current item (PLACED --> COOKED --> READY --> SERVED). """
+        with self.order._lock() if self.order is not None else _NO_LOCK:
+            self._advance()
+
+            # REQUESTED -> PLACED gets published as ITEM_PLACED by Order.place_new_orders(), every step after that
+            # is published here
+            if self.status > Status.PLACED and self.order is not None:
+                self.order._publish(EventKind.STATUS_ADVANCED, self)
+
+
+    def _advance(self):
+        """ Advances the status of this item by one step, keeping the kitchen queue and the active item index up to
+        date, without publishing anything. The table's lock has to be held. """
+        if self.order is None:
+            self.status = Status(int(self.status) + 1);
+            return
 
-        # Knowing that int(self.status) returns the certain enumerated value to whatever constant self.status is
-        # currently set to, and that Status(this_int) returns the enumerated constant in the Status() class which
-        # has the value of this_int, we can use the two to elegantly advance the OrderItem's status. Pretty neat, eh.
-        self.status = Status(int(self.status) + 1);
+        with self.order._changes():
+            # Knowing that int(self.status) returns the certain enumerated value to whatever constant self.status is
+            # currently set to, and that Status(this_int) returns the enumerated constant in the Status() class
+            # which has the value of this_int, we can use the two to elegantly advance the OrderItem's status.
+            # Pretty neat, eh.
+            self.status = Status(int(self.status) + 1);
+
+            # A started item no longer waits in the kitchen queue, and a served item has left the kitchen, so it
+            # leaves the restaurant's active item index too
+            if self.status == Status.COOKED:
+                self.order._dequeue(self)
+            elif self.status == Status.SERVED:
+                self.order._remove_active(self)
+
+            # Stamping the time of the change, which times the stage it ends (see Order._stamp())
+            self.order._stamp(self)
 
 
     def get_status(self):
@@ -229,19 +1070,44 @@ class OrderItem:
         return self.status;
 
 
+    def time_of(self, status):
+        """ Function returns the time (of the restaurant's clock) this item reached Status <status>, or None if
+        it hasn't or it wasn't stamped (see self.timestamps). """
+        if self.timestamps is None or status < Status.PLACED:
+            return None
+        return self.timestamps[int(status)]
+
+
 
 class MenuItem:
     """ Objects of this class hold the information pertaining to each OrderItem set on the menu. """
 
-    def __init__(self, name, price):
+    __slots__ = ('name', 'price', 'course')
+
+    def __init__(self, name, price, course = 0):
         """ Constructor of MenuItem class.
 
         Upon instantiation, sets the name of the MenuItem to <name> and the
-        price of the menu item to <price>. """
+        price of the menu item to <price>. <course> orders the item in the kitchen queue (earlier courses first). """
 
         self.name = name
         self.price = price
+        self.course = course
+
+
+
+
+# --------- Defining Separate Functions -----------
+
 
+def _sections(source, default, load):
+    """ Returns the list of (section name, rows) pairs of <source>: the <default> rows when it is None, the file at
+    path <source> parsed by <load>, or <source> itself when it is already parsed. """
+    if source is None:
+        return [(DEFAULT_SECTION, default)]
+    if isinstance(source, str) or hasattr(source, '__fspath__'):
+        return load(source)
+    return source
 
 
 # Code cleaned up and ready to go
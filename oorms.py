@@ -25,7 +25,9 @@
           access the values of our status constants with int(Status.this_status). This way it doesn't give us a warning
           unlike using Status.this_status.value with the regular enum.Enum
             a - Strange. I noticed we don't need to import the enumerated status class from model.py/Status in order
-            to use its enumerated constants within any other module.
+            to use its enumerated constants within any other module. Turns out nothing from model.py needs importing
+            here at all: the views only use the Restaurant and the items they get handed, so oorms.py doesn't import
+            model.py (app.py builds the Restaurant).
 
           3 - Huh I think I figured out what this extra argument stuff does. It essentially ensures that each handler
           created for a given object actually gets set to said object. For example, when creating the tables in the
@@ -99,7 +101,9 @@ from abc import ABC
 
 from constants import *
 from controller import RestaurantController, KitchenController
-from model import Restaurant  # Refer to Notes 2a for a comment
+from scene import Scene
+from scheduler import RedrawScheduler
+from spatial import GridIndex
 
 
 # --------------------- Defining Abstract Classes ---------------------
@@ -108,8 +112,11 @@ class RestaurantView(tk.Frame, ABC):
     """  An abstract superclass for the views in the system. """
 
 
-    def __init__(self, master, restaurant, window_width, window_height, controller_class):
-        """ Constructor to RestaurantView class. """
+    def __init__(self, master, restaurant, window_width, window_height, controller_class, scheduler = None):
+        """ Constructor to RestaurantView class.
+
+        <scheduler> is the RedrawScheduler that coalesces this view's redraws. Views sharing one window's event
+        loop should share one scheduler; by default the view gets its own. """
 
         # Calling superclass constructor that gives us the window to put the view in
         super().__init__(master)
@@ -122,38 +129,72 @@ class RestaurantView(tk.Frame, ABC):
         self.canvas.grid()
         self.canvas.update()
 
+        # Retained scene that remembers what's on the canvas, so updates only redraw what changed
+        self.scene = Scene(self.canvas)
+
+        # Scheduler that batches this view's redraws into at most one per idle cycle
+        self.scheduler = scheduler if scheduler is not None else RedrawScheduler(self.after_idle)
+
         # Setting up instance var of the restaurant
         self.restaurant = restaurant
 
         # Adding this RestaurantView object to collection of views within the restaurant model
         self.restaurant.add_view(self)
 
-        # Initializing controller of this view to controller passed through <controller_class>
-        self.controller = controller_class(self, restaurant)
+        # Initializing controller of this view to controller passed through <controller_class>,
+        # which also subscribes this view to the change events its user interface shows
+        self.subscription = None
+        self.set_controller(controller_class(self, restaurant))
         self.controller.create_ui()
 
 
     # ---------------- Defining Methods ----------------
 
     def _make_button(self, text, action, size=BUTTON_SIZE, location=BUTTON_BOTTOM_RIGHT,
-                     rect_style=BUTTON_STYLE, text_style=BUTTON_TEXT_STYLE):
-        """ Provided method that handles button creation in the views. """
+                     rect_style=BUTTON_STYLE, text_style=BUTTON_TEXT_STYLE, key=None, scene=None):
+        """ Provided method that handles button creation in the views.
+
+        <key> identifies the button in the scene, so the same button drawn again next update is reused rather
+        than re-created. Defaults to the button's text. <scene> is the Scene (layer) to draw it in, self.scene by
+        default. """
         w, h = size
         x0, y0 = location
-        box = self.canvas.create_rectangle(x0, y0, x0 + w, y0 + h, **rect_style)
-        label = self.canvas.create_text(x0 + w / 2, y0 + h / 2, text=text, **text_style)
-        self.canvas.tag_bind(box, '<Button-1>', action)
-        self.canvas.tag_bind(label, '<Button-1>', action)
+        key = ('button', text) if key is None else key
+        scene = self.scene if scene is None else scene
+        scene.rectangle((key, 'box'), (x0, y0, x0 + w, y0 + h), **rect_style)
+        scene.text((key, 'label'), x0 + w / 2, y0 + h / 2, text=text, **text_style)
+        scene.bind((key, 'box'), action)
+        scene.bind((key, 'label'), action)
+
+
+    def scenes(self):
+        """ Function returns the Scene objects this view draws with (for profiling.py). """
+        return (self.scene,)
 
 
     def update(self):
+        """ Method marks this view as needing to re-draw its user interface. The scheduler calls redraw() once
+        tkinter goes idle, however many times update() got called in the meantime. """
+        self.scheduler.request(self)
+
+
+    def redraw(self):
         """ Method calls current controller's create_ui() method which tells this view re-draw the user interface. """
         self.controller.create_ui()
 
 
     def set_controller(self, controller):
-        """ Method switches current controller object to <controller> object passed through args. """
+        """ Method switches current controller object to <controller> object passed through args, and swaps
+        this view's subscription for one to the change events the new controller's user interface shows. """
         self.controller = controller
+        if self.subscription is not None:
+            self.restaurant.unsubscribe(self.subscription)
+        self.subscription = self.restaurant.subscribe(self.on_event, controller.EVENT_KINDS, controller.event_tables())
+
+
+    def on_event(self, event):
+        """ Method called by the restaurant with each ChangeEvent <event> this view is subscribed to. """
+        self.update()
 
 
 
@@ -165,13 +206,42 @@ class ServerView(RestaurantView):
     This view appears on the left window when the system is run. View contains the entire view of the restaurant -
     including the tables and chairs in it - and when pressed, shows the order views of the associated tables and chairs.
     Same view found in Lab 3.
+
+    The restaurant user interface is a viewport onto the floor plan: dragging pans it, the mouse wheel zooms it,
+    and only the tables inside it get drawn. A spatial index over the tables finds which ones those are, and which
+    table a click landed on.
     """
 
-    def __init__(self, master, restaurant):
+    def __init__(self, master, restaurant, scheduler = None):
         """ Constructor to ServerView. """
 
-        # Using solely superclass' constructor
-        super().__init__(master, restaurant, SERVER_VIEW_WIDTH, SERVER_VIEW_HEIGHT, RestaurantController)
+        # Setting up the viewport before the superclass' constructor draws the restaurant user interface:
+        # its zoom, the floor plan point at the canvas' top left corner, and the index of where the tables are.
+        self.zoom = RESTAURANT_SCALE
+        self.pan = (0, 0)
+        self.table_index = GridIndex.for_tables(restaurant.tables)
+        self.viewport_shown = False
+        self._press = None
+
+        # The order user interface's menu buttons, a layer of the canvas built the first time it's shown, and the
+        # menu it was built for (see _show_menu()). Also the (position, ordered, cancellable) of each row of the
+        # order list as last drawn, so that rows which didn't change aren't described again (see _draw_order()).
+        self.menu_scene = None
+        self.menu_version = None
+        self.order_rows = {}
+
+        # Using superclass' constructor
+        super().__init__(master, restaurant, SERVER_VIEW_WIDTH, SERVER_VIEW_HEIGHT, RestaurantController, scheduler)
+
+        # Clicks, drags and the mouse wheel on the restaurant user interface are handled for the whole canvas
+        # (the wheel is <MouseWheel> on Windows and macOS, and buttons 4 and 5 on X11). The press is added to the
+        # scene's own click handler rather than replacing it.
+        self.canvas.bind('<ButtonPress-1>', self._pointer_pressed, add = '+')
+        self.canvas.bind('<B1-Motion>', self._pointer_dragged)
+        self.canvas.bind('<ButtonRelease-1>', self._pointer_released)
+        self.canvas.bind('<MouseWheel>', lambda event: self.zoom_at(event.x, event.y, event.delta > 0))
+        self.canvas.bind('<Button-4>', lambda event: self.zoom_at(event.x, event.y, True))
+        self.canvas.bind('<Button-5>', lambda event: self.zoom_at(event.x, event.y, False))
 
 
     # ---------------- Defining Methods ----------------
@@ -180,44 +250,86 @@ class ServerView(RestaurantView):
         """ This method gets called in the RestaurantController object.
 
         When called, uses tkinter's provided canvas methods to create the restaurant's user interface.
-        More specifically, it calls the methods that draws out the tables, and defines the function handler
-        in the event a table is touched.
+        More specifically, it calls the methods that draws out the tables inside the viewport. There are no
+        per-table handlers: a click on the canvas gets resolved to a table through the spatial index
+        (see _pointer_released()).
         """
 
-        # Wiping canvas of all its current pixels
-        self.canvas.delete(tk.ALL)
-
-        # Creating empty list that will contain the IDs of the tables and chairs created.
-        view_ids = []
-
-        # Taking table and chair data stored in self.restaurant object attribute, drawing the tables
-        # and chairs onto the canvas using protected method self._draw_table(). Filling up view_ids while doing so.
-        for ix, table in enumerate(self.restaurant.tables):
-            table_id, seat_ids = self._draw_table(table, scale = RESTAURANT_SCALE)
-            view_ids.append((table_id, seat_ids))
-
-        # Creating a handler for when a table is clicked on
-        for ix, (table_id, seat_ids) in enumerate(view_ids):
-
-            # Pre-written message here: (ayy I get what this means now)
-            # §54.7 "extra arguments trick" in Tkinter 8.5 reference by Shipman
-            # Used to capture current value of ix as table_index for use when
-            # handler is called (i.e., when screen is clicked).
-            # Refer to Notes 3 for a comment on this.
-
-            # Creating the handler function for each table when it is touched.
-            def table_touch_handler(_, table_number = ix):
-                self.controller.table_touched(table_number)
-
-            # Binding the table touch event to the tables on the user interface,
-            # passing in the table_touch_handler through .tag_bind() wrapper function
-            self.canvas.tag_bind(table_id, '<Button-1>', table_touch_handler)
-
-            # Doing the same thing for each seat in the restaurant user interface
-            # (Passing in table_touch_handler() function so that touching a particular seat opens
-            # up the user interface of the table said seat is associated with. Ha ha I figured it out :D)
-            for seat_id in seat_ids:
-                self.canvas.tag_bind(seat_id, '<Button-1>', table_touch_handler)
+        # Starting a new frame of the scene - whatever isn't drawn again below gets wiped off the canvas,
+        # including the tables that just left the viewport
+        self.scene.begin()
+        self.viewport_shown = True
+        self._leave_order_ui()
+
+        # Drawing the tables and chairs that the spatial index finds inside the viewport onto the canvas
+        # using protected method self._draw_table(), shifted by the pan and scaled by the zoom.
+        pan_x, pan_y = self.pan
+        for table_number in self.table_index.query(self.visible_box()):
+            table = self.restaurant.tables[table_number]
+            x0, y0 = table.location
+            self._draw_table(table, location = (x0 - pan_x, y0 - pan_y), scale = self.zoom)
+
+        self.scene.end()
+
+
+    def visible_box(self):
+        """ Function returns the (x0, y0, x1, y1) box of the floor plan the viewport currently shows. """
+        pan_x, pan_y = self.pan
+        return pan_x, pan_y, pan_x + SERVER_VIEW_WIDTH / self.zoom, pan_y + SERVER_VIEW_HEIGHT / self.zoom
+
+
+    def pan_to(self, x, y):
+        """ Method moves the viewport so that floor plan point (<x>, <y>) is at the canvas' top left corner, keeping
+        at least PAN_MARGIN pixels of the floor plan in view. """
+        extent = self.table_index.extent()
+        if extent is not None:
+            margin = PAN_MARGIN / self.zoom
+            x0, y0, x1, y1 = extent
+            x = min(max(x, x0 - SERVER_VIEW_WIDTH / self.zoom + margin), x1 - margin)
+            y = min(max(y, y0 - SERVER_VIEW_HEIGHT / self.zoom + margin), y1 - margin)
+        self.pan = (x, y)
+        self.update()
+
+
+    def zoom_at(self, canvas_x, canvas_y, zoom_in):
+        """ Method zooms the restaurant user interface in (or out if <zoom_in> is False) by ZOOM_STEP, keeping the
+        floor plan point under canvas point (<canvas_x>, <canvas_y>) where it is. """
+        if not self.viewport_shown:
+            return
+        zoom = self.zoom * ZOOM_STEP if zoom_in else self.zoom / ZOOM_STEP
+        zoom = min(max(zoom, MIN_ZOOM), MAX_ZOOM)
+        pan_x, pan_y = self.pan
+        x, y = pan_x + canvas_x / self.zoom, pan_y + canvas_y / self.zoom
+        self.zoom = zoom
+        self.pan_to(x - canvas_x / zoom, y - canvas_y / zoom)
+
+
+    def _pointer_pressed(self, event):
+        """ Remembers where a press on the restaurant user interface started, in case it turns into a drag. """
+        self._press = (event.x, event.y, self.pan, False) if self.viewport_shown else None
+
+
+    def _pointer_dragged(self, event):
+        """ Pans the restaurant user interface along with the pointer, once it moved past DRAG_THRESHOLD. """
+        if self._press is None:
+            return
+        start_x, start_y, (pan_x, pan_y), dragging = self._press
+        dx, dy = event.x - start_x, event.y - start_y
+        if not dragging and abs(dx) < DRAG_THRESHOLD and abs(dy) < DRAG_THRESHOLD:
+            return
+        self._press = (start_x, start_y, (pan_x, pan_y), True)
+        self.pan_to(pan_x - dx / self.zoom, pan_y - dy / self.zoom)
+
+
+    def _pointer_released(self, event):
+        """ Touches the table under the pointer, through the spatial index, if the press wasn't a drag. """
+        press, self._press = self._press, None
+        if press is None or press[3] or not self.viewport_shown:
+            return
+        pan_x, pan_y = self.pan
+        table_number = self.table_index.hit(pan_x + event.x / self.zoom, pan_y + event.y / self.zoom)
+        if table_number is not None:
+            self.controller.table_touched(table_number)
 
 
     def create_table_ui(self, table):
@@ -229,15 +341,17 @@ class ServerView(RestaurantView):
         user interface by drawing it and its selected chairs onto the canvas, and defines the handler for when a given
         seat is clicked on. """
 
-        # Wiping the canvas of all currently drawn pixels
-        self.canvas.delete(tk.ALL)
+        # Starting a new frame of the scene
+        self.scene.begin()
+        self.viewport_shown = False
+        self._leave_order_ui()
 
         # Drawing out the clicked on table and its associated seats in the specified location defined
         # in the constants module (in the top left corner of the window lol)
-        table_id, seat_ids = self._draw_table(table, location = SINGLE_TABLE_LOCATION)
+        table_key, seat_keys = self._draw_table(table, location = SINGLE_TABLE_LOCATION)
 
         # Creating the handler function for each of the table's seats
-        for ix, seat_id in enumerate(seat_ids):
+        for ix, seat_key in enumerate(seat_keys):
 
             # Creating the seat touched event handler for each seat when touched.
             # Refer to Notes 3 for a comment on this.
@@ -246,12 +360,14 @@ class ServerView(RestaurantView):
 
             # Binding the click event to each seat around the table. Passing the
             # seat handler function into this wrapper function.
-            self.canvas.tag_bind(seat_id, '<Button-1>', handler)
+            self.scene.bind(seat_key, handler)
 
         # Creating the button that which closes the current table user interface
         # and return to the restaurant user interface.
         self._make_button('Done', action = lambda event: self.controller.done())
 
+        self.scene.end()
+
 
     def _draw_table(self, table, location = None, scale = 1):
         """ Uses Tkinter's provided canvas methods to draw a given table object out onto the canvas.
@@ -259,7 +375,9 @@ class ServerView(RestaurantView):
         <table> is the table object to be drawn, <location, defaulted to None> refers to where the table object
         is to be drawn on the canvas, and <scale, defaulted to 1> is how large the table is to be drawn.
 
-        Returns the IDs of the table and seats created by tkinter for event binding with the handlers."""
+        Returns the scene keys of the table and seats drawn for event binding with the handlers. The keys are
+        the same whichever location and scale the table is drawn at, so switching between the restaurant and
+        table user interfaces just moves the table rather than re-creating it."""
 
         # Unpacking the coordinates for the offset depending on arguments passed
         offset_x0, offset_y0 = location if location else table.location
@@ -272,11 +390,12 @@ class ServerView(RestaurantView):
                                        offset_x0, offset_y0, scale)
 
         # Drawing the table here.
-        table_id = self.canvas.create_rectangle(*table_bbox, **TABLE_STYLE)
+        table_key = ('table', table.number)
+        self.scene.rectangle(table_key, table_bbox, **TABLE_STYLE)
 
         # Drawing the seats here.
         far_seat_x0 = table_x0 + TABLE_WIDTH + SEAT_SPACING
-        seat_ids = []
+        seat_keys = []
         for ix in range(table.n_seats):
             seat_x0 = (ix % 2) * far_seat_x0
             seat_y0 = (ix // 2 * (SEAT_DIAM + SEAT_SPACING) +
@@ -284,11 +403,12 @@ class ServerView(RestaurantView):
             seat_bbox = _scale_and_offset(seat_x0, seat_y0, SEAT_DIAM, SEAT_DIAM,
                                           offset_x0, offset_y0, scale)
             style = FULL_SEAT_STYLE if table.has_order_for(ix) else EMPTY_SEAT_STYLE
-            seat_id = self.canvas.create_oval(*seat_bbox, **style)
-            seat_ids.append(seat_id)
+            seat_key = ('seat', table.number, ix)
+            self.scene.oval(seat_key, seat_bbox, **style)
+            seat_keys.append(seat_key)
 
-            # Returning table_id's and seat_id's
-        return table_id, seat_ids
+        # Returning table_key and seat_keys
+        return table_key, seat_keys
 
 
     def create_order_ui(self, order):
@@ -299,43 +419,87 @@ class ServerView(RestaurantView):
 
         <order> is the order object that is to track all the orders made for the selected seat. """
 
-        # Wipe canvas of all currently drawn pixels
-        self.canvas.delete(tk.ALL)
+        # Starting a new frame of the scene
+        self.scene.begin()
+        self.viewport_shown = False
+
+        # Showing the menu buttons. They are a layer of their own that stays on the canvas, so adding an item to
+        # the order only goes through the order list below rather than the whole menu.
+        self._show_menu()
+
+        # Literally drawing out the food items put up for order
+        self._draw_order(order)
+
+        # Creating the two buttons for the order user interface: Cancel and Place Orders button
+        self._make_button('Cancel', lambda event: self.controller.cancel_changes(), location = BUTTON_BOTTOM_LEFT)
+        self._make_button('Place Orders', lambda event: self.controller.update_order())
+
+        self.scene.end()
+
+
+    def scenes(self):
+        """ Function returns the Scene objects this view draws with: the menu layer too, once it exists. """
+        return (self.scene,) if self.menu_scene is None else (self.scene, self.menu_scene)
+
+
+    def _show_menu(self):
+        """ Shows the menu layer of the order user interface: a button per menu item, which adds it to the order
+        shown. The layer only gets (re-)built when the restaurant's menu isn't the one it was built for. """
+        if self.menu_scene is None:
+            self.menu_scene = Scene(self.canvas, tag = 'menu')
+        self.menu_scene.show()
+        if self.menu_version is self.restaurant.menu_items:
+            return
+        self.menu_version = self.restaurant.menu_items
 
         # Creating buttons for the order user interface, and the handler
         # for when each button is clicked on.
+        self.menu_scene.begin()
         for ix, item in enumerate(self.restaurant.menu_items):
 
             w, h, margin = MENU_ITEM_SIZE
             x0 = margin
             y0 = margin + (h + margin) * ix
 
-            # Creating the handler function for each button.
+            # Creating the handler function for each button. The layer outlives the OrderController it was built
+            # under, so the handler goes through whichever is current when clicked.
             # Refer to Notes 3 for a comment on this.
             def handler(_, menuitem = item):
                 self.controller.add_item(menuitem)
 
             # Creating each button, and passing their handler into the wrapper function
-            self._make_button(item.name, handler, (w, h), (x0, y0))
+            self._make_button(item.name, handler, (w, h), (x0, y0), key = ('menu', ix), scene = self.menu_scene)
+        self.menu_scene.end()
 
-        # Literally drawing out the food items put up for order
-        self._draw_order(order)
 
-        # Creating the two buttons for the order user interface: Cancel and Place Orders button
-        self._make_button('Cancel', lambda event: self.controller.cancel_changes(), location = BUTTON_BOTTOM_LEFT)
-        self._make_button('Place Orders', lambda event: self.controller.update_order())
+    def _leave_order_ui(self):
+        """ Hides the menu layer of the order user interface (if it was ever shown), and forgets the rows of the
+        order list, which the frame being drawn won't keep. """
+        if self.menu_scene is not None:
+            self.menu_scene.hide()
+        self.order_rows = {}
 
 
     def _draw_order(self, order):
-        """ Draws out the orders placed after pressing a menu item button.  """
+        """ Draws out the orders placed after pressing a menu item button. Only the rows that moved or changed
+        since the last update get described to the scene again; the others are just kept as they are. """
 
         x0, h, m = ORDER_ITEM_LOCATION
+        rows = {}
         for ix, item in enumerate(order.items):
 
             y0 = m + ix * h
-            self.canvas.create_text(x0, y0, text=item.details.name, anchor = tk.NW)
+            row = rows[item] = (y0, item.has_been_ordered(), item.can_be_cancelled())
+            if self.order_rows.get(item) == row:
+                self.scene.keep(('order name', item), ('order dot', item))
+                if row[2]:
+                    self.scene.keep((('order cancel', item), 'box'), (('order cancel', item), 'label'))
+                continue
+
+            self.scene.text(('order name', item), x0, y0, text=item.details.name, anchor = tk.NW)
             dot_style = ORDERED_STYLE if item.has_been_ordered() else NOT_YET_ORDERED_STYLE
-            self.canvas.create_oval(x0 - DOT_SIZE - DOT_MARGIN, y0, x0 - DOT_MARGIN, y0 + DOT_SIZE, **dot_style)
+            self.scene.oval(('order dot', item), (x0 - DOT_SIZE - DOT_MARGIN, y0, x0 - DOT_MARGIN, y0 + DOT_SIZE),
+                            **dot_style)
 
             # The code below is used to cancel an item made in an order if it is still in REQUESTED or PLACED state
             if item.can_be_cancelled():
@@ -347,10 +511,13 @@ class ServerView(RestaurantView):
 
                 # Making the cancel button
                 self._make_button('X', handler, size=CANCEL_SIZE, rect_style=CANCEL_STYLE,
-                                  location=(x0 - 2*(DOT_SIZE + DOT_MARGIN), y0))
+                                  location=(x0 - 2*(DOT_SIZE + DOT_MARGIN), y0), key = ('order cancel', item))
+
+        self.order_rows = rows
 
         # Drawing the total price below the orders placed.
-        self.canvas.create_text(x0, m + len(order.items) * h, text = f'Total: {order.total_cost():.2f}', anchor = tk.NW)
+        self.scene.text('order total', x0, m + len(order.items) * h, text = f'Total: {order.total_cost():.2f}',
+                        anchor = tk.NW)
 
 
 
@@ -360,11 +527,11 @@ class KitchenView(RestaurantView):
     View object that handles the "prep" of all orders placed. """
 
 
-    def __init__(self, master, restaurant):
+    def __init__(self, master, restaurant, scheduler = None):
         """ Constructor to the KitchenView class. """
 
         # Using parent's constructor - basically creates another window for the kitchen.
-        super().__init__(master, restaurant, KITCHEN_VIEW_WIDTH, KITCHEN_VIEW_HEIGHT, KitchenController)
+        super().__init__(master, restaurant, KITCHEN_VIEW_WIDTH, KITCHEN_VIEW_HEIGHT, KitchenController, scheduler)
 
 
     # ---------------- Defining Methods ----------------
@@ -374,50 +541,56 @@ class KitchenView(RestaurantView):
 
         When called, uses tkinter's provided canvas methods to re-draw the kitchen's user interface this window. """
 
-        # Clear the canvas as usual
-        self.canvas.delete(tk.ALL)
+        # Starting a new frame of the scene. Rows are keyed by OrderItem, so when one item's status changes only
+        # its button label gets reconfigured, and the rows below a served item just get moved up.
+        self.scene.begin()
 
-        # Finding the orders for the given table selected
+        # Finding the orders for the given table selected. Only the tables in the restaurant's
+        # index of active items are visited, so served items cost nothing here. They're read all at once, so that
+        # another thread changing the orders meanwhile can't tear the render (see model.py/Notes 2).
         line = 0
-        for table_number, table in enumerate(self.restaurant.tables):
+        for table_number, items in self.restaurant.active_snapshot():
 
-            # Printing out the active orders made of all the tables
-            if table.has_any_active_orders():
+            # Drawing table title, and the button advancing every item of the table at once (for expo staff)
+            self.draw_text_line(('kitchen table', table_number), f'Table {table_number}', K_LEFT,
+                                (line + 0.5) * K_LINE_HEIGHT)
 
-                # Drawing table title
-                self.draw_text_line(f'Table {table_number}', K_LEFT, (line + 0.5) * K_LINE_HEIGHT)
-                line += 1
+            def advance_table(_, number = table_number):
+                self.controller.advance_table(number)
 
-                # For each item in the orders of each table...
-                for order in table.orders:
-                    for item in order.items:
+            self._make_button('ADVANCE ALL', advance_table, location=(K_LEFT + K_BUTTON_SIZE[0] + K_SPACE,
+                                                                     line * K_LINE_HEIGHT),
+                              size=K_BUTTON_SIZE, key = ('kitchen table button', table_number))
+            line += 1
 
-                        # Draw out the item if it has been ordered and not yet served
-                        if item.has_been_ordered() and not item.has_been_served():
+            # For each item that has been ordered and not yet served at this table...
+            for item in items:
 
-                            # Refer to Notes 4 for an explanation on the Status functionality of the items.
+                # Refer to Notes 4 for an explanation on the Status functionality of the items.
 
-                            # Setting the button text depending on current status value
-                            button_options = ["START COOKING", "MARK AS READY", "MARK AS SERVED"];
-                            button_text = button_options[item.get_status().value]
+                # Setting the button text depending on current status value
+                button_options = ["START COOKING", "MARK AS READY", "MARK AS SERVED"];
+                button_text = button_options[item.get_status().value]
 
-                            # Creating the handler for when the text button for item in KitchenView is touched.
-                            # Refer to Notes 3 for a comment on this.
-                            def handler(_, order_item = item):
-                                self.controller.button_pressed(order_item);
+                # Creating the handler for when the text button for item in KitchenView is touched.
+                # Refer to Notes 3 for a comment on this.
+                def handler(_, order_item = item):
+                    self.controller.button_pressed(order_item);
+
+                # Creating the buttons for each of the orders
+                self._make_button(button_text, handler,
+                                  location=(K_LEFT, line * K_LINE_HEIGHT),
+                                  size=K_BUTTON_SIZE, key = ('kitchen button', item))
+                self.draw_text_line(('kitchen name', item), item.details.name, K_LEFT + K_BUTTON_SIZE[0] + K_SPACE,
+                                    (line + 0.4) * K_LINE_HEIGHT)
+                line += 1
 
-                            # Creating the buttons for each of the orders
-                            self._make_button(button_text, handler,
-                                              location=(K_LEFT, line * K_LINE_HEIGHT),
-                                              size=K_BUTTON_SIZE)
-                            self.draw_text_line(item.details.name, K_LEFT + K_BUTTON_SIZE[0] + K_SPACE,
-                                                (line + 0.4) * K_LINE_HEIGHT)
-                            line += 1
+        self.scene.end()
 
 
-    def draw_text_line(self, text, x, y):
-        """ This method gets called in the create_kitchen_order_ui() method. """
-        self.canvas.create_text(x, y, text = text, anchor = tk.W)
+    def draw_text_line(self, key, text, x, y):
+        """ This method gets called in the create_kitchen_order_ui() method. <key> identifies the line in the scene. """
+        self.scene.text(key, x, y, text = text, anchor = tk.W)
 
 
 
@@ -439,34 +612,10 @@ def _scale_and_offset(x0, y0, width, height, offset_x0, offset_y0, scale):
 
 if __name__ == "__main__":
 
-    # Creating the restaurant object
-    restaurant_info = Restaurant()
-
-    # Retrieving a window object from tkinter
-    root = tk.Tk()
-
-    # Creating the ServerView object
-    ServerView(root, restaurant_info)
-    root.title('Server View v2')
-    root.wm_resizable(0, 0)
-
-    # Creating the KitchenView object
-    kitchen_window = tk.Toplevel()
-    KitchenView(kitchen_window, restaurant_info)
-    kitchen_window.title('Kitchen View v2')
-    kitchen_window.wm_resizable(0, 0)
-
-    # Aligning the two windows with each other upon creation
-    root.update_idletasks()
-    kh = kitchen_window.winfo_height()
-    kw = kitchen_window.winfo_width()
-    sw = root.winfo_width()
-    sx = root.winfo_x()
-    sy = root.winfo_y()
-    kitchen_window.geometry(f'{kw}x{kh}+{sx + sw + 10}+{sy}')
-
-    # Calling the mainloop of the program.
-    root.mainloop()
+    # The entry point lives in app.py, which can also start either window on its own, or neither. It gets this
+    # module's views handed to it, rather than importing this file again as oorms (see app.py/Notes 4)
+    import app
+    app.main(window_classes = {'server': ServerView, 'kitchen': KitchenView})
 
 
 # nice. cleaned up and good to go.
\ No newline at end of file
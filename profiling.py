@@ -0,0 +1,156 @@
+"""
+
+    Description:
+        Module that contains the OORMS' profiling hooks: timings of every controller action (table_touched,
+        seat_touched, add_item, update_order, button_pressed...) and of every view render (the create_*_ui methods),
+        along with the number of canvas items each render created and deleted. They are kept in Histograms and can
+        be dumped as JSON at any time, so a terminal can be profiled while it's in use without a debugger.
+
+    Classes defined in this module:
+        - Profiler Class
+
+    Notes:
+        1 - Profiling is opt-in: nothing gets timed until Profiler.install(), which wraps the methods on the classes
+        themselves, and uninstall() puts the original methods back. A run that doesn't profile doesn't pay for it,
+        not even a flag check. oorms.py and server.py install one with --profile FILE and dump it on exit.
+
+        2 - The controller actions are the public methods of the controller classes, except create_ui() and
+        event_tables() which only lead to the render. Actions only mark the views dirty (see controller.py/Notes 2),
+        so the renders they cause get timed on their own when the RedrawScheduler runs them - except for a headless
+        view without a scheduler, which renders inside the action.
+
+        3 - Canvas item counts are read off the Scene counters of the views that have any (see
+        RestaurantView.scenes()): items created and deleted, plus the ones taken out of and put back into the
+        scene's pool (see scene.py/Notes 3). Headless views only get their renders timed.
+
+"""
+
+# ---- Importing built-in Libraries ----
+
+import functools
+import json
+import time
+
+
+# ---- Importing from other modules -----
+
+from histogram import Histogram
+from hooks import CONTROLLER_CLASSES, wrap_method, unwrap_methods
+
+
+# The methods of the controller classes that aren't actions (see Notes 2)
+NOT_ACTIONS = frozenset({'create_ui', 'event_tables'})
+
+# The canvas item counts kept for each render (see Notes 3)
+SCENE_COUNTS = ('created', 'deleted', 'reused', 'hidden')
+
+
+
+class Profiler:
+    """ Times the controller actions and view renders while installed. """
+
+    def __init__(self, clock = time.perf_counter):
+        """ Constructor to the Profiler class. <clock> is the function used to time the calls. """
+
+        self.clock = clock
+
+        # Action or render name ('OrderController.add_item', 'ServerView.create_order_ui'...) -> Histogram of the
+        # durations of its calls
+        self.timings = {}
+
+        # Render name -> dict of the totals of each of SCENE_COUNTS over its calls, and of the most items one
+        # call created and deleted
+        self.renders = {}
+
+        # (class, name, wrapper maker) of every method install() wrapped (see hooks.py)
+        self.installed = []
+
+
+    # ---------------- Defining Methods ----------------
+
+    def install(self, view_classes = (), controller_classes = CONTROLLER_CLASSES):
+        """ Method starts timing the actions of the <controller_classes> and the create_*_ui() methods of the
+        <view_classes> (those they define themselves). Returns this profiler. """
+        if self.installed:
+            raise RuntimeError('This profiler is already installed')
+        for cls in controller_classes:
+            for name, function in list(vars(cls).items()):
+                if callable(function) and not name.startswith('_') and name not in NOT_ACTIONS:
+                    wrap_method(self.installed, cls, name, functools.partial(self._timed, f'{cls.__name__}.{name}'))
+        for cls in view_classes:
+            for name, function in list(vars(cls).items()):
+                if callable(function) and name.startswith('create_') and name.endswith('_ui'):
+                    wrap_method(self.installed, cls, name, functools.partial(self._rendered, f'{cls.__name__}.{name}'))
+        return self
+
+
+    def uninstall(self):
+        """ Method puts back every method install() wrapped. What was recorded so far is kept. """
+        unwrap_methods(self.installed)
+
+
+    def summary(self):
+        """ Function returns a dict of the timings (see Histogram.summary(), in microseconds, plus the buckets) of
+        every action and render called so far, and of the canvas item counts of the renders. """
+        timings = {}
+        for name, histogram in sorted(self.timings.items()):
+            timings[name] = histogram.summary('us')
+            timings[name]['buckets_us'] = [[bound * 1e6, count] for bound, count in histogram.buckets()]
+        renders = {name: dict(counts, calls = self.timings[name].count)
+                   for name, counts in sorted(self.renders.items())}
+        return {'timings': timings, 'renders': renders}
+
+
+    def dump(self, path):
+        """ Method writes the summary() to the JSON file <path>. """
+        with open(path, 'w') as profile_file:
+            json.dump(self.summary(), profile_file, indent = 2)
+
+
+    def _timed(self, name, function):
+        """ Returns <function> wrapped to record the duration of its calls under <name>. """
+        histogram = self.timings.setdefault(name, Histogram())
+        clock = self.clock
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.add(clock() - start)
+
+        return timed
+
+
+    def _rendered(self, name, function):
+        """ Returns the create_*_ui() method <function> wrapped to record the duration of its calls under <name>,
+        along with the canvas items they changed. """
+        histogram = self.timings.setdefault(name, Histogram())
+        counts = self.renders.setdefault(name, dict.fromkeys(SCENE_COUNTS + ('most_created', 'most_deleted'), 0))
+        clock = self.clock
+
+        @functools.wraps(function)
+        def rendered(view, *args, **kwargs):
+            before = _scene_counts(view)
+            start = clock()
+            try:
+                return function(view, *args, **kwargs)
+            finally:
+                histogram.add(clock() - start)
+                changes = [after - before for before, after in zip(before, _scene_counts(view))]
+                for count, change in zip(SCENE_COUNTS, changes):
+                    counts[count] += change
+                counts['most_created'] = max(counts['most_created'], changes[0])
+                counts['most_deleted'] = max(counts['most_deleted'], changes[1])
+
+        return rendered
+
+
+
+# --------- Defining Separate Functions -----------
+
+def _scene_counts(view):
+    """ Function returns the SCENE_COUNTS summed over the scenes of <view>, zeros if it has none. """
+    scenes = view.scenes() if hasattr(view, 'scenes') else ()
+    return [sum(getattr(scene, count) for scene in scenes) for count in SCENE_COUNTS]
@@ -0,0 +1,121 @@
+"""
+
+    Description:
+        Module that contains the wire protocol spoken between the terminal server (server.py) and its terminals
+        (client.py): server terminals and kitchen displays running somewhere else than the process that owns the
+        Restaurant.
+
+    Classes defined in this module:
+        - ProtocolError Class (inherits Exception)
+
+    Notes:
+        1 - Every frame is a FRAME_HEADER (length of the body, frame type) followed by its body:
+            REQUEST - REQUEST (sequence number, operation, table, seat, index), terminal to server
+            REPLY   - REPLY (sequence number of the request, result) followed by the ORDER_ITEM records of the
+                      order asked for (OP_ORDER), or by the utf-8 error message (RESULT_ERROR)
+            PUSH    - PUSH (EventKind value, table, seat, item id, menu item id, status, server time), server to
+                      terminal, whenever something the terminal's current screen shows changed
+        Menu item ids are indices in the restaurant's menu, item ids are the items' OrderItem.id. Seats, items and
+        menu item ids a change event doesn't have (a table's occupancy changing) are sent as NO_SEAT and NO_ITEM.
+        An ITEMS_ADVANCED event is pushed as one ITEMS_ADVANCED push per item, all in the same write.
+
+        2 - The operations are the controllers' operations. A connection starts out as a server terminal showing the
+        restaurant (RestaurantController), and moves through the table and order screens like oorms.ServerView does:
+            OP_TABLE_TOUCHED (table), OP_SEAT_TOUCHED (seat), OP_ADD_ITEM (index: menu item id),
+            OP_REMOVE_ITEM (index: item id, of an item of the order shown), OP_UPDATE_ORDER, OP_CANCEL_CHANGES, OP_DONE
+        OP_KITCHEN turns the connection into a kitchen display, which takes OP_BUTTON_PRESSED (index: item id).
+        OP_ORDER (table, seat) works from any screen and replies with the order's items. Unused fields are sent as
+        0.
+
+        3 - Requests can be pipelined: replies come back in order, tagged with their request's sequence number.
+        Pushes may come in between replies; the ones caused by a request are sent before its reply.
+
+        4 - The server time of a push is time.monotonic() when the change happened. It is only comparable with the
+        terminal's own time.monotonic() when both run on the same machine, which is what the load benchmark uses it
+        for (push latency over loopback).
+
+"""
+
+# ---- Importing built-in Libraries ----
+
+import struct
+
+
+FRAME_HEADER = struct.Struct('<IB')
+REQUEST = struct.Struct('<IBIHI')
+REPLY = struct.Struct('<IB')
+PUSH = struct.Struct('<BIHIIbd')
+ORDER_ITEM = struct.Struct('<IIbB')
+
+# Frame types
+FRAME_REQUEST = 1
+FRAME_REPLY = 2
+FRAME_PUSH = 3
+
+# Operations (see Notes 2)
+OP_TABLE_TOUCHED = 1
+OP_SEAT_TOUCHED = 2
+OP_ADD_ITEM = 3
+OP_REMOVE_ITEM = 4
+OP_UPDATE_ORDER = 5
+OP_CANCEL_CHANGES = 6
+OP_DONE = 7
+OP_KITCHEN = 8
+OP_BUTTON_PRESSED = 9
+OP_ORDER = 10
+
+# Results
+RESULT_OK = 0
+RESULT_ERROR = 1
+
+# Stand-ins for the seat and (menu) item of a change event that has none
+NO_SEAT = 0xFFFF
+NO_ITEM = 0xFFFFFFFF
+
+
+
+class ProtocolError(Exception):
+    """ Raised for a request the server can't carry out (on the server), or for its error reply (on the terminal). """
+
+
+
+# --------- Defining Separate Functions -----------
+
+def frame(frame_type, body):
+    """ Function returns the frame of type <frame_type> carrying the bytes <body>. """
+    return FRAME_HEADER.pack(len(body), frame_type) + body
+
+
+async def read_frame(reader, max_length = None):
+    """ Function reads the next frame from the asyncio.StreamReader <reader>, and returns its (type, body) pair.
+    Raises asyncio.IncompleteReadError if the connection closes, and ProtocolError, without reading its body, if
+    the frame declares a body longer than <max_length> bytes. """
+    length, frame_type = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+    if max_length is not None and length > max_length:
+        raise ProtocolError(f'frame of {length} bytes, over the {max_length} allowed')
+    return frame_type, await reader.readexactly(length)
+
+
+def request_frame(sequence, operation, table = 0, seat = 0, index = 0):
+    """ Function returns the request frame of <operation> on <table>, <seat> and <index>. """
+    return frame(FRAME_REQUEST, REQUEST.pack(sequence, operation, table, seat, index))
+
+
+def reply_frame(sequence, result = RESULT_OK, payload = b''):
+    """ Function returns the reply frame to request <sequence>. """
+    return frame(FRAME_REPLY, REPLY.pack(sequence, result) + payload)
+
+
+def push_frame(kind, table_number, seat, item, menu_id, timestamp):
+    """ Function returns the push frame of a change of EventKind <kind> to the OrderItem <item> (None if it has
+    none) of seat <seat> of table <table_number>. <menu_id> is the id of the item's menu item. """
+    return frame(FRAME_PUSH, PUSH.pack(kind.value, table_number, NO_SEAT if seat is None else seat,
+                                       NO_ITEM if item is None else item.id, NO_ITEM if menu_id is None else menu_id,
+                                       0 if item is None else int(item.status), timestamp))
+
+
+def order_payload(items, menu_ids):
+    """ Function returns the ORDER_ITEM records of the OrderItem objects <items>. <menu_ids> maps MenuItem
+    objects to their ids. """
+    return b''.join(ORDER_ITEM.pack(item.id, menu_ids[item.details], int(item.status), item.has_been_ordered())
+                    for item in items)
@@ -0,0 +1,224 @@
+"""
+
+    Description:
+        Module that contains the retained-mode scene layer used by the views in oorms.py. Rather than wiping the
+        canvas and re-drawing every rectangle, oval and text on each update, the views describe what should be on
+        screen, keyed by the model object each canvas item represents (an OrderItem, a (table, seat) pair, ...).
+        The Scene then compares that description against what it drew last time and only sends the differences
+        to the canvas: coords() for things that moved, itemconfigure() for things that changed look, and
+        create/delete for things that appeared or left.
+
+    Classes defined in this module:
+        - Scene Class
+
+    Notes:
+        1 - A frame goes like this: begin(), then one rectangle()/oval()/text() call per canvas item that should be
+        on screen, then end(). Anything that was on screen last frame but wasn't drawn this frame gets deleted in
+        end(). Keys only need to be hashable and unique within a frame.
+
+        2 - There are no per-item bindings: the scene binds one click handler to the whole canvas, which looks the
+        clicked item ('current', the topmost item under the pointer) up in self.actions. Binding an item's handler
+        is then only a dict assignment, and no Tcl callback ever gets registered (or leaked) per item.
+
+        3 - Items that leave the scene aren't deleted but hidden, and kept in a pool for the next item of the same
+        kind drawn with the same option names (a button box, a kitchen line...). Reusing one costs a coords() and
+        an itemconfigure() of what differs, rather than a delete now and a create later, so switching between
+        screens or serving kitchen rows doesn't allocate new canvas items. A reused item is raised to the top, as a
+        new one would be. At most SCENE_POOL_SIZE items of each kind are kept; clear() really deletes everything.
+
+        4 - A scene given a tag is a layer: every item it shows carries the tag, so hide() and show() toggle the
+        whole layer with a single itemconfigure() however many items it has. A view can keep a layer that rarely
+        changes (the order screen's menu) on the canvas, hidden while other screens are up, instead of describing
+        it again on every update. Pooled items lose the tag, so show() doesn't bring them back. Only draw into a
+        layer while it's shown.
+
+"""
+
+# ---- Importing from other modules -----
+
+from constants import SCENE_POOL_SIZE
+
+
+
+class Scene:
+    """ Retained set of canvas items, keyed by the model objects they represent. """
+
+    def __init__(self, canvas, tag = None):
+        """ Constructor to the Scene class.
+
+        <canvas> is the tkinter Canvas (or anything with the same create_*/coords/itemconfigure/delete/tag_raise/
+        find_withtag/bind methods) that this scene draws onto. <tag> makes the scene a layer (see Notes 4). """
+
+        self.canvas = canvas
+        self.tag = tag
+        self.shown = True
+
+        # key -> [canvas id, kind, coords, options] of every item currently on the canvas
+        self.elements = {}
+
+        # canvas id -> click handler of the items that are currently clickable, and the one handler looking
+        # clicks up in it (see Notes 2). add = '+' keeps the views' own bindings on the canvas working.
+        self.actions = {}
+        self.canvas.bind('<Button-1>', self._clicked, add = '+')
+
+        # (kind, option names) -> [canvas id, coords, options] of the hidden items waiting to be reused (Notes 3)
+        self.pool = {}
+
+        # Number of canvas items created, deleted, taken out of the pool and put into it so far (for profiling.py)
+        self.created = 0
+        self.deleted = 0
+        self.reused = 0
+        self.hidden = 0
+
+        # Keys drawn and canvas ids bound during the frame being built
+        self._seen = set()
+        self._bound = set()
+
+
+    # ---------------- Defining Methods ----------------
+
+    def begin(self):
+        """ Method starts a new frame. """
+        self._seen = set()
+        self._bound = set()
+
+
+    def end(self):
+        """ Method finishes the current frame by deleting every item that wasn't drawn during it, and
+        forgetting the click handlers of the items that weren't bound during it. """
+        for key in [key for key in self.elements if key not in self._seen]:
+            self._delete(key)
+        for item_id in [item_id for item_id in self.actions if item_id not in self._bound]:
+            del self.actions[item_id]
+
+
+    def clear(self):
+        """ Method deletes every item of the scene from the canvas, the pooled ones included. """
+        for key in list(self.elements):
+            self._delete(key)
+        for pooled in self.pool.values():
+            for item_id, _, _ in pooled:
+                self.canvas.delete(item_id)
+                self.deleted += 1
+        self.pool.clear()
+        self.actions.clear()
+
+
+    def show(self):
+        """ Method shows every item of this layer (see Notes 4). """
+        if not self.shown:
+            self.shown = True
+            self.canvas.itemconfigure(self.tag, state = 'normal')
+
+
+    def hide(self):
+        """ Method hides every item of this layer, keeping them (and their click handlers) for show(). """
+        if self.shown:
+            self.shown = False
+            self.canvas.itemconfigure(self.tag, state = 'hidden')
+
+
+    def rectangle(self, key, coords, **options):
+        """ Draws (or updates) the rectangle <key> with bounding box <coords>. Returns its canvas id. """
+        return self._element('rectangle', key, coords, options)
+
+
+    def oval(self, key, coords, **options):
+        """ Draws (or updates) the oval <key> with bounding box <coords>. Returns its canvas id. """
+        return self._element('oval', key, coords, options)
+
+
+    def text(self, key, x, y, **options):
+        """ Draws (or updates) the text item <key> at (<x>, <y>). Returns its canvas id. """
+        return self._element('text', key, (x, y), options)
+
+
+    def bind(self, key, action):
+        """ Method makes <action> the click handler of the item <key> drawn during this frame. """
+        item_id = self.elements[key][0]
+        self.actions[item_id] = action
+        self._bound.add(item_id)
+
+
+    def keep(self, *keys):
+        """ Method keeps the items <keys> on the canvas as the last frame drew them, click handlers included,
+        without describing them again. """
+        for key in keys:
+            self._seen.add(key)
+            item_id = self.elements[key][0]
+            if item_id in self.actions:
+                self._bound.add(item_id)
+
+
+    def _clicked(self, event):
+        """ Canvas click handler: dispatches the click to the item under the pointer, if it has a handler. """
+        for item_id in self.canvas.find_withtag('current'):
+            self._dispatch(item_id, event)
+
+
+    def _dispatch(self, item_id, event):
+        """ Calls the current click handler of canvas item <item_id>, if it still has one. """
+        action = self.actions.get(item_id)
+        if action is not None:
+            action(event)
+
+
+    def _element(self, kind, key, coords, options):
+        """ Creates the canvas item <key> if it is new, otherwise only sends the canvas the coords and options
+        that changed since the last frame. Returns the item's canvas id. """
+        self._seen.add(key)
+        coords = tuple(coords)
+        element = self.elements.get(key)
+
+        if element is None or element[1] != kind:
+            if element is not None:
+                self._delete(key)
+            pooled = self.pool.get((kind, tuple(options)))
+            if not pooled:
+                if self.tag is None:
+                    item_id = getattr(self.canvas, 'create_' + kind)(*coords, **options)
+                else:
+                    item_id = getattr(self.canvas, 'create_' + kind)(*coords, tags = self.tag, **options)
+                self.elements[key] = [item_id, kind, coords, options]
+                self.created += 1
+                return item_id
+
+            # Reusing a hidden item of the same kind and option names
+            item_id, old_coords, old_options = pooled.pop()
+            if coords != old_coords:
+                self.canvas.coords(item_id, *coords)
+            changed = {name: value for name, value in options.items() if old_options[name] != value}
+            if self.tag is not None:
+                changed['tags'] = self.tag
+            self.canvas.itemconfigure(item_id, state = 'normal', **changed)
+            self.canvas.tag_raise(item_id)
+            self.elements[key] = [item_id, kind, coords, options]
+            self.reused += 1
+            return item_id
+
+        item_id, _, old_coords, old_options = element
+        if coords != old_coords:
+            self.canvas.coords(item_id, *coords)
+            element[2] = coords
+        if options != old_options:
+            self.canvas.itemconfigure(item_id, **options)
+            element[3] = options
+        return item_id
+
+
+    def _delete(self, key):
+        """ Takes the canvas item <key> out of the scene, hiding it for reuse if its pool has room (see Notes 3),
+        deleting it otherwise. """
+        item_id, kind, coords, options = self.elements.pop(key)
+        self.actions.pop(item_id, None)
+        pooled = self.pool.setdefault((kind, tuple(options)), [])
+        if len(pooled) < SCENE_POOL_SIZE:
+            if self.tag is None:
+                self.canvas.itemconfigure(item_id, state = 'hidden')
+            else:
+                self.canvas.itemconfigure(item_id, state = 'hidden', tags = ())
+            pooled.append((item_id, coords, options))
+            self.hidden += 1
+        else:
+            self.canvas.delete(item_id)
+            self.deleted += 1
@@ -0,0 +1,85 @@
+"""
+
+    Description:
+        Module that contains the redraw scheduler used by the views in oorms.py. Instead of every model change
+        re-drawing a view straight away, the view gets marked dirty, and all the dirty views get re-drawn once
+        when tkinter next goes idle. A burst of clicks (or a scripted bulk action) that changes the model ten times
+        before tkinter gets a chance to breathe thus costs one redraw per view rather than ten.
+
+    Classes defined in this module:
+        - RedrawScheduler Class
+
+    Notes:
+        1 - The frame budget caps how long one flush may spend re-drawing. Views still dirty once it is spent get
+        re-drawn on the next idle cycle, so one slow view can't freeze the other window's clicks.
+
+        2 - skipped counts the redraws that were asked for while the view was already waiting to be re-drawn,
+        ie. the redraws the scheduler saved us.
+
+"""
+
+# ---- Importing built-in Libraries ----
+
+import time
+
+
+# ---- Importing from other modules -----
+
+from constants import FRAME_BUDGET
+
+
+
+class RedrawScheduler:
+    """ Coalesces redraw requests so that each dirty view is re-drawn at most once per idle cycle. """
+
+    def __init__(self, after_idle, frame_budget = FRAME_BUDGET, clock = time.perf_counter):
+        """ Constructor to the RedrawScheduler class.
+
+        <after_idle> is the function used to have flush() called when the event loop next goes idle (a tkinter
+        widget's after_idle method), <frame_budget> is the number of seconds one flush may spend re-drawing,
+        and <clock> is the function used to time it. """
+
+        self.after_idle = after_idle
+        self.frame_budget = frame_budget
+        self.clock = clock
+
+        # Views waiting to be re-drawn, in the order they were first asked for (dict used as an ordered set)
+        self.dirty = {}
+        self.scheduled = False
+
+        # Number of redraws done, and number of redraws asked for that were coalesced into one already pending
+        self.renders = 0
+        self.skipped = 0
+
+
+    # ---------------- Defining Methods ----------------
+
+    def request(self, view):
+        """ Method marks <view> as needing to be re-drawn. Its redraw() method gets called on the next flush. """
+        if view in self.dirty:
+            self.skipped += 1
+            return
+        self.dirty[view] = None
+        if not self.scheduled:
+            self.scheduled = True
+            self.after_idle(self.flush)
+
+
+    def flush(self):
+        """ Method re-draws the dirty views, until they're all done or the frame budget is spent. """
+        self.scheduled = False
+        deadline = self.clock() + self.frame_budget
+        while self.dirty:
+            view = next(iter(self.dirty))
+            del self.dirty[view]
+            view.redraw()
+            self.renders += 1
+            if self.dirty and self.clock() >= deadline:
+                self.scheduled = True
+                self.after_idle(self.flush)
+                return
+
+
+    def stats(self):
+        """ Function returns the scheduler's counters as a dict. """
+        return {'renders': self.renders, 'skipped': self.skipped, 'pending': len(self.dirty)}
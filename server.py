@@ -0,0 +1,386 @@
+"""
+
+    Description:
+        Module that contains the terminal server: an asyncio server that hosts one Restaurant and lets any number of
+        server terminals and kitchen displays drive it over a local socket (see protocol.py for the protocol), each
+        one getting pushed the changes its current screen shows as they happen.
+
+        Run it from the root of the project with:
+            python server.py [--host HOST] [--port N] [--unix PATH] [--layout FILE] [--menu FILE] [--profile FILE]
+                             [--record FILE]
+
+        With --profile, the controller actions and renders get timed (see profiling.py) and written to FILE on exit,
+        and also whenever the server gets SIGUSR1 (where there is one), so a running server can be looked into.
+        With --record, every terminal's actions get recorded to the trace FILE, for replaying later (see traces.py).
+
+    Classes defined in this module:
+        - TerminalView Class (inherits HeadlessServerView)
+        - KitchenDisplayView Class (inherits HeadlessKitchenView)
+        - Session Class
+        - RestaurantServer Class
+
+    Notes:
+        1 - Each connection gets a headless view of its own, with its own controller, exactly like an oorms.py
+        window. So a terminal is subscribed to the same change events a ServerView or KitchenView on that screen
+        would be, and its view turns each of them into a push rather than a redraw.
+
+        2 - Everything runs on the event loop's thread, so the Restaurant is only ever touched by one request at a
+        time and needs no locking. Frames going to a terminal are gathered and written once per pass of the event
+        loop, so a request that changes several items (placing an order) costs each terminal a single write.
+
+        3 - A terminal that doesn't read its pushes would have them pile up in the server's memory. Once more than
+        PUSH_BUFFER_LIMIT bytes are waiting for it, its connection gets dropped.
+
+        4 - A frame that isn't a request, or whose body isn't exactly a REQUEST, gets its connection closed: there is
+        no telling which request it was meant to be, so there is no reply to send. The server never reads more of it
+        than a request's worth, whatever length the frame declares. A request that does parse gets a reply
+        whatever happens to it: any exception its handler raises becomes an error reply.
+
+"""
+
+# ---- Importing built-in Libraries ----
+
+import argparse
+import asyncio
+import signal
+import time
+
+
+# ---- Importing from other modules -----
+
+from constants import SERVER_HOST, SERVER_PORT, PUSH_BUFFER_LIMIT
+from headless import HeadlessServerView, HeadlessKitchenView
+from model import Restaurant
+from profiling import Profiler
+from protocol import (REQUEST, FRAME_REQUEST, RESULT_ERROR, ProtocolError, read_frame, reply_frame, push_frame,
+                      order_payload, OP_TABLE_TOUCHED, OP_SEAT_TOUCHED, OP_ADD_ITEM, OP_REMOVE_ITEM, OP_UPDATE_ORDER,
+                      OP_CANCEL_CHANGES, OP_DONE, OP_KITCHEN, OP_BUTTON_PRESSED, OP_ORDER)
+from traces import TraceRecorder
+
+
+
+class TerminalView(HeadlessServerView):
+    """ Headless server view of a remote server terminal, pushing the changes it's shown to it. """
+
+    def __init__(self, restaurant, session):
+        """ Constructor to the TerminalView class. <session> is the Session of the terminal's connection. """
+        self.session = session
+        super().__init__(restaurant)
+
+
+    def on_event(self, event):
+        """ Method pushes the ChangeEvent <event> to the terminal. """
+        self.session.push(event)
+
+
+
+class KitchenDisplayView(HeadlessKitchenView):
+    """ Headless kitchen view of a remote kitchen display, pushing the changes it's shown to it. """
+
+    def __init__(self, restaurant, session):
+        """ Constructor to the KitchenDisplayView class. <session> is the Session of the display's connection. """
+        self.session = session
+        super().__init__(restaurant)
+
+
+    def on_event(self, event):
+        """ Method pushes the ChangeEvent <event> to the display. """
+        self.session.push(event)
+
+
+    def create_kitchen_order_ui(self):
+        """ The display draws its own list from the pushes, so there's nothing to walk here. """
+        self.last_UI_created = 'kitchen'
+
+
+
+class Session:
+    """ Connection of one terminal to the RestaurantServer. """
+
+    def __init__(self, server, reader, writer):
+        """ Constructor to the Session class. <reader> and <writer> are the asyncio streams of the connection. """
+
+        self.server = server
+        self.restaurant = server.restaurant
+        self.reader = reader
+        self.writer = writer
+        self.view = TerminalView(self.restaurant, self)
+
+        # Frames waiting for the next write (see Notes 2)
+        self.outbox = []
+        self.closed = False
+
+
+    # ---------------- Defining Methods ----------------
+
+    async def run(self):
+        """ Method carries out the terminal's requests until it disconnects, or sends a bad frame (see Notes 4). """
+        try:
+            while True:
+                frame_type, body = await read_frame(self.reader, REQUEST.size)
+                if frame_type != FRAME_REQUEST or len(body) != REQUEST.size:
+                    break
+                self.handle(*REQUEST.unpack(body))
+                if self.closed:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ProtocolError):
+            pass
+        finally:
+            self.close()
+
+
+    def handle(self, sequence, operation, table, seat, index):
+        """ Method carries out one request, and queues its reply. """
+        self.server.requests += 1
+        try:
+            handler = self.HANDLERS.get(operation)
+            if handler is None:
+                raise ProtocolError(f'unknown operation {operation}')
+            payload = handler(self, table, seat, index)
+        except ProtocolError as error:
+            self.send(reply_frame(sequence, RESULT_ERROR, str(error).encode()))
+        except Exception as error:
+            # A request the model or a controller turned down still gets its reply, rather than dropping the terminal
+            self.send(reply_frame(sequence, RESULT_ERROR, f'{type(error).__name__}: {error}'.encode()))
+        else:
+            self.send(reply_frame(sequence, payload = payload or b''))
+
+
+    def push(self, event):
+        """ Method queues the push of the ChangeEvent <event>, one push per item for an ITEMS_ADVANCED one. """
+        now = time.monotonic()
+        menu_ids = self.server.menu_ids
+        if event.items is not None:
+            for item in event.items:
+                self.send(push_frame(event.kind, item.order.table.number, item.order.seat, item,
+                                     menu_ids[item.details], now))
+            self.server.pushes += len(event.items)
+        else:
+            menu_id = None if event.item is None else menu_ids[event.item.details]
+            self.send(push_frame(event.kind, event.table_number, event.seat, event.item, menu_id, now))
+            self.server.pushes += 1
+
+
+    def send(self, data):
+        """ Method queues the frame <data>, writing every queued frame at the end of this pass of the event loop. """
+        if self.closed:
+            return
+        if not self.outbox:
+            asyncio.get_running_loop().call_soon(self._flush)
+        self.outbox.append(data)
+
+
+    def close(self):
+        """ Method closes the connection, and takes the terminal's view out of the restaurant. """
+        if self.closed:
+            return
+        self.closed = True
+        self.restaurant.unsubscribe(self.view.subscription)
+        self.restaurant.remove_view(self.view)
+        self.reader.feed_eof()
+        self.writer.close()
+        self.server.sessions.discard(self)
+
+
+    def _flush(self):
+        """ Writes the queued frames, dropping the connection if the terminal is too far behind (see Notes 3). """
+        if self.closed:
+            return
+        self.writer.write(b''.join(self.outbox))
+        self.outbox = []
+        if self.writer.transport.get_write_buffer_size() > PUSH_BUFFER_LIMIT:
+            self.close()
+
+
+    def _controller(self, operation):
+        """ Returns the bound method <operation> of the current controller, if it has one. """
+        method = getattr(self.view.controller, operation, None)
+        if method is None:
+            raise ProtocolError(f'{operation} is not available to a {type(self.view.controller).__name__}')
+        return method
+
+
+    def _table(self, table):
+        """ Returns the Table object numbered <table>. """
+        if not 0 <= table < len(self.restaurant.tables):
+            raise ProtocolError(f'there is no table {table}')
+        return self.restaurant.tables[table]
+
+
+    def _item(self, item_id):
+        """ Returns the OrderItem object of id <item_id>. """
+        try:
+            return self.restaurant.item(item_id)
+        except KeyError:
+            raise ProtocolError(f'there is no item {item_id}') from None
+
+
+    # ---------------- Defining the Request Handlers ----------------
+
+    def _table_touched(self, table, seat, index):
+        self._controller('table_touched')(self._table(table).number)
+
+
+    def _seat_touched(self, table, seat, index):
+        seat_touched = self._controller('seat_touched')
+        if not 0 <= seat < self.view.controller.table.n_seats:
+            raise ProtocolError(f'there is no seat {seat} at table {self.view.controller.table.number}')
+        seat_touched(seat)
+
+
+    def _add_item(self, table, seat, index):
+        add_item = self._controller('add_item')
+        if not 0 <= index < len(self.restaurant.menu_items):
+            raise ProtocolError(f'there is no menu item {index}')
+        add_item(self.restaurant.menu_items[index])
+
+
+    def _remove_item(self, table, seat, index):
+        remove_spec_item = self._controller('remove_spec_item')
+        item = self._item(index)
+        if item.order is not self.view.controller.order:
+            raise ProtocolError(f'item {index} is not in the order shown')
+        if not item.can_be_cancelled():
+            raise ProtocolError(f'item {index} can no longer be cancelled')
+        remove_spec_item(item)
+
+
+    def _update_order(self, table, seat, index):
+        self._controller('update_order')()
+
+
+    def _cancel_changes(self, table, seat, index):
+        self._controller('cancel_changes')()
+
+
+    def _done(self, table, seat, index):
+        self._controller('done')()
+
+
+    def _kitchen(self, table, seat, index):
+        self.restaurant.unsubscribe(self.view.subscription)
+        self.restaurant.remove_view(self.view)
+        self.view = KitchenDisplayView(self.restaurant, self)
+
+
+    def _button_pressed(self, table, seat, index):
+        button_pressed = self._controller('button_pressed')
+        item = self._item(index)
+        if not item.has_been_ordered() or item.has_been_served():
+            raise ProtocolError(f'item {index} is not in the kitchen')
+        button_pressed(item)
+
+
+    def _order(self, table, seat, index):
+        order = self._table(table).orders.get(seat)
+        return order_payload(order.items if order is not None else (), self.server.menu_ids)
+
+
+    HANDLERS = {OP_TABLE_TOUCHED: _table_touched, OP_SEAT_TOUCHED: _seat_touched, OP_ADD_ITEM: _add_item,
+                OP_REMOVE_ITEM: _remove_item, OP_UPDATE_ORDER: _update_order, OP_CANCEL_CHANGES: _cancel_changes,
+                OP_DONE: _done, OP_KITCHEN: _kitchen, OP_BUTTON_PRESSED: _button_pressed, OP_ORDER: _order}
+
+
+
+class RestaurantServer:
+    """ Asyncio server sharing one Restaurant between all the terminals connected to it. """
+
+    def __init__(self, restaurant):
+        """ Constructor to the RestaurantServer class. """
+
+        self.restaurant = restaurant
+        self.menu_ids = restaurant.menu_ids()
+        self.sessions = set()
+        self.server = None
+
+        # Tasks serving the terminals connected
+        self.tasks = set()
+
+        # Requests carried out and changes pushed so far
+        self.requests = 0
+        self.pushes = 0
+
+
+    # ---------------- Defining Methods ----------------
+
+    async def start(self, host = SERVER_HOST, port = SERVER_PORT, path = None):
+        """ Method starts listening on <host>:<port>, or on the unix socket <path> if given. Returns the addresses
+        listened on. """
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self._connected, path)
+        else:
+            self.server = await asyncio.start_server(self._connected, host, port)
+        return [sock.getsockname() for sock in self.server.sockets]
+
+
+    async def close(self):
+        """ Method stops listening and disconnects every terminal. """
+        self.server.close()
+        for session in list(self.sessions):
+            session.close()
+        await asyncio.gather(*self.tasks)
+        await self.server.wait_closed()
+
+
+    def stats(self):
+        """ Function returns a dict of the number of terminals connected, requests carried out and pushes sent. """
+        return {'terminals': len(self.sessions), 'requests': self.requests, 'pushes': self.pushes}
+
+
+    async def _connected(self, reader, writer):
+        """ Serves a newly connected terminal until it disconnects. """
+        session = Session(self, reader, writer)
+        self.sessions.add(session)
+        task = asyncio.current_task()
+        self.tasks.add(task)
+        try:
+            await session.run()
+        finally:
+            self.tasks.discard(task)
+
+
+
+# --------- Defining Separate Functions -----------
+
+async def serve(restaurant, host = SERVER_HOST, port = SERVER_PORT, path = None, ready = None):
+    """ Function serves <restaurant> on <host>:<port> (or the unix socket <path>) forever. <ready>, if given, gets
+    called with the addresses listened on once the server is listening. """
+    server = RestaurantServer(restaurant)
+    addresses = await server.start(host, port, path)
+    if ready is not None:
+        ready(addresses)
+    async with server.server:
+        await server.server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'OORMS terminal server')
+    parser.add_argument('--host', default = SERVER_HOST)
+    parser.add_argument('--port', type = int, default = SERVER_PORT)
+    parser.add_argument('--unix', help = 'unix socket to listen on instead of a TCP port')
+    parser.add_argument('--layout', help = 'floor plan file (.csv, .jsonl or .json)')
+    parser.add_argument('--menu', help = 'menu file (.csv, .jsonl or .json)')
+    parser.add_argument('--profile', help = 'JSON file to write the timings of the controller actions and renders '
+                                            'to on exit and on SIGUSR1 (see profiling.py)')
+    parser.add_argument('--record', help = 'trace file to record the actions of the terminals to (see traces.py)')
+    args = parser.parse_args()
+
+    profiler = None
+    if args.profile:
+        profiler = Profiler().install((HeadlessServerView, HeadlessKitchenView))
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: profiler.dump(args.profile))
+
+    restaurant = Restaurant(args.layout, args.menu)
+    recorder = TraceRecorder(restaurant, args.record).install() if args.record else None
+
+    try:
+        asyncio.run(serve(restaurant, args.host, args.port, args.unix,
+                          lambda addresses: print('Serving on', *addresses)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if recorder is not None:
+            recorder.close()
+        if profiler is not None:
+            profiler.dump(args.profile)
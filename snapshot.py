@@ -0,0 +1,192 @@
+"""
+
+    Description:
+        Module that saves a whole Restaurant to a compact binary snapshot and loads it back: its floor plan and
+        menu, every seat's order with its items' ids, statuses and ordered flags, and the kitchen queue. Meant for
+        copying a big restaurant's state around quickly (a standby machine taking over, a test or benchmark starting
+        from a full dining room), where the journal (see journal.py) is for surviving a crash of the one terminal.
+
+    Functions defined in this module:
+        - dumps(restaurant): returns the snapshot of a restaurant as bytes
+        - loads(data): returns the Restaurant saved in the snapshot <data>
+        - save(restaurant, path) and load(path): the same, to and from a file
+
+    Notes:
+        1 - Format: a HEADER (magic, version, length of the metadata), the metadata as utf-8 JSON (floor plan and
+        menu sections, next item id, table priorities, and the number of orders, items, kitchen tickets and queued
+        items), then these columns, each a little-endian array of one value per order, item, ticket or queued item:
+            orders  - table number (I), seat (H), number of items (I)
+            items   - id (I), menu item id (H), status (b), ordered flag (B)
+            tickets - number of items (I), seconds they had been waiting for when saved (d)
+            queue   - item id (I), in queue order
+        Menu items are referred to by their index in the menu, so an item takes 8 bytes, plus 4 while it waits in
+        the kitchen queue. A snapshot of another SNAPSHOT_VERSION gets refused rather than misread.
+
+        2 - Loading reads each column in one go (array.frombytes()) and hands the lot to Restaurant.restore_orders(),
+        which builds, registers, totals and indexes the items an order at a time with the garbage collector paused.
+        A restored item has no timestamps (see OrderItem.timestamps), like one recovered from the journal.
+
+        3 - The kitchen queue keeps its order: queued items come back in their tickets (see KitchenQueue.tickets()),
+        as placed as long ago as they had been when saved (by the restaurant's clock, so across processes and
+        machines too).
+
+"""
+
+# ---- Importing built-in Libraries ----
+
+import json
+import struct
+import sys
+from array import array
+
+
+# ---- Importing from other modules -----
+
+from model import Restaurant, Status
+
+
+# Header: magic, version, length of the JSON metadata
+HEADER = struct.Struct('<8sHI')
+SNAPSHOT_MAGIC = b'OORMSNAP'
+SNAPSHOT_VERSION = 1
+
+# Type codes of the columns (see Notes 1), and the metadata count giving the length of each
+COLUMNS = (('I', 'orders'), ('H', 'orders'), ('I', 'orders'),
+           ('I', 'items'), ('H', 'items'), ('b', 'items'), ('B', 'items'),
+           ('I', 'tickets'), ('d', 'tickets'), ('I', 'queued'))
+
+# Status values by their int(), for the status column
+STATUSES = {int(status): status for status in Status}
+
+
+
+# --------- Defining Separate Functions -----------
+
+def dumps(restaurant):
+    """ Function returns the snapshot (see Notes 1) of the Restaurant object <restaurant> as bytes. """
+    menu_ids = restaurant.menu_ids()
+    columns = [array(typecode) for typecode, _ in COLUMNS]
+    order_tables, order_seats, order_counts, item_ids, item_menu_ids, item_statuses, item_ordered, \
+        ticket_counts, ticket_ages, queued_ids = columns
+
+    for table in restaurant.tables.loaded():
+        for seat, order in sorted(table.orders.items()):
+            if not order.items:
+                continue
+            order_tables.append(table.number)
+            order_seats.append(seat)
+            order_counts.append(len(order.items))
+            for item in order.items:
+                item_ids.append(item.id)
+                item_menu_ids.append(menu_ids[item.details])
+                item_statuses.append(int(item.status))
+                item_ordered.append(item.has_been_ordered())
+
+    now = restaurant.clock()
+    for items, _, placed in restaurant.kitchen_queue.tickets():
+        ticket_counts.append(len(items))
+        ticket_ages.append(now - placed)
+        queued_ids.extend(item.id for item in items)
+
+    metadata = json.dumps({'tables': list(zip(restaurant.tables.names, restaurant.tables.rows)),
+                           'menu': list(zip(restaurant.menu_items.names, restaurant.menu_items.rows)),
+                           'next_item_id': restaurant.next_item_id,
+                           'priorities': sorted(restaurant.kitchen_queue.priorities.items()),
+                           'orders': len(order_tables), 'items': len(item_ids), 'tickets': len(ticket_counts),
+                           'queued': len(queued_ids)})
+    metadata = metadata.encode('utf-8')
+    if sys.byteorder == 'big':
+        for column in columns:
+            column.byteswap()
+    return b''.join([HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(metadata)), metadata]
+                    + [column.tobytes() for column in columns])
+
+
+def loads(data):
+    """ Function returns the Restaurant object saved in the snapshot <data> (bytes). Raises a ValueError if
+    <data> isn't a whole version SNAPSHOT_VERSION snapshot. """
+    data = memoryview(data)
+    if len(data) < HEADER.size:
+        raise ValueError('Not an OORMS snapshot: too short')
+    magic, version, metadata_size = HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        raise ValueError(f'Not a version {SNAPSHOT_VERSION} OORMS snapshot')
+    offset = HEADER.size + metadata_size
+    if offset > len(data):
+        raise ValueError('OORMS snapshot is truncated')
+    metadata = json.loads(bytes(data[HEADER.size:offset]).decode('utf-8'))
+    if not isinstance(metadata, dict):
+        raise ValueError('OORMS snapshot has no valid metadata')
+    for count in ('orders', 'items', 'tickets', 'queued'):
+        if not isinstance(metadata.get(count), int) or metadata[count] < 0:
+            raise ValueError(f'OORMS snapshot has no valid number of {count}')
+
+    columns = []
+    for typecode, count in COLUMNS:
+        column = array(typecode)
+        end = offset + metadata[count] * column.itemsize
+        if end > len(data):
+            raise ValueError('OORMS snapshot is truncated')
+        column.frombytes(data[offset:end])
+        if sys.byteorder == 'big':
+            column.byteswap()
+        columns.append(column)
+        offset = end
+    if offset != len(data):
+        raise ValueError('OORMS snapshot has trailing data')
+    order_tables, order_seats, order_counts, item_ids, item_menu_ids, item_statuses, item_ordered, \
+        ticket_counts, ticket_ages, queued_ids = columns
+    if sum(order_counts) != len(item_ids) or sum(ticket_counts) != len(queued_ids):
+        raise ValueError('OORMS snapshot has columns of the wrong lengths')
+
+    try:
+        return _restore(metadata, columns)
+    except (KeyError, IndexError, TypeError) as error:
+        # An unknown menu item, status, table, seat or item id, or metadata missing a field
+        raise ValueError(f'OORMS snapshot is corrupt: {error!r}') from error
+
+
+def _restore(metadata, columns):
+    """ Returns the Restaurant object of the parsed snapshot <metadata> and <columns>, for loads(). """
+    order_tables, order_seats, order_counts, item_ids, item_menu_ids, item_statuses, item_ordered, \
+        ticket_counts, ticket_ages, queued_ids = columns
+    restaurant = Restaurant(metadata['tables'], metadata['menu'])
+    for table_number, priority in metadata['priorities']:
+        restaurant.kitchen_queue.reprioritize(table_number, priority)
+
+    # Handing the items out an order at a time, so that only one order's worth of them is ever unpacked
+    menu = list(restaurant.menu_items)
+
+    def orders():
+        start = 0
+        for table_number, seat, count in zip(order_tables, order_seats, order_counts):
+            end = start + count
+            yield (table_number, seat, list(map(menu.__getitem__, item_menu_ids[start:end])),
+                   list(map(STATUSES.__getitem__, item_statuses[start:end])), item_ordered[start:end].tolist(),
+                   item_ids[start:end].tolist())
+            start = end
+
+    now = restaurant.clock()
+    tickets = []
+    start = 0
+    for count, age in zip(ticket_counts, ticket_ages):
+        tickets.append((queued_ids[start:start + count], now - age))
+        start += count
+    restaurant.restore_orders(orders(), tickets)
+    restaurant.next_item_id = max(restaurant.next_item_id, metadata['next_item_id'])
+    return restaurant
+
+
+def save(restaurant, path):
+    """ Function writes the snapshot of the Restaurant object <restaurant> to the file <path>. Returns its size in
+    bytes. """
+    data = dumps(restaurant)
+    with open(path, 'wb') as snapshot_file:
+        snapshot_file.write(data)
+    return len(data)
+
+
+def load(path):
+    """ Function returns the Restaurant object saved in the snapshot file <path>. """
+    with open(path, 'rb') as snapshot_file:
+        return loads(snapshot_file.read())
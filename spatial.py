@@ -0,0 +1,121 @@
+"""
+
+    Description:
+        Module that contains the spatial index over the restaurant's tables used by the ServerView. It answers
+        "which tables are inside this rectangle" (the part of the floor plan the viewport shows) and "which table is
+        under this point" (a click) by only looking at the grid cells involved, rather than at every table of the
+        floor plan.
+
+    Classes defined in this module:
+        - GridIndex Class
+
+    Functions defined in this module:
+        - table_bounds(n_seats, location): the box a table and its seats cover on the floor plan
+
+    Notes:
+        1 - Coordinates are floor plan coordinates, ie. the unscaled ones of Table.location, not canvas pixels.
+
+        2 - The index is built from the raw rows of restaurant.tables (layout.Sections.row()), so building it
+        doesn't build any Table object.
+
+"""
+
+# ---- Importing built-in Libraries ----
+
+import math
+
+
+# ---- Importing from other modules -----
+
+from constants import SEAT_DIAM, SEAT_SPACING, TABLE_WIDTH, GRID_CELL_SIZE
+
+
+
+# --------- Defining Separate Functions -----------
+
+def table_bounds(n_seats, location):
+    """ Function returns the (x0, y0, x1, y1) box covered by a table of <n_seats> seats drawn at <location>,
+    seats included. Same geometry as ServerView._draw_table(). """
+    x0, y0 = location
+    seats_per_side = math.ceil(n_seats / 2)
+    height = SEAT_DIAM * seats_per_side + SEAT_SPACING * (seats_per_side - 1)
+    width = 2 * (SEAT_DIAM + SEAT_SPACING) + TABLE_WIDTH
+    return x0, y0, x0 + width, y0 + height
+
+
+
+class GridIndex:
+    """ Grid hash of boxes: every box is filed under each square cell of the grid it overlaps. """
+
+    def __init__(self, cell_size = GRID_CELL_SIZE):
+        """ Constructor to the GridIndex class. <cell_size> is the side of the grid's cells. """
+
+        self.cell_size = cell_size
+
+        # (column, row) of a cell -> keys of the boxes overlapping it, and key -> box
+        self.cells = {}
+        self.boxes = {}
+
+        # The box around every box, kept up to date by insert() since the ServerView asks for it on every pan
+        self.bounds = None
+
+
+    @classmethod
+    def for_tables(cls, tables, cell_size = GRID_CELL_SIZE):
+        """ Returns the index of the boxes of every table of the layout.Sections <tables>, keyed by table number. """
+        index = cls(cell_size)
+        for number in range(len(tables)):
+            n_seats, location = tables.row(number)
+            index.insert(number, table_bounds(n_seats, location))
+        return index
+
+
+    # ---------------- Defining Methods ----------------
+
+    def insert(self, key, box):
+        """ Method files the (x0, y0, x1, y1) <box> under <key>. """
+        self.boxes[key] = box
+        if self.bounds is None:
+            self.bounds = tuple(box)
+        else:
+            x0, y0, x1, y1 = self.bounds
+            self.bounds = (min(x0, box[0]), min(y0, box[1]), max(x1, box[2]), max(y1, box[3]))
+        for cell in self._cells(box):
+            self.cells.setdefault(cell, []).append(key)
+
+
+    def query(self, box):
+        """ Function returns the sorted keys of the boxes overlapping the (x0, y0, x1, y1) <box>. """
+        x0, y0, x1, y1 = box
+        found = set()
+        for cell in self._cells(box):
+            for key in self.cells.get(cell, ()):
+                if key not in found:
+                    bx0, by0, bx1, by1 = self.boxes[key]
+                    if bx0 <= x1 and x0 <= bx1 and by0 <= y1 and y0 <= by1:
+                        found.add(key)
+        return sorted(found)
+
+
+    def hit(self, x, y):
+        """ Function returns the key of a box containing the point (<x>, <y>), or None if there's none. """
+        cell = (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+        for key in self.cells.get(cell, ()):
+            x0, y0, x1, y1 = self.boxes[key]
+            if x0 <= x <= x1 and y0 <= y <= y1:
+                return key
+        return None
+
+
+    def extent(self):
+        """ Function returns the (x0, y0, x1, y1) box around every box in the index, or None if it's empty. O(1). """
+        return self.bounds
+
+
+    def _cells(self, box):
+        """ Yields the (column, row) of every cell the (x0, y0, x1, y1) <box> overlaps. """
+        x0, y0, x1, y1 = box
+        size = self.cell_size
+        for column in range(math.floor(x0 / size), math.floor(x1 / size) + 1):
+            for row in range(math.floor(y0 / size), math.floor(y1 / size) + 1):
+                yield column, row
@@ -0,0 +1,281 @@
+"""
+
+    Description:
+        Module that contains the SQLite-backed store of the restaurant's model: an alternative to the journal for
+        keeping the restaurant on disk, which can also answer the kitchen's and the reports' questions with indexed
+        SQL rather than Python scans over the model.
+
+    Classes defined in this module:
+        - SqliteStore Class
+
+    Notes:
+        1 - Like the journal, the store follows the model through the restaurant's change events. Writes aren't
+        sent to SQLite one row at a time: they're queued, and the whole queue goes in a single transaction on the
+        next flush(). With <after_idle> given (a tkinter widget's after_idle), the store flushes once tkinter goes
+        idle again, so everything one controller action changed (all the items OrderController.update_order()
+        places, the item KitchenController.button_pressed() advances) lands in one transaction. Otherwise the
+        store's own thread flushes the queue once STORE_BATCH_SIZE writes are waiting or STORE_FLUSH_INTERVAL
+        seconds went by, whichever comes first, so no write waits on the next one to be flushed. Queries always
+        flush first.
+
+        2 - Orders aren't a table of their own: an order is all the order_items rows of one (table_number, seat).
+        The rows' ids are the items' ids (OrderItem.id), which the restaurant hands out in the order the items got
+        requested, so ordering by id gives back each order's items in order. Ids are never reused, so the id the
+        next item will get (Restaurant.next_item_id) is kept in the metadata table, saved in the transaction of
+        every flush: the newest items may have been cancelled, leaving no row to work it out from on loading.
+
+        3 - Indexes: (status) for counting items by status, and a partial one on (table_number, seat) of the
+        items placed and not served (status 0 to 2, PLACED to READY) which hands the kitchen its list already
+        sorted. The (table_number, seat) and (menu_item) indexes carry the price (and ordered flag) along, so the
+        per-table and per-menu item reports are answered from the index alone. The kitchen query spells its
+        status range out rather than binding it, otherwise SQLite can't tell that the partial index applies, and
+        names the index, since without statistics on the table the planner would rather use the status one.
+
+        4 - The model publishes its events from whichever thread changed it (see model.py/Notes 1), so the store
+        queues writes, flushes and queries under its own lock, and its connection may be used from any thread.
+        A flush holds the lock until its transaction commits, so the writes of one item reach SQLite in the order
+        its events came in. Only the thread the store was created on (the Tk thread) calls <after_idle>, since
+        tkinter can't be called from other threads: the writes of events published anywhere else are handed to
+        the store's own thread through the queue, and flushed by it as without <after_idle>.
+
+"""
+
+# ---- Importing built-in Libraries ----
+
+import sqlite3
+import threading
+
+
+# ---- Importing from other modules -----
+
+from constants import STORE_BATCH_SIZE, STORE_FLUSH_INTERVAL
+from model import EventKind, Status
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tables (
+    number INTEGER PRIMARY KEY,
+    seats INTEGER NOT NULL,
+    x REAL NOT NULL,
+    y REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS menu_items (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    price REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS order_items (
+    id INTEGER PRIMARY KEY,
+    table_number INTEGER NOT NULL REFERENCES tables (number),
+    seat INTEGER NOT NULL,
+    menu_item INTEGER NOT NULL REFERENCES menu_items (id),
+    price REAL NOT NULL,
+    status INTEGER NOT NULL,
+    ordered INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS metadata (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS order_items_status ON order_items (status);
+CREATE INDEX IF NOT EXISTS order_items_kitchen ON order_items (table_number, seat) WHERE status BETWEEN 0 AND 2;
+CREATE INDEX IF NOT EXISTS order_items_table ON order_items (table_number, seat, price);
+CREATE INDEX IF NOT EXISTS order_items_menu_item ON order_items (menu_item, ordered, price);
+"""
+
+INSERT_ITEM = ('INSERT INTO order_items (id, table_number, seat, menu_item, price, status, ordered) '
+               'VALUES (?, ?, ?, ?, ?, ?, ?)')
+UPDATE_ITEM = 'UPDATE order_items SET status = ?, ordered = ? WHERE id = ?'
+DELETE_ITEM = 'DELETE FROM order_items WHERE id = ?'
+SAVE_NEXT_ITEM_ID = "INSERT OR REPLACE INTO metadata VALUES ('next_item_id', ?)"
+
+
+
+class SqliteStore:
+    """ SQLite database mirroring a restaurant's tables, menu and order items. """
+
+    def __init__(self, path, restaurant, after_idle = None, batch_size = STORE_BATCH_SIZE,
+                 flush_interval = STORE_FLUSH_INTERVAL):
+        """ Constructor to the SqliteStore class.
+
+        Opens (or creates) the database at <path>. If it already holds order items, they get loaded back into
+        <restaurant>, which should have no orders yet; otherwise <restaurant>'s floor plan and menu get saved to it.
+        See Notes 1 for <after_idle>, <batch_size> and <flush_interval>, and Notes 4 for the thread <after_idle>
+        gets called from. """
+
+        self.restaurant = restaurant
+        self.after_idle = after_idle
+        self.idle_thread = threading.get_ident()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.connection = sqlite3.connect(path, check_same_thread = False)
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        self.connection.execute('PRAGMA synchronous = NORMAL')
+        self.connection.executescript(SCHEMA)
+
+        # Menu item id of each MenuItem object: its index in the restaurant's menu
+        self.menu_ids = restaurant.menu_ids()
+
+        # Lock the writes get queued and flushed, and the queries run under (see Notes 4), and the condition the
+        # store's thread waits for a batch on
+        self.lock = threading.RLock()
+        self.waiting = threading.Condition(self.lock)
+
+        # The writes waiting for the next flush, whether one is scheduled on idle, and whether the store is closing
+        self.pending = []
+        self.flush_scheduled = False
+        self.closing = False
+
+        if self.connection.execute('SELECT COUNT(*) FROM tables').fetchone()[0]:
+            self._load()
+        else:
+            with self.connection:
+                self.connection.executemany('INSERT INTO tables VALUES (?, ?, ?, ?)',
+                                            ((number, *_table_row(restaurant.tables, number))
+                                             for number in range(len(restaurant.tables))))
+                self.connection.executemany('INSERT INTO menu_items VALUES (?, ?, ?)',
+                                            ((ix, item.name, item.price) for item, ix in self.menu_ids.items()))
+                self.connection.execute(SAVE_NEXT_ITEM_ID, (restaurant.next_item_id,))
+
+        self.subscription = restaurant.subscribe(self.on_event, {EventKind.ITEM_REQUESTED, EventKind.ITEM_PLACED,
+                                                                 EventKind.STATUS_ADVANCED, EventKind.ITEM_CANCELLED,
+                                                                 EventKind.ITEMS_ADVANCED})
+        self.flusher = threading.Thread(target = self._flush_loop, name = 'sqlite_store', daemon = True)
+        self.flusher.start()
+
+
+    # ---------------- Defining Methods ----------------
+
+    def on_event(self, event):
+        """ Method queues the write mirroring the ChangeEvent <event>. """
+        item = event.item
+        with self.lock:
+            if event.kind == EventKind.ITEM_REQUESTED:
+                self.pending.append((INSERT_ITEM, (item.id, event.table_number, event.seat, self.menu_ids[item.details],
+                                                   item.details.price, int(item.status), item.has_been_ordered())))
+            elif event.kind == EventKind.ITEM_CANCELLED:
+                self.pending.append((DELETE_ITEM, (item.id,)))
+            elif event.items is not None:
+                self.pending.extend((UPDATE_ITEM, (int(item.status), item.has_been_ordered(), item.id))
+                                    for item in event.items)
+            else:
+                self.pending.append((UPDATE_ITEM, (int(item.status), item.has_been_ordered(), item.id)))
+
+            if self.after_idle is not None and threading.get_ident() == self.idle_thread:
+                if not self.flush_scheduled:
+                    self.flush_scheduled = True
+                    self.after_idle(self.flush)
+            elif len(self.pending) >= self.batch_size:
+                self.waiting.notify()
+
+
+    def flush(self):
+        """ Method sends every write waiting to SQLite in one transaction, along with the id the next item will get
+        (see Notes 2). Runs of the same statement go through a single executemany(). """
+        with self.lock:
+            self.flush_scheduled = False
+            if not self.pending:
+                return
+            pending, self.pending = self.pending, []
+            with self.connection:
+                start = 0
+                while start < len(pending):
+                    sql = pending[start][0]
+                    end = start + 1
+                    while end < len(pending) and pending[end][0] is sql:
+                        end += 1
+                    self.connection.executemany(sql, (params for _, params in pending[start:end]))
+                    start = end
+                self.connection.execute(SAVE_NEXT_ITEM_ID, (self.restaurant.next_item_id,))
+
+
+    def close(self):
+        """ Method flushes the writes waiting, stops following the restaurant and closes the database. """
+        self.restaurant.unsubscribe(self.subscription)
+        with self.lock:
+            self.closing = True
+            self.waiting.notify()
+        self.flusher.join()
+        with self.lock:
+            self.flush()
+            self.connection.close()
+
+
+    def _flush_loop(self):
+        """ Flushes the writes waiting whenever a batch of them is, or STORE_FLUSH_INTERVAL went by, unless a flush
+        is scheduled on idle already, until the store gets closed. Runs on the store's own thread (see Notes 1). """
+        while True:
+            with self.lock:
+                if not self.closing and len(self.pending) < self.batch_size:
+                    self.waiting.wait(self.flush_interval)
+                if self.closing:
+                    return
+                due = self.pending and not self.flush_scheduled
+            if due:
+                self.flush()
+
+
+    # ---------------- Defining Queries ----------------
+
+    def kitchen_items(self):
+        """ Function returns the OrderItem objects placed and not yet served, in table, seat then request order -
+        the order KitchenView lists them in. """
+        return self._items('SELECT id FROM order_items INDEXED BY order_items_kitchen WHERE status BETWEEN 0 AND 2 '
+                           'ORDER BY table_number, seat, id')
+
+
+    def table_items(self, table_number):
+        """ Function returns the OrderItem objects of every order of table <table_number>. """
+        return self._items('SELECT id FROM order_items WHERE table_number = ? ORDER BY seat, id', (table_number,))
+
+
+    def status_counts(self):
+        """ Function returns a dict of the number of items in each Status. """
+        counts = dict(self._query('SELECT status, COUNT(*) FROM order_items GROUP BY status'))
+        return {status: counts.get(int(status), 0) for status in Status}
+
+
+    def revenue_by_menu_item(self):
+        """ Function returns a dict of the total price of the ordered items of each MenuItem object. """
+        sums = dict(self._query('SELECT menu_item, SUM(price) FROM order_items WHERE ordered GROUP BY menu_item'))
+        return {menu_item: sums.get(ix, 0) for menu_item, ix in self.menu_ids.items()}
+
+
+    def table_totals(self):
+        """ Function returns a dict of the total price of the items of each table that has items. """
+        return dict(self._query('SELECT table_number, SUM(price) FROM order_items GROUP BY table_number'))
+
+
+    def _query(self, sql, params = ()):
+        """ Runs the query <sql> with <params> after flushing the writes waiting, and returns its rows. """
+        with self.lock:
+            self.flush()
+            return self.connection.execute(sql, params).fetchall()
+
+
+    def _items(self, sql, params = ()):
+        """ Returns the OrderItem objects of the ids the query <sql> returns. """
+        items = self.restaurant.items_by_id
+        return [items[item_id] for item_id, in self._query(sql, params)]
+
+
+    def _load(self):
+        """ Loads the order items of the database back into the restaurant, and the id the next item will get. """
+        menu_items = list(self.restaurant.menu_items)
+        tables = self.restaurant.tables
+        rows = self.connection.execute('SELECT id, table_number, seat, menu_item, status, ordered FROM order_items '
+                                       'ORDER BY id')
+        for item_id, table_number, seat, menu_id, status, ordered in rows:
+            tables[table_number].order_for(seat).restore_item(menu_items[menu_id], status, ordered, item_id)
+        saved = self.connection.execute("SELECT value FROM metadata WHERE key = 'next_item_id'").fetchone()
+        if saved is not None:
+            self.restaurant.next_item_id = max(self.restaurant.next_item_id, saved[0])
+
+
+
+# --------- Defining Separate Functions -----------
+
+def _table_row(tables, number):
+    """ Returns the (seats, x, y) of table <number> of <tables>, without building it. """
+    seats, (x, y) = tables.row(number)
+    return seats, x, y
@@ -1,8 +1,36 @@
+import asyncio
+import json
+import os
+import pickle
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 import unittest
 from enum import Enum, auto
 
-from controller import RestaurantController, TableController, OrderController
-from model import Restaurant, OrderItem
+import app
+from controller import RestaurantController, TableController, OrderController, KitchenController
+from client import TerminalClient
+import columns
+from columns import ItemColumns
+from headless import HeadlessServerView, HeadlessKitchenView
+from histogram import Histogram
+from journal import SNAPSHOT_HEADER, SNAPSHOT_MAGIC, Journal
+from kitchen import KitchenQueue
+from layout import CACHE_VERSION
+from model import Restaurant, OrderItem, EventKind, Status
+from profiling import Profiler
+from protocol import FRAME_HEADER, FRAME_REQUEST, OP_DONE, REQUEST, ProtocolError, frame
+from scene import Scene
+from spatial import GridIndex, table_bounds
+import snapshot
+import traces
+from sqlite_store import SqliteStore
+from scheduler import RedrawScheduler
+from server import RestaurantServer, Session
 
 
 class UI(Enum):
@@ -19,12 +47,14 @@ class ServerViewMock:
     """
     A non-graphical replacement for `oorms.ServerView`, used for testing. Allows
     tests to check what was the last user interface rendered. Fully replicates the
-    public interface of `ServerView`. The `set_controller` and `update` methods
-    are exact copies of those in `oorms.RestaurantView`.
+    public interface of `ServerView`. The `set_controller` and `on_event` methods
+    are exact copies of those in `oorms.RestaurantView`. `update` re-draws straight
+    away, as though `oorms.RestaurantView`'s scheduler flushed immediately.
     """
 
     def __init__(self, restaurant):
         self.controller = None
+        self.subscription = None
         self.last_UI_created = None
         self.restaurant = restaurant
         self.set_controller(RestaurantController(self, self.restaurant))
@@ -32,6 +62,12 @@ class ServerViewMock:
 
     def set_controller(self, controller):
         self.controller = controller
+        if self.subscription is not None:
+            self.restaurant.unsubscribe(self.subscription)
+        self.subscription = self.restaurant.subscribe(self.on_event, controller.EVENT_KINDS, controller.event_tables())
+
+    def on_event(self, event):
+        self.update()
 
     def update(self):
         self.controller.create_ui()
@@ -46,6 +82,54 @@ class ServerViewMock:
         self.last_UI_created = (UI.ORDER, order)
 
 
+class CanvasMock:
+    """
+    A non-graphical replacement for `tkinter.Canvas`, used for testing `Scene`.
+    Records every call made to the canvas in `calls`.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.last_id = 0
+        self.current = ()
+
+    def _create(self, kind):
+        self.last_id += 1
+        self.calls.append(('create', kind))
+        return self.last_id
+
+    def create_rectangle(self, *coords, **options):
+        return self._create('rectangle')
+
+    def create_oval(self, *coords, **options):
+        return self._create('oval')
+
+    def create_text(self, *coords, **options):
+        return self._create('text')
+
+    def coords(self, item_id, *coords):
+        self.calls.append(('coords', item_id))
+
+    def itemconfigure(self, item_id, **options):
+        self.calls.append(('itemconfigure', item_id))
+
+    def tag_raise(self, item_id):
+        self.calls.append(('tag_raise', item_id))
+
+    def delete(self, item_id):
+        self.calls.append(('delete', item_id))
+
+    def tag_bind(self, item_id, sequence, action):
+        self.calls.append(('tag_bind', item_id))
+
+    def bind(self, sequence, action, add=None):
+        self.calls.append(('bind', sequence))
+        self.clicked = action
+
+    def find_withtag(self, tag):
+        return self.current
+
+
 class OORMSTestCase(unittest.TestCase):
 
     def setUp(self):
@@ -151,3 +235,1282 @@ class OORMSTestCase(unittest.TestCase):
         check_first_three_items(self.restaurant.menu_items, the_order.items)
         self.assertEqual(self.restaurant.menu_items[1], the_order.items[3].details)
         self.assertEqual(self.restaurant.menu_items[2], the_order.items[4].details)
+
+    def test_active_item_index(self):
+        the_order, the_menu_item = self.order_an_item()
+        table = self.restaurant.tables[2]
+        self.assertFalse(table.has_any_active_orders())
+        self.assertEqual([], self.restaurant.active_table_numbers())
+
+        self.view.controller.update_order()
+        the_item = the_order.items[0]
+        self.assertTrue(table.has_any_active_orders())
+        self.assertEqual([2], self.restaurant.active_table_numbers())
+        self.assertEqual([the_item], self.restaurant.active_items_for(2))
+
+        for _ in range(3):
+            the_item.advance_status()
+        self.assertTrue(the_item.has_been_served())
+        self.assertFalse(table.has_any_active_orders())
+        self.assertEqual([], self.restaurant.active_items_for(2))
+
+    def test_active_item_index_remove_placed_item(self):
+        the_order, the_menu_item = self.order_an_item()
+        self.view.controller.update_order()
+        self.view.controller.seat_touched(4)
+        self.view.controller.remove_spec_item(the_order.items[0])
+        self.assertFalse(self.restaurant.tables[2].has_any_active_orders())
+        self.assertEqual({}, self.restaurant.active_items)
+
+
+    def test_running_totals(self):
+        self.restaurant.check_totals = True
+        self.view.controller.table_touched(6)
+        self.view.controller.seat_touched(2)
+        menu_items = self.restaurant.menu_items
+        for ix in (0, 1, 1, 5):
+            self.view.controller.add_item(menu_items[ix])
+        self.view.controller.update_order()
+        self.view.controller.seat_touched(3)
+        self.view.controller.add_item(menu_items[8])
+        self.view.controller.add_item(menu_items[9])
+        self.view.controller.remove_spec_item(self.restaurant.tables[6].order_for(3).items[0])
+        self.view.controller.cancel_changes()
+
+        the_order = self.restaurant.tables[6].order_for(2)
+        self.assertEqual(16 + 14.5 + 14.5 + 14, the_order.total_cost())
+        self.assertEqual(the_order.total_cost(), self.restaurant.tables[6].total_cost())
+        self.assertEqual(the_order.total_cost(), self.restaurant.total_cost())
+        self.view.controller.seat_touched(2)
+        self.view.controller.remove_spec_item(the_order.items[1])
+        self.assertEqual(16 + 14.5 + 14, self.restaurant.total_cost())
+        self.restaurant.verify_totals()
+
+
+class TableTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.restaurant = Restaurant()
+        self.table = self.restaurant.tables[2]
+
+    def test_orders_created_on_first_use(self):
+        self.assertEqual({}, self.table.orders)
+        self.assertFalse(self.table.has_order_for(1))
+        self.assertEqual({}, self.table.orders)
+        order = self.table.order_for(1)
+        self.assertEqual({1: order}, self.table.orders)
+        self.assertIs(order, self.table.order_for(1))
+        self.assertFalse(self.table.has_order_for(1))
+
+    def test_order_for_invalid_seat(self):
+        for seat in (-1, self.table.n_seats):
+            with self.assertRaises(IndexError):
+                self.table.order_for(seat)
+        self.assertEqual({}, self.table.orders)
+
+    def test_slots(self):
+        item = OrderItem(self.restaurant.menu_items[0], self.table.order_for(0))
+        for instance in (self.table, item):
+            self.assertFalse(hasattr(instance, '__dict__'))
+            with self.assertRaises(AttributeError):
+                instance.not_an_attribute = None
+
+
+class SceneTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.canvas = CanvasMock()
+        self.scene = Scene(self.canvas)
+
+    def draw(self, rows):
+        self.scene.begin()
+        for ix, (key, text) in enumerate(rows):
+            self.scene.text(key, 0, ix * 10, text=text)
+        self.scene.end()
+
+    def test_unchanged_frame_sends_nothing(self):
+        self.draw([('a', 'one'), ('b', 'two')])
+        self.canvas.calls.clear()
+        self.draw([('a', 'one'), ('b', 'two')])
+        self.assertEqual([], self.canvas.calls)
+
+    def test_frame_sends_only_differences(self):
+        self.draw([('a', 'one'), ('b', 'two'), ('c', 'three')])
+        self.canvas.calls.clear()
+        self.draw([('b', 'TWO'), ('c', 'three')])
+        self.assertEqual([('coords', 2), ('itemconfigure', 2), ('coords', 3), ('itemconfigure', 1)],
+                         self.canvas.calls)
+
+    def test_left_items_are_reused(self):
+        self.draw([('a', 'one'), ('b', 'two')])
+        self.draw([('a', 'one')])
+        self.canvas.calls.clear()
+        self.draw([('a', 'one'), ('c', 'three')])
+        self.assertEqual([('itemconfigure', 2), ('tag_raise', 2)], self.canvas.calls)
+        self.scene.begin()
+        self.scene.rectangle('d', (0, 0, 1, 1))
+        self.scene.end()
+        self.assertIn(('create', 'rectangle'), self.canvas.calls)
+
+    def test_kept_items_stay_untouched(self):
+        self.scene.begin()
+        self.scene.text('a', 0, 0, text='one')
+        self.scene.bind('a', print)
+        self.scene.text('b', 0, 10, text='two')
+        self.scene.end()
+        self.canvas.calls.clear()
+        self.scene.begin()
+        self.scene.keep('a')
+        self.scene.end()
+        self.assertEqual([('itemconfigure', 2)], self.canvas.calls)
+        self.assertIn(1, self.scene.actions)
+
+    def test_layer_shows_and_hides_in_one_call(self):
+        layer = Scene(self.canvas, tag='menu')
+        layer.begin()
+        for ix in range(3):
+            layer.text(ix, 0, ix * 10, text=str(ix))
+        layer.end()
+        self.canvas.calls.clear()
+        layer.hide()
+        layer.hide()
+        layer.show()
+        self.assertEqual([('itemconfigure', 'menu'), ('itemconfigure', 'menu')], self.canvas.calls)
+
+    def test_one_click_handler_for_the_canvas(self):
+        clicks = []
+        for n in range(3):
+            self.scene.begin()
+            self.scene.text('a', 0, 0, text='one')
+            self.scene.bind('a', lambda event, n=n: clicks.append(n))
+            self.scene.end()
+        self.assertEqual(0, sum(call[0] == 'tag_bind' for call in self.canvas.calls))
+        self.assertEqual(1, self.canvas.calls.count(('bind', '<Button-1>')))
+        self.canvas.current = (1,)
+        self.canvas.clicked(None)
+        self.canvas.current = ()
+        self.canvas.clicked(None)
+        self.assertEqual([2], clicks)
+
+
+class ChangeEventTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.restaurant = Restaurant()
+        self.events = []
+
+    def record(self, event):
+        self.events.append((event.kind, event.table_number, event.seat))
+
+    def test_subscription_filters_kinds_and_tables(self):
+        self.restaurant.subscribe(self.record, {EventKind.ITEM_PLACED, EventKind.TABLE_OCCUPANCY_CHANGED}, {1})
+        for table_number in (0, 1):
+            order = self.restaurant.tables[table_number].order_for(2)
+            order.add_item(self.restaurant.menu_items[0])
+            order.place_new_orders()
+        self.assertEqual([(EventKind.TABLE_OCCUPANCY_CHANGED, 1, 2), (EventKind.ITEM_PLACED, 1, 2)], self.events)
+
+    def test_item_lifecycle_events(self):
+        self.restaurant.subscribe(self.record)
+        order = self.restaurant.tables[3].order_for(0)
+        order.add_item(self.restaurant.menu_items[0])
+        order.place_new_orders()
+        order.items[0].advance_status()
+        order.remove_item(order.items[0])
+        self.assertEqual([EventKind.ITEM_REQUESTED, EventKind.TABLE_OCCUPANCY_CHANGED, EventKind.ITEM_PLACED,
+                          EventKind.STATUS_ADVANCED, EventKind.ITEM_CANCELLED, EventKind.TABLE_OCCUPANCY_CHANGED],
+                         [kind for kind, _, _ in self.events])
+
+    def test_unsubscribe(self):
+        subscription = self.restaurant.subscribe(self.record)
+        self.restaurant.unsubscribe(subscription)
+        self.restaurant.tables[0].order_for(0).add_item(self.restaurant.menu_items[0])
+        self.assertEqual([], self.events)
+
+
+class RedrawViewMock:
+    """
+    A stand-in for a view, used for testing `RedrawScheduler`. Counts its redraws.
+    """
+
+    def __init__(self):
+        self.redraws = 0
+
+    def redraw(self):
+        self.redraws += 1
+
+
+class RedrawSchedulerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.idle_callbacks = []
+        self.now = 0
+        self.scheduler = RedrawScheduler(self.idle_callbacks.append, frame_budget=1, clock=lambda: self.now)
+
+    def run_idle(self):
+        callbacks, self.idle_callbacks[:] = list(self.idle_callbacks), []
+        for callback in callbacks:
+            callback()
+
+    def test_requests_are_coalesced(self):
+        view = RedrawViewMock()
+        for _ in range(5):
+            self.scheduler.request(view)
+        self.assertEqual(1, len(self.idle_callbacks))
+        self.assertEqual(0, view.redraws)
+        self.run_idle()
+        self.assertEqual(1, view.redraws)
+        self.assertEqual({'renders': 1, 'skipped': 4, 'pending': 0}, self.scheduler.stats())
+
+    def test_frame_budget_defers_remaining_views(self):
+        slow_view, other_view = RedrawViewMock(), RedrawViewMock()
+
+        def slow_redraw():
+            self.now += 2
+            slow_view.redraws += 1
+
+        slow_view.redraw = slow_redraw
+        self.scheduler.request(slow_view)
+        self.scheduler.request(other_view)
+        self.run_idle()
+        self.assertEqual((1, 0), (slow_view.redraws, other_view.redraws))
+        self.run_idle()
+        self.assertEqual((1, 1), (slow_view.redraws, other_view.redraws))
+
+
+class ItemColumnsTestCase(unittest.TestCase):
+
+    def test_columns_follow_the_model(self):
+        # Whether NumPy is installed or not, the plain loops get tested
+        self.addCleanup(setattr, columns, 'numpy', columns.numpy)
+        columns.numpy = None
+        self.check_columns()
+
+    @unittest.skipIf(columns.numpy is None, 'NumPy is not installed')
+    def test_columns_follow_the_model_with_numpy(self):
+        self.check_columns()
+
+    def test_columns_follow_threads(self):
+        restaurant = Restaurant()
+        columns = ItemColumns(restaurant)
+        orders = [restaurant.tables[number].order_for(0) for number in range(4)]
+
+        def serve(order):
+            for ix in range(50):
+                order.add_item(restaurant.menu_items[ix % 5])
+            order.place_new_orders()
+        threads = [threading.Thread(target=serve, args=(order,)) for order in orders]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(200, len(columns))
+        self.assertEqual(200, restaurant.read(columns.status_counts)[Status.PLACED])
+
+    def check_columns(self):
+        restaurant = Restaurant()
+        menu_items = restaurant.menu_items
+        first_order = restaurant.tables[1].order_for(0)
+        first_order.add_item(menu_items[0])
+        columns = ItemColumns(restaurant)
+
+        first_order.add_item(menu_items[1])
+        first_order.place_new_orders()
+        first_order.items[0].advance_status()
+        second_order = restaurant.tables[3].order_for(1)
+        second_order.add_item(menu_items[0])
+        first_order.remove_item(first_order.items[1])
+        second_order.add_item(menu_items[8])
+
+        self.assertEqual(3, len(columns))
+        self.assertEqual({Status.REQUESTED: 2, Status.PLACED: 0, Status.COOKED: 1, Status.READY: 0, Status.SERVED: 0},
+                         columns.status_counts())
+        self.assertEqual(16, columns.revenue_by_menu_item()[menu_items[0]])
+        self.assertEqual(32, columns.revenue_by_menu_item(ordered_only=False)[menu_items[0]])
+        self.assertEqual({1: 16, 3: 20}, columns.average_price_by_table())
+        self.assertCountEqual(second_order.items, columns.items_where(table=3))
+        self.assertEqual([first_order.items[0]], columns.items_where(status=Status.COOKED, menu_item=menu_items[0]))
+
+
+class HeadlessViewTestCase(unittest.TestCase):
+
+    def test_kitchen_rows_follow_orders(self):
+        restaurant = Restaurant()
+        server = HeadlessServerView(restaurant)
+        kitchen = HeadlessKitchenView(restaurant)
+        server.controller.table_touched(1)
+        server.controller.seat_touched(0)
+        server.controller.add_item(restaurant.menu_items[0])
+        server.controller.add_item(restaurant.menu_items[1])
+        self.assertEqual(0, kitchen.rows)
+        server.controller.update_order()
+        self.assertEqual(('table', restaurant.tables[1]), server.last_UI_created)
+        self.assertEqual(3, kitchen.rows)
+        for _ in range(3):
+            kitchen.controller.button_pressed(restaurant.tables[1].order_for(0).items[0])
+        self.assertEqual(2, kitchen.rows)
+
+
+class AppTestCase(unittest.TestCase):
+
+    def test_headless_start_does_not_import_tkinter(self):
+        code = ('import sys, app; app.main(["--headless"]); '
+                'print(sorted({"tkinter", "oorms", "journal", "sqlite_store"} & set(sys.modules)))')
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+        self.assertEqual('[]', output.splitlines()[-1])
+
+    def test_window_classes_handed_over_are_used(self):
+        code = ('import sys, app; classes = app.view_classes(("kitchen",), window_classes={"server": int, '
+                '"kitchen": str}); print(classes == {"kitchen": str}, "oorms" in sys.modules)')
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+        self.assertEqual('True False', output.splitlines()[-1])
+
+    def test_headless_windows_start_independently(self):
+        restaurant = Restaurant()
+        views = app.start_headless(restaurant, ('kitchen',))
+        self.assertEqual(['kitchen'], list(views))
+        order = restaurant.tables[2].order_for(1)
+        order.add_item(restaurant.menu_items[0])
+        order.place_new_orders()
+        self.assertEqual(2, views['kitchen'].rows)
+        self.assertEqual(['kitchen: 1 tables, 2 rows', f'total: {restaurant.total:.2f}'],
+                         app.report(restaurant, views))
+
+
+class LayoutTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, text):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as data_file:
+            data_file.write(text)
+        return path
+
+    def test_csv_layout_builds_sections_lazily(self):
+        layout = self.write('floor.csv', 'section,seats,x,y\nbar,2,0,0\npatio,4,10,20\nbar,3,5,5\n')
+        menu = self.write('menu.json', json.dumps({'sections': [{'name': 'mains', 'items': [['Stew', 19]]},
+                                                                {'name': 'drinks', 'items': [{'name': 'Tea',
+                                                                                              'price': 2.5}]}]}))
+        restaurant = Restaurant(layout, menu)
+        self.assertEqual(3, len(restaurant.tables))
+        self.assertEqual([], list(restaurant.tables.loaded()))
+
+        table = restaurant.tables[1]
+        self.assertEqual((3, (5, 5), 1), (table.n_seats, table.location, table.number))
+        self.assertEqual(2, len(list(restaurant.tables.loaded())))
+        self.assertEqual((4, (10, 20)), restaurant.tables.row(2))
+        self.assertEqual((4, (10, 20)), restaurant.tables.row(-1))
+        self.assertEqual(0, restaurant.tables.section_of(-2))
+        with self.assertRaises(IndexError):
+            restaurant.tables.row(3)
+        with self.assertRaises(IndexError):
+            restaurant.tables.row(-4)
+        self.assertEqual(['Stew', 'Tea'], [item.name for item in restaurant.menu_items])
+        self.assertEqual(2.5, restaurant.menu_items[1].price)
+
+    def test_parsed_layout_is_cached(self):
+        layout = self.write('floor.jsonl', '{"seats": 2, "location": [0, 0]}\n{"seats": 6, "x": 1, "y": 2}\n')
+        self.assertEqual(2, len(Restaurant(layout).tables))
+        self.assertTrue(os.path.exists(layout + '.cache'))
+
+        with open(layout + '.cache', 'rb') as cache_file:
+            cached = cache_file.read()
+        self.assertEqual(6, Restaurant(layout).tables[1].n_seats)
+        with open(layout + '.cache', 'rb') as cache_file:
+            self.assertEqual(cached, cache_file.read())
+
+        self.write('floor.jsonl', '{"seats": 8, "x": 0, "y": 0}\n')
+        os.utime(layout, ns=(0, 0))
+        self.assertEqual(8, Restaurant(layout).tables[0].n_seats)
+
+        # Cache files of the wrong shape get parsed over
+        stat = os.stat(layout)
+        key = (CACHE_VERSION, 'layout', stat.st_size, stat.st_mtime_ns)
+        for bad in (42, (key, {'main': [(8, (0, 0))]}), (key, [None])):
+            with open(layout + '.cache', 'wb') as cache_file:
+                pickle.dump(bad, cache_file)
+            self.assertEqual(8, Restaurant(layout).tables[0].n_seats)
+
+
+class GridIndexTestCase(unittest.TestCase):
+
+    def test_query_and_hit(self):
+        index = GridIndex.for_tables(Restaurant().tables, cell_size=100)
+        self.assertEqual((20, 20, 200, 160), table_bounds(6, (20, 20)))
+        self.assertEqual([0, 3], index.query((0, 0, 300, 50)))
+        self.assertEqual(list(range(8)), index.query(index.extent()))
+        self.assertEqual(6, index.hit(300, 300))
+        self.assertIsNone(index.hit(230, 50))
+
+    def test_extent_follows_inserts(self):
+        index = GridIndex(cell_size=100)
+        self.assertIsNone(index.extent())
+        index.insert('a', (10, 20, 30, 40))
+        self.assertEqual((10, 20, 30, 40), index.extent())
+        index.insert('b', (-50, 30, 20, 400))
+        self.assertEqual((-50, 20, 30, 400), index.extent())
+
+
+class JournalTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    @staticmethod
+    def state(restaurant):
+        return [(table.number, seat, item.id, item.details.name, item.get_status(), item.has_been_ordered())
+                for table in restaurant.tables.loaded() for seat, order in sorted(table.orders.items())
+                for item in order.items]
+
+    @staticmethod
+    def serve_a_few_tables(restaurant):
+        menu_items = restaurant.menu_items
+        for table_number in range(4):
+            order = restaurant.tables[table_number].order_for(1)
+            for ix in range(3):
+                order.add_item(menu_items[table_number + ix])
+            order.remove_item(order.items[1])
+            order.place_new_orders()
+            for _ in range(table_number):
+                order.items[0].advance_status()
+            order.add_item(menu_items[0])
+        restaurant.tables[3].order_for(1).remove_unordered_items()
+
+    def recover(self, restaurant, journal):
+        journal.commit()
+        recovered = Restaurant()
+        recovered_journal = Journal(self.directory.name, recovered, batch_size=1)
+        self.addCleanup(recovered_journal.close)
+        self.assertEqual(self.state(restaurant), self.state(recovered))
+        self.assertEqual(restaurant.total_cost(), recovered.total_cost())
+        self.assertEqual(restaurant.active_table_numbers(), recovered.active_table_numbers())
+        self.assertEqual([item.id for item in restaurant.kitchen_queue.in_order()],
+                         [item.id for item in recovered.kitchen_queue.in_order()])
+        self.assertEqual(restaurant.kitchen_queue.priorities, recovered.kitchen_queue.priorities)
+        return recovered, recovered_journal
+
+    def test_recover_from_journal(self):
+        restaurant = Restaurant()
+        journal = Journal(self.directory.name, restaurant, batch_size=1)
+        self.addCleanup(journal.close)
+        self.serve_a_few_tables(restaurant)
+        self.recover(restaurant, journal)
+        self.assertEqual(0, journal.generation)
+
+    def test_recover_bulk_advance(self):
+        restaurant = Restaurant()
+        journal = Journal(self.directory.name, restaurant, batch_size=1)
+        self.addCleanup(journal.close)
+        self.serve_a_few_tables(restaurant)
+        restaurant.advance_items(restaurant.active_items_for(1) + restaurant.active_items_for(2))
+        self.recover(restaurant, journal)
+
+    def test_recover_from_snapshot_and_tail(self):
+        restaurant = Restaurant()
+        journal = Journal(self.directory.name, restaurant, batch_size=1, snapshot_every=10)
+        self.addCleanup(journal.close)
+        self.serve_a_few_tables(restaurant)
+        recovered, recovered_journal = self.recover(restaurant, journal)
+        self.assertGreater(journal.generation, 0)
+        for _ in range(2):
+            recovered.tables[1].order_for(1).items[0].advance_status()
+        self.recover(recovered, recovered_journal)
+
+    def test_recover_kitchen_queue_order(self):
+        restaurant = Restaurant()
+        now = [10]
+        restaurant.clock = lambda: now[0]
+        journal = Journal(self.directory.name, restaurant, batch_size=1)
+        self.addCleanup(journal.close)
+        for table_number in (2, 1, 3):
+            order = restaurant.tables[table_number].order_for(0)
+            order.add_item(restaurant.menu_items[0])
+            order.add_item(restaurant.menu_items[5])
+            order.place_new_orders()
+            now[0] += 10
+        restaurant.reprioritize(3, 1)
+        self.assertEqual([3, 3, 2, 2, 1, 1], [item.order.table.number for item in restaurant.kitchen_queue.in_order()])
+
+        # From the journal, then from a snapshot (which lists table 1 before table 2), then from its tail
+        recovered, recovered_journal = self.recover(restaurant, journal)
+        recovered_journal.snapshot()
+        recovered, recovered_journal = self.recover(recovered, recovered_journal)
+        recovered.reprioritize(3, 0)
+        recovered.reprioritize(1, 2)
+        self.recover(recovered, recovered_journal)
+
+    def test_older_snapshot_versions_rejected(self):
+        with open(os.path.join(self.directory.name, 'snapshot.bin'), 'wb') as snapshot_file:
+            snapshot_file.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, 2, 1, 1, 0, 0))
+        with self.assertRaises(ValueError):
+            Journal(self.directory.name, Restaurant())
+
+
+class SqliteStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, 'orders.db')
+
+    def test_controller_actions_batched_and_queried(self):
+        restaurant = Restaurant()
+        idle_callbacks = []
+        store = SqliteStore(self.path, restaurant, idle_callbacks.append)
+        self.addCleanup(store.close)
+        server = HeadlessServerView(restaurant)
+        kitchen = HeadlessKitchenView(restaurant)
+        server.controller.table_touched(2)
+        server.controller.seat_touched(1)
+        for ix in range(3):
+            server.controller.add_item(restaurant.menu_items[ix])
+        server.controller.update_order()
+        kitchen.controller.button_pressed(restaurant.tables[2].order_for(1).items[0])
+
+        # Everything so far waits for the one flush scheduled on idle
+        self.assertEqual(1, len(idle_callbacks))
+        self.assertEqual(7, len(store.pending))
+        idle_callbacks.pop()()
+        self.assertEqual([], store.pending)
+
+        items = restaurant.tables[2].order_for(1).items
+        self.assertEqual(items, store.kitchen_items())
+        self.assertEqual(items, store.table_items(2))
+        self.assertEqual(2, store.status_counts()[Status.PLACED])
+        self.assertEqual(1, store.status_counts()[Status.COOKED])
+        self.assertEqual({2: restaurant.tables[2].total_cost()}, store.table_totals())
+        self.assertEqual(restaurant.menu_items[0].price, store.revenue_by_menu_item()[restaurant.menu_items[0]])
+
+    def test_reload(self):
+        restaurant = Restaurant()
+        store = SqliteStore(self.path, restaurant)
+        for table_number in range(3):
+            order = restaurant.tables[table_number].order_for(0)
+            order.add_item(restaurant.menu_items[table_number])
+            order.add_item(restaurant.menu_items[4])
+            order.place_new_orders()
+            order.add_item(restaurant.menu_items[5])
+            order.remove_item(order.items[0])
+        restaurant.tables[1].order_for(0).items[0].advance_status()
+        store.close()
+
+        reloaded = Restaurant()
+        store = SqliteStore(self.path, reloaded)
+        self.addCleanup(store.close)
+        self.assertEqual(JournalTestCase.state(restaurant), JournalTestCase.state(reloaded))
+        self.assertEqual(restaurant.total_cost(), reloaded.total_cost())
+        reloaded.tables[0].order_for(0).remove_unordered_items()
+        self.assertEqual([reloaded.tables[0].order_for(0).items[0]], store.table_items(0))
+
+    def test_ids_not_reused_after_reload(self):
+        restaurant = Restaurant()
+        store = SqliteStore(self.path, restaurant)
+        order = restaurant.tables[0].order_for(0)
+        for ix in range(3):
+            order.add_item(restaurant.menu_items[ix])
+        order.place_new_orders()
+        for ix in range(2):
+            order.add_item(restaurant.menu_items[ix])
+        order.remove_unordered_items()
+        store.close()
+
+        reloaded = Restaurant()
+        store = SqliteStore(self.path, reloaded)
+        self.addCleanup(store.close)
+        reloaded.tables[0].order_for(0).add_item(reloaded.menu_items[0])
+        self.assertEqual(6, reloaded.tables[0].order_for(0).items[-1].id)
+
+    def wait_flushed(self, count):
+        # Reading from a connection of its own, since the store's queries would flush first
+        deadline = time.monotonic() + 5
+        connection = sqlite3.connect(self.path)
+        try:
+            while True:
+                rows = connection.execute('SELECT COUNT(*) FROM order_items').fetchone()[0]
+                if rows == count or time.monotonic() > deadline:
+                    return rows
+                time.sleep(0.01)
+        finally:
+            connection.close()
+
+    def test_flushed_on_interval_without_idle(self):
+        restaurant = Restaurant()
+        store = SqliteStore(self.path, restaurant, flush_interval=0.01)
+        self.addCleanup(store.close)
+        restaurant.tables[0].order_for(0).add_item(restaurant.menu_items[0])
+        self.assertEqual(1, self.wait_flushed(1))
+
+    def test_events_off_tk_thread_not_scheduled_on_idle(self):
+        restaurant = Restaurant()
+        idle_callbacks = []
+        store = SqliteStore(self.path, restaurant, idle_callbacks.append, flush_interval=0.01)
+        self.addCleanup(store.close)
+        thread = threading.Thread(target=restaurant.tables[0].order_for(0).add_item, args=(restaurant.menu_items[0],))
+        thread.start()
+        thread.join()
+        self.assertEqual([], idle_callbacks)
+        self.assertEqual(1, self.wait_flushed(1))
+
+
+class TerminalServerTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.restaurant = Restaurant()
+        self.server = RestaurantServer(self.restaurant)
+        (self.host, self.port), = await self.server.start(port=0)
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    async def connect(self):
+        pushes = []
+        client = await TerminalClient.connect(self.host, self.port, on_push=pushes.append)
+        self.addAsyncCleanup(client.close)
+        return client, pushes
+
+    async def test_order_pushed_to_kitchen_and_other_terminals(self):
+        waiter, _ = await self.connect()
+        watcher, watcher_pushes = await self.connect()
+        kitchen, kitchen_pushes = await self.connect()
+        await kitchen.kitchen()
+        await watcher.table_touched(2)
+
+        await waiter.table_touched(2)
+        await waiter.seat_touched(1)
+        await asyncio.gather(waiter.add_item(0), waiter.add_item(3))
+        with self.assertRaises(ProtocolError):
+            await waiter.table_touched(1)
+        await waiter.update_order()
+        first, second = self.restaurant.tables[2].orders[1].items
+        await kitchen.button_pressed(second.id)
+        self.assertEqual([(first.id, 0, Status.PLACED, True), (second.id, 3, Status.COOKED, True)],
+                         await kitchen.order(2, 1))
+        with self.assertRaises(ProtocolError):
+            await waiter.remove_item(first.id)
+        with self.assertRaises(ProtocolError):
+            await kitchen.button_pressed(0)
+
+        # Pushes caused by a request arrive before its reply
+        self.assertEqual([(EventKind.TABLE_OCCUPANCY_CHANGED, 2, 1, None)],
+                         [(push.kind, push.table_number, push.seat, push.menu_id) for push in watcher_pushes])
+        self.assertEqual([(EventKind.ITEM_PLACED, first.id, 0), (EventKind.ITEM_PLACED, second.id, 3),
+                          (EventKind.STATUS_ADVANCED, second.id, 3)],
+                         [(push.kind, push.item_id, push.menu_id) for push in kitchen_pushes])
+        self.assertEqual(Status.COOKED, kitchen_pushes[-1].status)
+
+    async def test_bad_frames_close_their_connection(self):
+        for bad_frame in (frame(FRAME_REQUEST, b'\x00' * (REQUEST.size - 1)),
+                          FRAME_HEADER.pack(2 ** 32 - 1, FRAME_REQUEST) + b'\x00' * REQUEST.size):
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+            writer.write(bad_frame)
+            self.assertEqual(b'', await asyncio.wait_for(reader.read(), 1))
+            writer.close()
+        await asyncio.sleep(0.01)
+        self.assertEqual(0, self.server.stats()['terminals'])
+
+        # The server goes on serving the others
+        client, _ = await self.connect()
+        await client.table_touched(2)
+
+    async def test_handler_errors_replied_and_late_replies_ignored(self):
+        def failing(session, table, seat, index):
+            raise ValueError('broken handler')
+        self.addCleanup(setattr, Session, 'HANDLERS', Session.HANDLERS)
+        Session.HANDLERS = {**Session.HANDLERS, OP_DONE: failing}
+        client, _ = await self.connect()
+        with self.assertRaisesRegex(ProtocolError, 'ValueError: broken handler'):
+            await client.done()
+
+        # A request given up on gets its reply dropped, and the client goes on reading the others
+        abandoned = asyncio.ensure_future(client.table_touched(2))
+        await asyncio.sleep(0)
+        abandoned.cancel()
+        await client.seat_touched(0)
+        self.assertEqual({}, client.waiting)
+
+    async def test_disconnect_removes_view(self):
+        client, _ = await self.connect()
+        await client.kitchen()
+        self.assertEqual(1, len(self.restaurant.views))
+        await client.close()
+        await asyncio.sleep(0.01)
+        self.assertEqual([], self.restaurant.views)
+        self.assertEqual(0, self.server.stats()['terminals'])
+
+
+class KitchenQueueTestCase(unittest.TestCase):
+
+    def setUp(self):
+        menu = [('starters', [('Soup', 5)]), ('mains', [('Steak', 20), ('Fish', 18)])]
+        self.restaurant = Restaurant(menu=menu)
+        self.restaurant.clock = iter(range(1000)).__next__
+        self.soup, self.steak, self.fish = self.restaurant.menu_items
+        self.kitchen = KitchenController(None, self.restaurant)
+
+    def place(self, table_number, seat, *menu_items):
+        order = self.restaurant.tables[table_number].order_for(seat)
+        for menu_item in menu_items:
+            order.add_item(menu_item)
+        order.place_new_orders()
+        return order.items[-len(menu_items):]
+
+    def test_placed_by_restaurant_clock(self):
+        self.restaurant.clock = lambda: 500.0
+        steak, = self.place(1, 0, self.steak)
+        self.assertEqual(500.0, self.restaurant.kitchen_queue.placed(steak))
+
+    def test_oldest_first_then_course(self):
+        steak, soup = self.place(1, 0, self.steak, self.soup)
+        fish, = self.place(0, 0, self.fish)
+        other_steak, = self.place(1, 1, self.steak)
+        self.assertEqual([soup, steak, fish, other_steak], self.restaurant.kitchen_queue.in_order())
+        self.assertIs(soup, self.kitchen.next_item())
+
+    def test_cancel_start_and_reprioritize(self):
+        first, second = self.place(1, 0, self.steak, self.fish)
+        third, = self.place(2, 1, self.fish)
+        fourth, = self.place(3, 0, self.soup)
+        self.kitchen.reprioritize(3, 2)
+        self.kitchen.reprioritize(2, 1)
+        self.assertEqual([fourth, third, first, second], self.restaurant.kitchen_queue.in_order())
+
+        OrderController(ServerViewMock(self.restaurant), self.restaurant, self.restaurant.tables[3], 0) \
+            .remove_spec_item(fourth)
+        self.kitchen.button_pressed(third)
+        self.assertIs(first, self.kitchen.next_item())
+        self.kitchen.reprioritize(2, 0)
+        self.assertEqual([first, second], self.restaurant.kitchen_queue.in_order())
+        self.kitchen.button_pressed(first)
+        self.kitchen.button_pressed(second)
+        self.assertIsNone(self.kitchen.next_item())
+
+    def test_heap_against_sorted(self):
+        import random
+        rng = random.Random(3)
+        queue = KitchenQueue(clock=lambda: rng.randrange(20))
+        expected = {}
+        items = [OrderItem(self.restaurant.menu_items[ix % 3]) for ix in range(300)]
+        for step, item in enumerate(items):
+            table_number = rng.randrange(10)
+            queue.push([item], table_number)
+            expected[item] = table_number
+            if step % 3 == 0:
+                victim = rng.choice(list(expected))
+                queue.discard(victim)
+                del expected[victim]
+            if step % 7 == 0:
+                queue.reprioritize(rng.randrange(10), rng.randrange(-2, 3))
+            if step % 11 == 0 and expected:
+                del expected[queue.pop()]
+        in_order = queue.in_order()
+        self.assertCountEqual(expected, in_order)
+        self.assertEqual(in_order, [queue.pop() for _ in range(len(queue))])
+        self.assertIsNone(queue.pop())
+
+
+class BulkAdvanceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.restaurant = Restaurant()
+        self.kitchen = KitchenController(None, self.restaurant)
+        self.events = []
+        self.restaurant.subscribe(self.events.append, KitchenController.EVENT_KINDS)
+        self.burger = self.restaurant.menu_items[0]
+        for table_number in (1, 2):
+            order = self.restaurant.tables[table_number].order_for(0)
+            order.add_item(self.burger)
+            order.add_item(self.restaurant.menu_items[1])
+            order.place_new_orders()
+        self.events.clear()
+
+    def test_advance_table_in_one_event(self):
+        items = self.kitchen.advance_table(1)
+        self.assertEqual(self.restaurant.tables[1].order_for(0).items, list(items))
+        self.assertEqual([Status.COOKED, Status.COOKED], [item.status for item in items])
+        self.assertEqual(1, len(self.events))
+        self.assertEqual((EventKind.ITEMS_ADVANCED, 1, items),
+                         (self.events[0].kind, self.events[0].table_number, self.events[0].items))
+
+    def test_advance_menu_item_by_status(self):
+        first_burger = self.restaurant.tables[1].order_for(0).items[0]
+        self.kitchen.button_pressed(first_burger)
+        self.events.clear()
+        items = self.kitchen.advance_menu_item(self.burger, Status.COOKED)
+        self.assertEqual((first_burger,), items)
+        self.assertEqual(Status.READY, first_burger.status)
+        self.assertEqual(2, len(self.kitchen.advance_menu_item(self.burger)))
+        self.assertIsNone(self.events[-1].table_number)
+
+    def test_invalid_items_change_nothing(self):
+        placed = self.restaurant.tables[2].order_for(0).items[0]
+        order = self.restaurant.tables[3].order_for(0)
+        order.add_item(self.burger)
+        self.events.clear()
+        with self.assertRaises(ValueError):
+            self.kitchen.advance_items([placed, order.items[0]])
+        with self.assertRaises(ValueError):
+            self.kitchen.advance_items([placed, placed])
+        self.assertEqual(Status.PLACED, placed.status)
+        self.assertEqual([], self.events)
+
+    def test_table_view_only_hears_about_its_table(self):
+        view = ServerViewMock(self.restaurant)
+        view.controller.table_touched(2)
+        view.controller.seat_touched(0)
+        view.last_UI_created = None
+        self.kitchen.advance_items(self.restaurant.active_items_for(1))
+        self.assertIsNone(view.last_UI_created)
+        self.kitchen.advance_items(self.restaurant.active_items_for(1) + self.restaurant.active_items_for(2))
+        self.assertEqual((UI.ORDER, self.restaurant.tables[2].order_for(0)), view.last_UI_created)
+
+
+
+class ItemIdTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.restaurant = Restaurant()
+        self.order = self.restaurant.tables[0].order_for(0)
+        for ix in range(5):
+            self.order.add_item(self.restaurant.menu_items[ix])
+
+    def test_ids_are_stable_and_never_reused(self):
+        items = list(self.order.items)
+        self.assertEqual([1, 2, 3, 4, 5], [item.id for item in items])
+        self.assertIs(items[2], self.restaurant.item(3))
+        self.assertIs(items[2], self.restaurant.remove_item(3))
+        self.assertEqual([items[0], items[1], items[3], items[4]], self.order.items)
+        self.assertNotIn(items[2], self.order.items)
+        with self.assertRaises(KeyError):
+            self.restaurant.item(3)
+        self.order.add_item(self.restaurant.menu_items[0])
+        self.assertEqual(6, self.order.items[-1].id)
+        with self.assertRaises(ValueError):
+            self.order.restore_item(self.restaurant.menu_items[0], Status.PLACED, True, 6)
+
+    def test_menu_ids_are_menu_indices(self):
+        menu_ids = self.restaurant.menu_ids()
+        self.assertEqual(list(range(len(self.restaurant.menu_items))),
+                         [menu_ids[menu_item] for menu_item in self.restaurant.menu_items])
+        self.assertIs(menu_ids, self.restaurant.menu_ids())
+
+    def test_remove_unordered_items_keeps_the_ordered_ones(self):
+        placed = self.order.items[0]
+        self.order.place_new_orders()
+        for ix in range(3):
+            self.order.add_item(self.restaurant.menu_items[ix])
+        self.order.remove_unordered_items()
+        self.assertEqual(5, len(self.order.items))
+        self.assertIs(placed, self.order.items[0])
+        self.assertEqual(set(range(1, 6)), set(self.restaurant.items_by_id))
+
+    def test_long_item_list_removals(self):
+        for ix in range(95):
+            self.order.add_item(self.restaurant.menu_items[ix % 10])
+        items = list(self.order.items)
+        kept = items[::3]
+        for item in reversed(items):
+            if item not in kept:
+                self.order.remove_item(item)
+        self.assertEqual(kept, self.order.items)
+        self.assertEqual(kept[-1], self.order.items[-1])
+        self.assertEqual(kept[1:3], self.order.items[1:3])
+        self.assertEqual(len(kept) - 1, self.order.items.index(kept[-1]))
+        self.assertNotIn(items[1], self.order.items)
+        self.order.add_item(self.restaurant.menu_items[0])
+        self.assertIs(self.order.items[-1], self.restaurant.item(101))
+        self.assertIn(self.order.items[-1], self.order.items)
+        self.assertEqual(len(kept) + 1, len(self.restaurant.items_by_id))
+        self.assertNotIn(items[1].id, self.restaurant.items_by_id)
+        self.restaurant.verify_totals()
+
+
+class HistogramTestCase(unittest.TestCase):
+
+    def test_percentiles_within_a_bucket(self):
+        histogram = Histogram()
+        for ix in range(1, 1001):
+            histogram.add(ix * 1e-5)
+        self.assertEqual(1000, histogram.count)
+        self.assertAlmostEqual(0.01, histogram.max)
+        for fraction in (0.5, 0.9, 0.99):
+            self.assertLessEqual(fraction * 0.01, histogram.percentile(fraction))
+            self.assertLessEqual(histogram.percentile(fraction), fraction * 0.01 * 2 ** (1 / 8) + 1e-12)
+        self.assertEqual(0.01, histogram.percentile(1))
+        self.assertIsNone(Histogram().percentile(0.5))
+
+    def test_merge(self):
+        first, second = Histogram(), Histogram()
+        first.add(0.001)
+        second.add(1e9)
+        first.merge(second)
+        self.assertEqual((2, 1e9), (first.count, first.max))
+        self.assertEqual(2, sum(count for _, count in first.buckets()))
+
+
+class ProfilerTestCase(unittest.TestCase):
+
+    def test_actions_and_renders_timed_while_installed(self):
+        original = OrderController.add_item
+        profiler = Profiler().install((HeadlessServerView,))
+        try:
+            restaurant = Restaurant()
+            view = HeadlessServerView(restaurant)
+            view.controller.table_touched(1)
+            view.controller.seat_touched(0)
+            view.controller.add_item(restaurant.menu_items[0])
+            view.controller.add_item(restaurant.menu_items[1])
+            view.controller.update_order()
+        finally:
+            profiler.uninstall()
+        self.assertIs(original, OrderController.add_item)
+
+        summary = profiler.summary()
+        self.assertEqual(2, summary['timings']['OrderController.add_item']['count'])
+        self.assertEqual(1, summary['timings']['TableController.seat_touched']['count'])
+        self.assertEqual(0, summary['timings']['KitchenController.button_pressed']['count'])
+        self.assertNotIn('OrderController.create_ui', summary['timings'])
+        self.assertEqual(3, summary['renders']['HeadlessServerView.create_order_ui']['calls'])
+        self.assertEqual(0, summary['renders']['HeadlessServerView.create_order_ui']['created'])
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'profile.json')
+        profiler.dump(path)
+        with open(path) as profile_file:
+            self.assertEqual(summary, json.load(profile_file))
+
+
+class KitchenTimesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.restaurant = Restaurant()
+        self.now = 100.0
+        self.restaurant.clock = lambda: self.now
+        self.burger, self.club = self.restaurant.menu_items[0], self.restaurant.menu_items[1]
+
+    def place(self, table_number, *menu_items):
+        order = self.restaurant.tables[table_number].order_for(0)
+        for menu_item in menu_items:
+            order.add_item(menu_item)
+        order.place_new_orders()
+        return order.items[-len(menu_items):]
+
+    def test_transitions_stamped_and_timed(self):
+        burger, club = self.place(1, self.burger, self.club)
+        self.now += 60
+        burger.advance_status()
+        self.now += 30
+        self.restaurant.advance_items([burger, club])
+        self.now += 10
+        burger.advance_status()
+
+        self.assertEqual([100, 160, 190, 200], burger.timestamps)
+        self.assertEqual(190, club.time_of(Status.COOKED))
+        self.assertIsNone(club.time_of(Status.READY))
+        self.assertIsNone(club.time_of(Status.REQUESTED))
+        times = self.restaurant.kitchen_times
+        self.assertEqual(2, times.histogram('PLACED->COOKED').count)
+        self.assertEqual(90, times.histogram('PLACED->COOKED', menu_item=self.club).max)
+        self.assertEqual(100, times.histogram('PLACED->SERVED', table_number=1).max)
+        self.assertIsNone(times.histogram('PLACED->SERVED', menu_item=self.club))
+        summary = self.restaurant.kitchen_summary()
+        self.assertEqual(times.summary(), summary)
+        self.assertEqual(['Chicken club', 'House burger'], sorted(summary['menu_items']))
+        self.assertEqual(1, summary['tables'][1]['READY->SERVED']['count'])
+
+    def test_memory_does_not_grow_with_tickets(self):
+        for _ in range(50):
+            item, = self.place(2, self.burger)
+            for _ in range(3):
+                self.now += 1
+                item.advance_status()
+        histogram = self.restaurant.kitchen_times.histogram('READY->SERVED', menu_item=self.burger)
+        self.assertEqual(50, histogram.count)
+        self.assertEqual(4, len(self.restaurant.kitchen_times.overall))
+        self.assertEqual(1, len(self.restaurant.kitchen_times.by_table))
+
+    def test_recovered_items_are_not_timed_from_the_replay(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        journal = Journal(directory.name, self.restaurant, batch_size=1)
+        burger, = self.place(1, self.burger)
+        burger.advance_status()
+        journal.close()
+        recovered = Restaurant()
+        journal = Journal(directory.name, recovered, batch_size=1)
+        self.addCleanup(journal.close)
+        item = recovered.tables[1].order_for(0).items[0]
+        self.assertEqual((Status.COOKED, None), (item.status, item.timestamps))
+        self.assertEqual({}, recovered.kitchen_times.overall)
+        item.advance_status()
+        self.assertIsNotNone(item.time_of(Status.READY))
+        self.assertEqual({}, recovered.kitchen_times.overall)
+
+
+class SnapshotTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.restaurant = Restaurant()
+        self.restaurant.check_totals = True
+        JournalTestCase.serve_a_few_tables(self.restaurant)
+        self.restaurant.kitchen_queue.reprioritize(2, 5)
+
+    def test_round_trip(self):
+        restored = snapshot.loads(snapshot.dumps(self.restaurant))
+        restored.verify_totals()
+        self.assertEqual(JournalTestCase.state(self.restaurant), JournalTestCase.state(restored))
+        self.assertEqual(self.restaurant.total_cost(), restored.total_cost())
+        self.assertEqual(self.restaurant.next_item_id, restored.next_item_id)
+        self.assertEqual([[item.id for item in self.restaurant.active_items_for(number)] for number in range(8)],
+                         [[item.id for item in restored.active_items_for(number)] for number in range(8)])
+        self.assertEqual([item.id for item in self.restaurant.kitchen_queue.in_order()],
+                         [item.id for item in restored.kitchen_queue.in_order()])
+        self.assertIs(restored.item(1), restored.tables[0].order_for(1).items[0])
+
+        # The restored queue and orders keep working like the original's
+        item = restored.kitchen_queue.pop()
+        item.advance_status()
+        restored.tables[0].order_for(1).add_item(restored.menu_items[0])
+        self.assertEqual(self.restaurant.next_item_id, restored.tables[0].order_for(1).items[-1].id)
+
+    def test_file_and_bad_data(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'restaurant.snap')
+            size = snapshot.save(self.restaurant, path)
+            self.assertEqual(os.path.getsize(path), size)
+            self.assertEqual(JournalTestCase.state(self.restaurant), JournalTestCase.state(snapshot.load(path)))
+        data = snapshot.dumps(self.restaurant)
+        for bad in (b'', b'X' + data[1:], data[:-1], data + b'\0', data[:snapshot.HEADER.size + 2]):
+            with self.assertRaises(ValueError):
+                snapshot.loads(bad)
+
+    def test_corrupt_items(self):
+        restaurant = Restaurant()
+        restaurant.tables[0].order_for(0).add_item(restaurant.menu_items[0])
+        data = snapshot.dumps(restaurant)
+        items = snapshot.HEADER.size + snapshot.HEADER.unpack_from(data)[2] + 10
+        for offset, value in ((items + 4, b'\xff\x00'), (items + 6, b'\x63')):
+            with self.assertRaises(ValueError):
+                snapshot.loads(data[:offset] + value + data[offset + len(value):])
+
+    def test_restore_leaves_registry_alone_on_taken_ids(self):
+        registry = dict(self.restaurant.items_by_id)
+        menu_item = self.restaurant.menu_items[0]
+        for item_ids in ([7, 1], [90, 90]):
+            with self.assertRaises(ValueError):
+                self.restaurant.restore_orders([(5, 0, [menu_item] * 2, [Status.PLACED] * 2, [True] * 2, item_ids)])
+            self.assertEqual(registry, self.restaurant.items_by_id)
+
+
+class TraceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'shift.trace')
+        self.restaurant = Restaurant()
+        self.server = HeadlessServerView(self.restaurant)
+        self.kitchen = HeadlessKitchenView(self.restaurant)
+
+        # Starting the recording halfway through: an order already placed, and the server on a seat's screen
+        self.server.controller.table_touched(1)
+        self.server.controller.seat_touched(0)
+        self.server.controller.add_item(self.restaurant.menu_items[0])
+        self.server.controller.update_order()
+        self.server.controller.seat_touched(1)
+        self.recorder = traces.TraceRecorder(self.restaurant, self.path).install()
+
+    def tearDown(self):
+        if self.recorder.installed:
+            self.recorder.close()
+        self.directory.cleanup()
+
+    def serve(self):
+        self.server.controller.add_item(self.restaurant.menu_items[1])
+        self.server.controller.add_item(self.restaurant.menu_items[2])
+        self.server.controller.remove_spec_item(self.restaurant.tables[1].order_for(1).items[0])
+        self.server.controller.update_order()
+        self.server.controller.done()
+        self.server.controller.table_touched(4)
+        self.server.controller.seat_touched(0)
+        self.server.controller.add_item(self.restaurant.menu_items[3])
+        self.server.controller.cancel_changes()
+        self.kitchen.controller.button_pressed(self.restaurant.tables[1].order_for(0).items[0])
+        self.kitchen.controller.advance_table(1)
+        self.kitchen.controller.reprioritize(1, 3)
+
+    def test_replay_matches(self):
+        self.serve()
+        self.recorder.close()
+        trace = traces.Trace.load(self.path)
+        restored, report = traces.replay(trace)
+        self.assertEqual(12, report['actions'])
+        self.assertEqual(0, report['errors'])
+        self.assertTrue(report['verified'])
+        self.assertEqual(JournalTestCase.state(self.restaurant), JournalTestCase.state(restored))
+        self.assertEqual(1, report['timings']['OrderController.remove_spec_item']['count'])
+        self.assertEqual(1, report['timings']['KitchenController.advance_table']['count'])
+        self.assertNotIn('KitchenController.advance_items', report['timings'])
+
+        # A different final state doesn't verify
+        trace.final = dict(trace.final, total=0)
+        self.assertFalse(traces.replay(trace)[1]['verified'])
+
+    def test_hooks_uninstalled_out_of_order(self):
+        original = OrderController.add_item.__wrapped__
+        profiler = Profiler().install()
+        try:
+            self.recorder.close()
+            self.serve()
+        finally:
+            profiler.uninstall()
+        self.assertIs(original, OrderController.add_item)
+        self.assertEqual(0, self.recorder.actions)
+        self.assertEqual(3, profiler.timings['OrderController.add_item'].count)
+
+        # Closing a recorder never installed, or closed already, does nothing
+        self.recorder.close()
+        traces.TraceRecorder(self.restaurant, self.path + '.unused').close()
+        self.assertFalse(os.path.exists(self.path + '.unused'))
+
+    def test_unclosed_and_bad_traces(self):
+        self.serve()
+        self.recorder.file.flush()
+        with open(self.path, 'rb') as trace_file:
+            data = trace_file.read()
+        self.assertIsNone(traces.replay(traces.Trace.parse(data))[1]['verified'])
+        self.assertEqual(11, traces.replay(traces.Trace.parse(data[:-3]))[1]['actions'])
+        for bad in (b'', b'X' + data[1:]):
+            with self.assertRaises(ValueError):
+                traces.Trace.parse(bad)
+
+
+class ThreadSafetyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        # Switching threads as often as possible, so that they interleave inside the model's methods
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, switch_interval)
+        self.restaurant = Restaurant()
+        self.errors = []
+
+    def run_threads(self, *targets):
+        def guarded(target):
+            try:
+                target()
+            except Exception as error:
+                self.errors.append(error)
+        threads = [threading.Thread(target=guarded, args=(target,)) for target in targets]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([], self.errors)
+
+    def take_orders(self, number, rounds=40):
+        # Two servers share each of the first four tables
+        order = self.restaurant.tables[number % 4].order_for(number // 4)
+        menu_items = self.restaurant.menu_items
+        for ix in range(rounds):
+            order.add_item(menu_items[ix % len(menu_items)])
+            order.add_item(menu_items[(ix + number) % len(menu_items)])
+            order.remove_item(order.unordered_items()[0])
+            order.place_new_orders()
+
+    def cook(self, servers):
+        while any(server.is_alive() for server in servers) or self.restaurant.active_items:
+            items = [item for _, items in self.restaurant.active_snapshot() for item in items[:3]]
+            try:
+                self.restaurant.advance_items(items)
+            except ValueError:
+                # Another cook advanced one of them first: nothing changed, try again
+                pass
+
+    def serve_and_cook(self, rounds=40):
+        servers = [threading.Thread(target=self.take_orders, args=(number, rounds)) for number in range(8)]
+        cooks = [lambda: self.cook(servers)] * 3
+        for server in servers:
+            server.start()
+        self.run_threads(*cooks)
+        for server in servers:
+            server.join()
+
+    def test_no_lost_updates(self):
+        self.serve_and_cook()
+
+        items = [item for table in self.restaurant.tables.loaded() for order in table.orders.values()
+                 for item in order.items]
+        self.assertEqual(8 * 40, len(items))
+        self.assertTrue(all(item.has_been_served() for item in items))
+        self.assertEqual(8 * 40 * 2 + 1, self.restaurant.next_item_id)
+        self.assertEqual(sorted(item.id for item in items), sorted(self.restaurant.items_by_id))
+        self.assertEqual({}, self.restaurant.active_items)
+        self.assertEqual(0, len(self.restaurant.kitchen_queue))
+        self.assertEqual(8 * 40, self.restaurant.kitchen_times.histogram('PLACED->SERVED').count)
+        self.restaurant.verify_totals()
+
+    def test_journal_and_store_follow_threads(self):
+        with tempfile.TemporaryDirectory() as directory:
+            journal = Journal(directory, self.restaurant, batch_size=8, snapshot_every=50)
+            store = SqliteStore(os.path.join(directory, 'orders.db'), self.restaurant, batch_size=16)
+            self.serve_and_cook(rounds=10)
+            journal.close()
+            store.close()
+
+            expected = JournalTestCase.state(self.restaurant)
+            self.assertEqual(8 * 10, len(expected))
+            recovered = Restaurant()
+            Journal(directory, recovered).close()
+            self.assertEqual(expected, JournalTestCase.state(recovered))
+            loaded = Restaurant()
+            SqliteStore(os.path.join(directory, 'orders.db'), loaded).close()
+            self.assertEqual(expected, JournalTestCase.state(loaded))
+
+    def test_reads_are_consistent(self):
+        done = threading.Event()
+        torn = []
+
+        def report():
+            while not done.is_set():
+                total, table_totals = self.restaurant.totals()
+                if abs(total - sum(table_totals.values())) > 1e-6:
+                    torn.append((total, table_totals))
+                served = self.restaurant.read(lambda: [item for seats in self.restaurant.active_items.values()
+                                                       for items in seats.values() for item in items
+                                                       if item.has_been_served()])
+                torn.extend(served)
+                stages = self.restaurant.kitchen_summary()['overall']
+                if stages.get('READY->SERVED', {}).get('count', 0) > stages.get('PLACED->COOKED', {}).get('count', 0):
+                    torn.append(stages)
+
+        def serve():
+            try:
+                for number in range(4):
+                    self.take_orders(number, rounds=20)
+                    for _, items in self.restaurant.active_snapshot():
+                        for item in items:
+                            item.advance_status()
+            finally:
+                done.set()
+
+        self.run_threads(report, serve)
+        self.assertEqual([], torn)
+
+
+
+class ScalingBenchmarkTestCase(unittest.TestCase):
+
+    def test_one_worker_smoke(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'benchmark_scaling.json')
+            subprocess.run([sys.executable, '-m', 'benchmarks.scaling', '--workers', '1', '--seconds', '0.2',
+                            '--tables', '20', '--output', output], capture_output=True, check=True, timeout=60)
+            with open(output) as results_file:
+                run, = json.load(results_file)['runs']
+        self.assertEqual((1, 0), (run['workers'], run['cooks']))
+        self.assertGreater(run['requests'], 0)
+        self.assertEqual(1.0, run['scaling_efficiency'])
+        self.assertIn('update_order', run['operations'])
@@ -0,0 +1,374 @@
+"""
+
+    Description:
+        Module that records the user actions taken on a restaurant's controllers (tables, seats and items touched,
+        orders placed or cancelled, kitchen buttons pressed...) to a compact trace file, and replays a trace
+        headlessly against a fresh Restaurant as fast as it can go. A trace recorded in production thus becomes a
+        performance regression test: replaying it checks that the restaurant ends up in the state it was recorded
+        in, and times every action, so that two builds can be compared action by action (see
+        benchmarks/replay.py).
+
+    Classes defined in this module:
+        - TraceRecorder Class
+        - Trace Class
+
+    Functions defined in this module:
+        - replay(trace): replays a Trace and returns the restaurant it leaves along with the report
+        - fingerprint(restaurant): returns the summary and digest of the state of a restaurant's orders
+
+    Notes:
+        1 - Recording is opt-in, like profiling (see profiling.py/Notes 1): TraceRecorder.install() wraps the
+        ACTIONS of the controller classes themselves (see hooks.py), and close() puts them back. Only actions taken
+        on the recorder's restaurant get recorded, and only the outermost one when an action calls another
+        (advance_table() calling advance_items()). app.py and server.py record one with --record FILE.
+
+        2 - Format: a HEADER (magic, version, length of the snapshot), the snapshot (see snapshot.py) of the
+        restaurant as it was when the recording started, then one RECORD per action (seconds since the recording
+        started, number of the view, action code, number of arguments) followed by its arguments as int32s, and
+        last an END record whose one argument is the length of the JSON fingerprint() of the final state that
+        follows it. Tables, seats, priorities and statuses are written as numbers, menu items by their index in
+        the menu and order items by their id, so an action takes 12 bytes plus 4 per argument.
+
+        3 - Each view gets a VIEW_OPENED record before its first action, giving whether it's a server or kitchen
+        view and the table and seat its screen was on (-1 for none), so that a recording started halfway through a
+        shift replays from the same screens.
+
+        4 - Replaying restores the snapshot, opens a headless view (see headless.py) for each view of the trace,
+        and calls the actions on their controllers back to back, ignoring the recorded times. The views have no
+        scheduler, so each action's timing includes the render it causes. An action that raises is counted as an
+        error and replay goes on, since it raised when it was recorded too. A trace whose recording didn't get
+        closed (a crash) has no END record: it still replays, but can't be verified.
+
+"""
+
+# ---- Importing built-in Libraries ----
+
+import functools
+import hashlib
+import inspect
+import json
+import struct
+import threading
+import time
+
+
+# ---- Importing from other modules -----
+
+import snapshot
+from controller import KitchenController
+from headless import HeadlessServerView, HeadlessKitchenView
+from histogram import Histogram
+from hooks import CONTROLLER_CLASSES, wrap_method, unwrap_methods
+
+
+# Header: magic, version, length of the snapshot of the starting state
+HEADER = struct.Struct('<8sHI')
+TRACE_MAGIC = b'OORMTRAC'
+TRACE_VERSION = 1
+
+# Record: seconds since the recording started, view number, action code, number of int32 arguments
+RECORD = struct.Struct('<dHBB')
+ARGUMENT = struct.Struct('<i')
+
+# The actions recorded, by code (from 1), with the kind of each of their arguments: a number, a menu item, an
+# order item, a Status or None, or a list of order items
+ACTIONS = (('table_touched', ('number',)),
+           ('seat_touched', ('number',)),
+           ('done', ()),
+           ('add_item', ('menu',)),
+           ('remove_spec_item', ('item',)),
+           ('update_order', ()),
+           ('cancel_changes', ()),
+           ('button_pressed', ('item',)),
+           ('advance_table', ('number', 'status')),
+           ('advance_menu_item', ('menu', 'status')),
+           ('advance_items', ('items',)),
+           ('reprioritize', ('number', 'number')))
+ACTION_CODES = {name: code for code, (name, _) in enumerate(ACTIONS, 1)}
+
+# Codes of the records that aren't actions (see Notes 2 and 3), the kinds of view, and the argument standing for
+# no status
+VIEW_OPENED = 0
+END = 255
+SERVER_VIEW, KITCHEN_VIEW = 0, 1
+NO_STATUS = -2 ** 31
+
+
+
+class TraceRecorder:
+    """ Records the actions taken on a restaurant's controllers to a trace file while installed. """
+
+    def __init__(self, restaurant, path, clock = time.perf_counter):
+        """ Constructor to the TraceRecorder class. Records the actions taken on the Restaurant object
+        <restaurant> to the file <path>, timed with <clock>. """
+
+        self.restaurant = restaurant
+        self.path = path
+        self.clock = clock
+        self.file = None
+        self.start = None
+
+        # Menu item -> its index in the menu, and view -> its number in the trace
+        self.menu_ids = restaurant.menu_ids()
+        self.views = {}
+        self.actions = 0
+
+        # Records get written by one thread at a time, and each thread keeps its own depth of nested actions
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+        # (class, name, wrapper maker) of every method install() wrapped (see hooks.py)
+        self.installed = []
+
+
+    # ---------------- Defining Methods ----------------
+
+    def install(self, controller_classes = CONTROLLER_CLASSES):
+        """ Method writes the header and starting state of the trace, then starts recording the ACTIONS of the
+        <controller_classes> (those they define themselves). Returns this recorder. """
+        if self.installed:
+            raise RuntimeError('This recorder is already installed')
+        state = snapshot.dumps(self.restaurant)
+        self.file = open(self.path, 'wb')
+        self.file.write(HEADER.pack(TRACE_MAGIC, TRACE_VERSION, len(state)))
+        self.file.write(state)
+        self.start = self.clock()
+        for cls in controller_classes:
+            for name in list(vars(cls)):
+                if name in ACTION_CODES:
+                    wrap_method(self.installed, cls, name, functools.partial(self._recorded, name))
+        return self
+
+
+    def close(self):
+        """ Method stops recording, puts back every method install() wrapped, and ends the trace with the
+        fingerprint() of the restaurant's state. Does nothing if the recorder isn't installed. """
+        if self.file is None:
+            return
+        unwrap_methods(self.installed)
+        with self.lock:
+            final = json.dumps(fingerprint(self.restaurant)).encode('utf-8')
+            self._write(END, 0, (len(final),))
+            self.file.write(final)
+            self.file.close()
+            self.file = None
+
+
+    def _recorded(self, name, function):
+        """ Returns the controller method <function> wrapped to record its calls as the action <name>. """
+        code = ACTION_CODES[name]
+        kinds = ACTIONS[code - 1][1]
+        signature = inspect.signature(function)
+        local = self.local
+
+        def recorded(controller, *args, **kwargs):
+            if controller.restaurant is not self.restaurant or getattr(local, 'depth', 0):
+                return function(controller, *args, **kwargs)
+            arguments = signature.bind(controller, *args, **kwargs)
+            arguments.apply_defaults()
+            arguments = list(arguments.arguments.values())[1:]
+            if 'items' in kinds:
+                # Reading a generator of items for the record would leave nothing for the action
+                arguments[kinds.index('items')] = list(arguments[kinds.index('items')])
+            self._record(controller, code, kinds, arguments)
+            local.depth = 1
+            try:
+                return function(controller, *arguments)
+            finally:
+                local.depth = 0
+
+        recorded.__name__ = function.__name__
+        recorded.__doc__ = function.__doc__
+        recorded.__wrapped__ = function
+        return recorded
+
+
+    def _record(self, controller, code, kinds, arguments):
+        """ Writes the record of the action of <code> taken on <controller> with <arguments>, and the VIEW_OPENED
+        record of its view first if it's the view's first action. """
+        encoded = []
+        for kind, argument in zip(kinds, arguments):
+            if kind == 'number':
+                encoded.append(argument)
+            elif kind == 'menu':
+                encoded.append(self.menu_ids[argument])
+            elif kind == 'item':
+                encoded.append(argument.id)
+            elif kind == 'status':
+                encoded.append(NO_STATUS if argument is None else int(argument))
+            else:
+                encoded.append(len(argument))
+                encoded.extend(item.id for item in argument)
+
+        with self.lock:
+            view = self.views.get(controller.view)
+            if view is None:
+                view = self.views[controller.view] = len(self.views)
+                self._write(VIEW_OPENED, view, _screen(controller))
+            self._write(code, view, encoded)
+            self.actions += 1
+
+
+    def _write(self, code, view, arguments):
+        """ Writes a record of <code> for view number <view> with the int <arguments>. """
+        self.file.write(RECORD.pack(self.clock() - self.start, view, code, len(arguments)))
+        self.file.write(struct.pack(f'<{len(arguments)}i', *arguments))
+
+
+
+class Trace:
+    """ A trace file read back: the restaurant it starts from, its records and the state it ends in. """
+
+    def __init__(self, state, records, final = None):
+        """ Constructor to the Trace class. <state> is the snapshot (bytes) of the restaurant the trace starts
+        from, <records> the list of its (seconds, view, code, arguments) records without the END one, and <final>
+        the fingerprint() it ends with, or None if the recording wasn't closed. """
+
+        self.state = state
+        self.records = records
+        self.final = final
+
+
+    # ---------------- Defining Methods ----------------
+
+    @staticmethod
+    def parse(data):
+        """ Function returns the Trace of the trace file contents <data> (bytes). Raises a ValueError if <data>
+        isn't a version TRACE_VERSION trace. """
+        data = memoryview(data)
+        if len(data) < HEADER.size:
+            raise ValueError('Not an OORMS trace: too short')
+        magic, version, state_size = HEADER.unpack_from(data)
+        if magic != TRACE_MAGIC or version != TRACE_VERSION:
+            raise ValueError(f'Not a version {TRACE_VERSION} OORMS trace')
+        offset = HEADER.size + state_size
+        state = bytes(data[HEADER.size:offset])
+
+        records = []
+        final = None
+        while offset + RECORD.size <= len(data):
+            seconds, view, code, count = RECORD.unpack_from(data, offset)
+            offset += RECORD.size
+            if offset + count * ARGUMENT.size > len(data):
+                break
+            arguments = struct.unpack_from(f'<{count}i', data, offset)
+            offset += count * ARGUMENT.size
+            if code == END:
+                final = json.loads(bytes(data[offset:offset + arguments[0]]).decode('utf-8'))
+                break
+            records.append((seconds, view, code, arguments))
+        return Trace(state, records, final)
+
+
+    @staticmethod
+    def load(path):
+        """ Function returns the Trace of the trace file <path>. """
+        with open(path, 'rb') as trace_file:
+            return Trace.parse(trace_file.read())
+
+
+    def duration(self):
+        """ Function returns the seconds the recording lasted, up to its last action. """
+        return self.records[-1][0] if self.records else 0.0
+
+
+
+# --------- Defining Separate Functions -----------
+
+def replay(trace, clock = time.perf_counter):
+    """ Function replays the Trace <trace> (see Notes 4), timing its actions with <clock>. Returns the Restaurant
+    object it leaves, and a dict of the number of actions and of those that raised, the seconds the recording and
+    the replay took, whether the final state matched the recorded one (None if the trace has none), both states,
+    and the timings (see Histogram.summary(), in microseconds) of every action by controller and method name. """
+    restaurant = snapshot.loads(trace.state)
+    menu = list(restaurant.menu_items)
+    views = {}
+    timings = {}
+    errors = 0
+
+    def decode(kinds, arguments):
+        decoded = []
+        arguments = iter(arguments)
+        for kind in kinds:
+            argument = next(arguments)
+            if kind == 'number':
+                decoded.append(argument)
+            elif kind == 'menu':
+                decoded.append(menu[argument])
+            elif kind == 'item':
+                decoded.append(restaurant.item(argument))
+            elif kind == 'status':
+                decoded.append(None if argument == NO_STATUS else snapshot.STATUSES[argument])
+            else:
+                decoded.append([restaurant.item(next(arguments)) for _ in range(argument)])
+        return decoded
+
+    start = clock()
+    for _, view, code, arguments in trace.records:
+        if code == VIEW_OPENED:
+            views[view] = _open_view(restaurant, *arguments)
+            continue
+        name, kinds = ACTIONS[code - 1]
+        controller = views[view].controller
+        action = f'{type(controller).__name__}.{name}'
+        method = getattr(controller, name)
+        action_start = clock()
+        try:
+            method(*decode(kinds, arguments))
+        except Exception:
+            errors += 1
+        timings.setdefault(action, Histogram()).add(clock() - action_start)
+    elapsed = clock() - start
+
+    actual = fingerprint(restaurant)
+    return restaurant, {'actions': sum(histogram.count for histogram in timings.values()),
+                        'errors': errors,
+                        'recorded_s': trace.duration(),
+                        'replay_s': elapsed,
+                        'verified': None if trace.final is None else actual == trace.final,
+                        'expected': trace.final,
+                        'actual': actual,
+                        'timings': {action: histogram.summary('us') for action, histogram in sorted(timings.items())}}
+
+
+def fingerprint(restaurant):
+    """ Function returns a dict of the number of items, the total and a digest of the state of every order of the
+    Restaurant object <restaurant>: each item's id, menu item, status and ordered flag, by table and seat, and the
+    kitchen queue's table priorities. Times (when items were placed, how long they took) aren't part of it. """
+    menu_ids = restaurant.menu_ids()
+
+    def state():
+        digest = hashlib.sha256()
+        for table in restaurant.tables.loaded():
+            for seat, order in sorted(table.orders.items()):
+                if order.items:
+                    digest.update(struct.pack('<IHI', table.number, seat, len(order.items)))
+                    for item in order.items:
+                        digest.update(struct.pack('<IHbB', item.id, menu_ids[item.details], int(item.status),
+                                                  item.has_been_ordered()))
+        digest.update(json.dumps(sorted(restaurant.kitchen_queue.priorities.items())).encode('utf-8'))
+        return {'items': len(restaurant.items_by_id), 'total': round(restaurant.total, 2),
+                'digest': digest.hexdigest()}
+
+    return restaurant.read(state)
+
+
+def _screen(controller):
+    """ Returns the (kind of view, table number, seat) of the screen <controller> shows (see Notes 3). """
+    if isinstance(controller, KitchenController):
+        return KITCHEN_VIEW, -1, -1
+    table = getattr(controller, 'table', None)
+    order = getattr(controller, 'order', None)
+    return SERVER_VIEW, -1 if table is None else table.number, -1 if order is None else order.seat
+
+
+def _open_view(restaurant, kind, table_number, seat):
+    """ Returns a headless view of <kind> on <restaurant>, taken to the screen of <table_number> and <seat>. """
+    if kind == KITCHEN_VIEW:
+        return HeadlessKitchenView(restaurant)
+    view = HeadlessServerView(restaurant)
+    if table_number >= 0:
+        view.controller.table_touched(table_number)
+    if seat >= 0:
+        view.controller.seat_touched(seat)
+    return view